@@ -0,0 +1,79 @@
+"""Benchmark the upstream input_audio_buffer.append encoding on recorded pcm.
+
+Compares the original per-frame path (base64 str, uuid4 event id, dataclass,
+asdict + json.dumps), the codec-based to_json_bytes path and AudioAppendEncoder.
+
+Run from the repository root (optionally with a raw 24 kHz pcm16 mono file):
+
+    python -m benchmarks.bench_audio_append [--pcm recording.pcm]
+"""
+import argparse
+import base64
+import json
+import time
+import tracemalloc
+from dataclasses import asdict
+
+from realtime_agent.realtime.struct import AudioAppendEncoder, InputAudioBufferAppend, to_json_bytes
+
+from .pcm import iter_frames, load_pcm
+
+
+def legacy_encode(audio_data: bytes) -> bytes:
+    message = InputAudioBufferAppend(audio=base64.b64encode(audio_data).decode("utf-8"))
+    return json.dumps(asdict(message)).encode("utf-8")
+
+
+def dataclass_encode(audio_data: bytes) -> bytes:
+    return to_json_bytes(InputAudioBufferAppend(audio=base64.b64encode(audio_data).decode("utf-8")))
+
+
+def measure(encode, frames, repeat: int) -> float:
+    """Return the best observed cost in microseconds per frame."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for frame in frames:
+            encode(frame)
+        best = min(best, (time.perf_counter() - start) / len(frames) * 1e6)
+    return best
+
+
+def peak_bytes(encode, frames) -> float:
+    """Return the mean transient peak allocation per frame, in bytes."""
+    total = 0
+    tracemalloc.start()
+    for frame in frames:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        encode(frame)
+        total += tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return total / len(frames)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pcm", help="raw 24 kHz pcm16 mono recording (default: 10 s of synthetic audio)")
+    parser.add_argument("--frame-ms", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    frames = list(iter_frames(load_pcm(args.pcm), args.frame_ms))
+    encoder = AudioAppendEncoder()
+
+    event_id = encoder.next_event_id()
+    expected = to_json_bytes(InputAudioBufferAppend(event_id=event_id, audio=base64.b64encode(frames[0]).decode("utf-8")))
+    assert AudioAppendEncoder(prefix=encoder.prefix).encode(frames[0]) == expected
+
+    print(f"{len(frames)} frames of {args.frame_ms} ms")
+    for label, encode in (
+        ("legacy (asdict + json.dumps)", legacy_encode),
+        ("dataclass + to_json_bytes", dataclass_encode),
+        ("AudioAppendEncoder", encoder.encode),
+    ):
+        print(f"  {label:<30}{measure(encode, frames, args.repeat):>8.2f} us/frame  {peak_bytes(encode, frames):>8,.0f} peak bytes/frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Microbenchmark: lazy `response.audio.delta` fast path vs. full parse + base64 decode.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_audio_delta
+"""
+import argparse
+import base64
+import time
+import tracemalloc
+
+from realtime_agent.realtime.struct import parse_audio_delta, parse_server_message
+
+from .event_mix import recorded_event_mix
+
+
+def full_path(frame: str):
+    message = parse_server_message(frame)
+    if message.type == "response.audio.delta":
+        return base64.b64decode(message.delta)
+    return message
+
+
+def lazy_path(frame: str):
+    audio_delta = parse_audio_delta(frame)
+    if audio_delta is not None:
+        return audio_delta.decode()
+    return parse_server_message(frame)
+
+
+def measure(decode, frames, repeat: int) -> float:
+    """Return the best observed throughput in events per second."""
+    best = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for frame in frames:
+            decode(frame)
+        best = max(best, len(frames) / (time.perf_counter() - start))
+    return best
+
+
+def allocated(decode, frames) -> int:
+    """Return the sum of the per-frame peak allocations while decoding `frames`."""
+    total = 0
+    for frame in frames:
+        tracemalloc.start()
+        decode(frame)
+        total += tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--deltas", type=int, default=50, help="audio deltas per turn")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    frames = recorded_event_mix(args.turns, args.deltas)
+    audio_frames = [frame for frame in frames if parse_audio_delta(frame) is not None]
+    for frame in audio_frames:
+        assert parse_audio_delta(frame).to_message() == parse_server_message(frame)
+        assert lazy_path(frame) == full_path(frame)
+
+    for label, sample in (("audio deltas", audio_frames), ("event mix", frames)):
+        full = measure(full_path, sample, args.repeat)
+        lazy = measure(lazy_path, sample, args.repeat)
+        full_bytes = allocated(full_path, sample) / len(sample)
+        lazy_bytes = allocated(lazy_path, sample) / len(sample)
+        print(f"{label} ({len(sample)} events)")
+        print(f"  full: {full:,.0f} events/s, {full_bytes:,.0f} peak bytes/event")
+        print(f"  lazy: {lazy:,.0f} events/s, {lazy_bytes:,.0f} peak bytes/event ({lazy / full:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
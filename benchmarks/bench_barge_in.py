@@ -0,0 +1,87 @@
+"""Latency harness for the local barge-in detector, driven by synthetic pcm.
+
+The agent plays speech-like audio; the microphone carries an attenuated,
+delayed echo of it, and the user starts talking at a known time. For each trial
+this reports how long after the user's onset the detector fired, and counts
+false triggers on echo alone.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_barge_in [--trials 50]
+"""
+import argparse
+import statistics
+
+import numpy as np
+
+from realtime_agent.barge_in import BargeInConfig, BargeInDetector
+
+from .pcm import BYTES_PER_MS, iter_frames, synthetic_pcm
+
+FRAME_MS = 10
+
+
+def run_trial(seed: int, config: BargeInConfig, echo_loss_db: float, echo_delay_ms: int, user_gain: float, onset_ms: int):
+    """Return (detection latency in ms or None, false triggers before onset)."""
+    seconds = (onset_ms + 2000) / 1000
+    playback = np.frombuffer(synthetic_pcm(seconds, speech_ratio=1.0, seed=seed), dtype=np.int16).astype(np.float32)
+    user = np.frombuffer(synthetic_pcm(seconds, speech_ratio=1.0, seed=seed + 1000), dtype=np.int16).astype(np.float32)
+
+    delay = echo_delay_ms * BYTES_PER_MS // 2
+    echo = np.zeros_like(playback)
+    echo[delay:] = playback[:len(playback) - delay] * 10 ** (-echo_loss_db / 20)
+    onset = onset_ms * BYTES_PER_MS // 2
+    mic = echo.copy()
+    mic[onset:] += user[:len(mic) - onset] * user_gain
+    mic = np.clip(mic, -32768, 32767).astype(np.int16).tobytes()
+
+    now = [0.0]
+    detector = BargeInDetector(config, clock=lambda: now[0])
+    false_triggers = 0
+    frames = zip(iter_frames(playback.astype(np.int16).tobytes(), FRAME_MS), iter_frames(mic, FRAME_MS))
+    for index, (played, heard) in enumerate(frames):
+        now[0] = index * FRAME_MS / 1000
+        detector.observe_playback(played)
+        if detector.process(heard, agent_speaking=True):
+            frame_end_ms = (index + 1) * FRAME_MS
+            if frame_end_ms <= onset_ms:
+                false_triggers += 1
+            else:
+                return frame_end_ms - onset_ms, false_triggers
+    return None, false_triggers
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trials", type=int, default=50)
+    parser.add_argument("--echo-loss-db", type=float, default=25.0, help="attenuation of the agent's echo at the microphone")
+    parser.add_argument("--echo-delay-ms", type=int, default=60)
+    parser.add_argument("--user-gain", type=float, default=0.8, help="level of the user's speech relative to full-scale synthetic speech")
+    parser.add_argument("--onset-ms", type=int, default=1500)
+    args = parser.parse_args()
+
+    config = BargeInConfig()
+    latencies, misses, false_triggers = [], 0, 0
+    for trial in range(args.trials):
+        latency, false = run_trial(trial, config, args.echo_loss_db, args.echo_delay_ms, args.user_gain, args.onset_ms)
+        false_triggers += false
+        if latency is None:
+            misses += 1
+        else:
+            latencies.append(latency)
+
+    print(f"trials: {args.trials}, detected: {len(latencies)}, missed: {misses}, false triggers on echo: {false_triggers}")
+    if latencies:
+        print(
+            f"onset -> local barge-in: mean {statistics.mean(latencies):.0f} ms, "
+            f"p50 {percentile(latencies, 0.5)} ms, p95 {percentile(latencies, 0.95)} ms, max {max(latencies)} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Benchmark the JSON codecs behind struct.to_json and parse_server_message.
+
+Decoding runs over a recorded-style server event mix; encoding runs over the
+client messages an agent sends (mostly 10 ms input_audio_buffer.append frames).
+Every installed codec must produce byte-identical output. That output is compact
+JSON and differs from the older json.dumps defaults (spaced separators, ASCII escapes).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_codecs
+"""
+import argparse
+import base64
+import json
+import os
+import time
+from dataclasses import asdict
+
+from realtime_agent.realtime.codec import available_codecs
+from realtime_agent.realtime.struct import (
+    InputAudioBufferAppend,
+    InputAudioTranscription,
+    ResponseCancel,
+    ServerVADUpdateParams,
+    SessionUpdate,
+    SessionUpdateParams,
+    Voices,
+)
+
+from .event_mix import recorded_event_mix
+
+# 10 ms of 24 kHz pcm16 mono
+RTC_FRAME_BYTES = 480
+
+
+def client_message_mix(frames: int):
+    messages = [
+        SessionUpdate(
+            session=SessionUpdateParams(
+                turn_detection=ServerVADUpdateParams(type="server_vad", threshold=0.5, prefix_padding_ms=300, silence_duration_ms=200),
+                tools=[],
+                tool_choice="auto",
+                input_audio_format="pcm16",
+                output_audio_format="pcm16",
+                instructions="Be helpful. ünïcode ✓",
+                voice=Voices.Alloy,
+                model="gpt-4o-realtime-preview",
+                modalities=["text", "audio"],
+                temperature=0.8,
+                max_response_output_tokens="inf",
+                input_audio_transcription=InputAudioTranscription(model="whisper-1"),
+            )
+        )
+    ]
+    for index in range(frames):
+        messages.append(InputAudioBufferAppend(audio=base64.b64encode(os.urandom(RTC_FRAME_BYTES)).decode("utf-8")))
+        if index % 100 == 99:
+            messages.append(ResponseCancel())
+    return messages
+
+
+def legacy_dumps(message) -> bytes:
+    return json.dumps(asdict(message)).encode("utf-8")
+
+
+def measure(fn, items, repeat: int) -> float:
+    """Return the best observed throughput in items per second."""
+    best = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = max(best, len(items) / (time.perf_counter() - start))
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--deltas", type=int, default=50, help="audio deltas per turn")
+    parser.add_argument("--frames", type=int, default=2000, help="input_audio_buffer.append messages")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    codecs = available_codecs()
+    events = recorded_event_mix(args.turns, args.deltas)
+    messages = client_message_mix(args.frames)
+
+    reference = codecs["json"]
+    for name, codec in codecs.items():
+        for message in messages:
+            assert codec.dumps(message) == reference.dumps(message), f"{name} output differs for {message.type}"
+        for event in events:
+            assert codec.loads(event) == reference.loads(event), f"{name} decodes differently"
+            assert codec.dumps(codec.loads(event)) == reference.dumps(reference.loads(event)), f"{name} re-encodes differently"
+
+    print(f"codecs: {', '.join(codecs)} (output byte-identical)")
+    print(f"encode {len(messages)} client messages")
+    print(f"  {'json.dumps(asdict)':<20}{measure(legacy_dumps, messages, args.repeat):>12,.0f} msgs/s")
+    for name, codec in codecs.items():
+        print(f"  {name:<20}{measure(codec.dumps, messages, args.repeat):>12,.0f} msgs/s")
+    print(f"decode {len(events)} server events")
+    for name, codec in codecs.items():
+        print(f"  {name:<20}{measure(codec.loads, events, args.repeat):>12,.0f} events/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""End-to-end agent benchmark: N concurrent sessions on fake RTC channels against the mock realtime API.
+
+Every session runs the real RealtimeKitAgent pipeline: upstream batching, the
+realtime websocket, playout pacing and barge-in handling. The RTC side is
+replaced by benchmarks.fake_rtc, and the model by
+benchmarks.mock_realtime_server, which runs in its own process so its CPU is
+not billed to the agents. Reports mouth-to-ear latency per turn (user's last
+speech frame to the agent's first pushed frame) and this process's CPU and
+memory per session.
+
+Run from the repository root (needs the agora packages from requirements.txt):
+
+    python -m benchmarks.bench_end_to_end [--sessions 10 --turns 3 --latency-ms 40 --pcm speech.pcm]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import time
+
+import psutil
+from aiohttp import web
+from agora_realtime_ai_api.rtc import RtcOptions
+
+from realtime_agent.agent import RealtimeKitAgent
+from realtime_agent.logger import log_stats
+from realtime_agent.main import default_inference_config
+from realtime_agent.realtime.client_session import close_shared_client_session
+from realtime_agent.realtime.struct import PCM_CHANNELS, PCM_SAMPLE_RATE
+from realtime_agent.tracing import startup_latency
+
+from .fake_rtc import FakeRtcEngine, UserScript
+from .mock_realtime_server import MockRealtimeServer, MockServerConfig
+from .pcm import load_pcm
+
+
+def run_mock_server(config: MockServerConfig, port: int) -> None:
+    web.run_app(MockRealtimeServer(config).make_app(), host="127.0.0.1", port=port, print=None)
+
+
+async def wait_for_port(port: int, timeout_s: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout_s
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+
+async def run_sessions(engine: FakeRtcEngine, sessions: int, sample_every_s: float = 0.5) -> dict[str, float]:
+    process = psutil.Process()
+    baseline_rss = process.memory_info().rss
+    peak_rss = baseline_rss
+    cpu_before = process.cpu_times()
+    started = time.monotonic()
+
+    async def sample_memory() -> None:
+        nonlocal peak_rss
+        while True:
+            peak_rss = max(peak_rss, process.memory_info().rss)
+            await asyncio.sleep(sample_every_s)
+
+    sampler = asyncio.create_task(sample_memory())
+    results = await asyncio.gather(
+        *(
+            RealtimeKitAgent.setup_and_run_agent(
+                engine=engine,
+                options=RtcOptions(channel_name=f"bench-{n}", uid=n + 1, sample_rate=PCM_SAMPLE_RATE, channels=PCM_CHANNELS),
+                inference_config=default_inference_config(),
+                tools=None,
+            )
+            for n in range(sessions)
+        ),
+        return_exceptions=True,
+    )
+    sampler.cancel()
+
+    wall_s = time.monotonic() - started
+    cpu_after = process.cpu_times()
+    cpu_s = (cpu_after.user - cpu_before.user) + (cpu_after.system - cpu_before.system)
+    return {
+        "failed_sessions": sum(isinstance(result, BaseException) for result in results),
+        "wall_s": wall_s,
+        "cpu_pct_per_session": 100 * cpu_s / wall_s / sessions,
+        "rss_mb_per_session": (peak_rss - baseline_rss) / 2**20 / sessions,
+    }
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--speech-s", type=float, default=2.0, help="Length of each synthetic user turn")
+    parser.add_argument("--gap-ms", type=int, default=3000, help="Silence after each user turn")
+    parser.add_argument("--pcm", default=None, help="Raw 24 kHz mono pcm16 file played as every user turn")
+    parser.add_argument("--speed", type=float, default=1.0, help="User audio rate as a multiple of real time")
+    parser.add_argument("--port", type=int, default=8091)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Mock realtime API one-way latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--response-delay-ms", type=float, default=300.0)
+    args = parser.parse_args()
+
+    if args.pcm:
+        script = UserScript(turns=(load_pcm(args.pcm),) * args.turns, gap_ms=args.gap_ms, speed=args.speed)
+    else:
+        script = UserScript.synthetic(args.turns, args.speech_s, gap_ms=args.gap_ms, speed=args.speed)
+
+    mock_config = MockServerConfig(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, response_delay_ms=args.response_delay_ms)
+    mock = multiprocessing.Process(target=run_mock_server, args=(mock_config, args.port), daemon=True)
+    mock.start()
+    os.environ["REALTIME_API_BASE_URI"] = f"http://127.0.0.1:{args.port}"
+    os.environ.setdefault("OPENAI_API_KEY", "mock")
+
+    engine = FakeRtcEngine(script)
+
+    async def run() -> dict[str, float]:
+        await wait_for_port(args.port)
+        try:
+            return await run_sessions(engine, args.sessions)
+        finally:
+            await close_shared_client_session()
+
+    try:
+        usage = asyncio.run(run())
+    finally:
+        mock.terminate()
+
+    latencies = [ms for channel in engine.channels for ms in channel.mouth_to_ear_ms()]
+    answered = [ms for ms in latencies if ms is not None]
+    print(f"{args.sessions} sessions x {args.turns} turns, speed {args.speed}x, mock latency {args.latency_ms}±{args.jitter_ms} ms")
+    print(f"  answered turns      {len(answered)}/{len(latencies)}, failed sessions {usage['failed_sessions']}")
+    if answered:
+        print(
+            f"  mouth-to-ear ms     p50 {percentile(answered, 0.5):7.1f}  p95 {percentile(answered, 0.95):7.1f}  "
+            f"p99 {percentile(answered, 0.99):7.1f}  mean {statistics.mean(answered):7.1f}"
+        )
+    print(f"  cpu per session     {usage['cpu_pct_per_session']:.2f}% of a core over {usage['wall_s']:.1f} s")
+    print(f"  memory per session  {usage['rss_mb_per_session']:.2f} MB peak RSS growth")
+    for phase, summary in startup_latency.snapshot().items():
+        print(f"  startup {phase:<18} p50 {summary['p50']:7.1f}  p95 {summary['p95']:7.1f} ms")
+    print(
+        f"  log records dropped {log_stats['dropped_queue_full']} (queue full), {log_stats['sampled_out']} sampled out, "
+        f"{log_stats['rate_limited']} rate limited"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Benchmark what logging costs the event loop per audio frame.
+
+Each frame logs what the response.audio.delta path does: one DEBUG record
+(disabled at the default INFO level) and one INFO record with the session's
+ids. Compares the original setup (eager f-strings, StreamHandler writing on the
+calling thread) with the queue-backed AGENT_LOG_MODE=async and json handlers
+from realtime_agent.logger, which leave formatting and writing to a background
+thread. Run once with a fast sink and once with a sink that stalls on every
+write, like a terminal or pipe whose reader has fallen behind.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_logging [--frames 20000 --stall-ms 1]
+"""
+import argparse
+import io
+import logging
+import queue
+import time
+
+from realtime_agent.logger import ContextQueueHandler, CustomFormatter, DrainingQueueListener, JsonFormatter, bind_log_context, log_stats
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class SlowSink(io.StringIO):
+    """A stream whose writes block for `stall_s`, then are discarded."""
+
+    def __init__(self, stall_s: float) -> None:
+        super().__init__()
+        self.stall_s = stall_s
+
+    def write(self, text: str) -> int:
+        if self.stall_s:
+            time.sleep(self.stall_s)
+        return len(text)
+
+
+def build(mode: str, stream: io.TextIOBase) -> tuple[logging.Logger, DrainingQueueListener | None]:
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter() if mode == "json" else CustomFormatter("%(log_color)s" + LOG_FORMAT))
+    logger = logging.getLogger(f"bench.{mode}.{id(stream)}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    listener = None
+    if mode != "console":
+        log_queue: queue.Queue = queue.Queue(10_000)
+        listener = DrainingQueueListener(log_queue, handler)
+        listener.start()
+        handler = ContextQueueHandler(log_queue)
+    logger.addHandler(handler)
+    return logger, listener
+
+
+def eager(logger: logging.Logger, response_id: str, item_id: str, size: int) -> None:
+    logger.debug(f"TMS:ResponseAudioDelta: response_id:{response_id},item_id: {item_id}")
+    logger.info(f"Pushed audio frame of {size} bytes for item {item_id}")
+
+
+def lazy(logger: logging.Logger, response_id: str, item_id: str, size: int) -> None:
+    logger.debug("TMS:ResponseAudioDelta: response_id:%s,item_id: %s", response_id, item_id)
+    logger.info("Pushed audio frame of %s bytes for item %s", size, item_id)
+
+
+def lazy_with_errors(logger: logging.Logger, response_id: str, item_id: str, size: int) -> None:
+    lazy(logger, response_id, item_id, size)
+    if size % 100 == 0:
+        logger.error("Playout underrun for item %s", item_id)
+
+
+def measure(log, mode: str, frames: int, stall_ms: float) -> tuple[float, float]:
+    """Return (caller microseconds per frame, milliseconds to drain the queue afterwards)."""
+    logger, listener = build(mode, SlowSink(stall_ms / 1000))
+    start = time.perf_counter()
+    for i in range(frames):
+        log(logger, "resp_0001", "item_0001", 480 + i)
+    elapsed = time.perf_counter() - start
+    drain_start = time.perf_counter()
+    if listener is not None:
+        listener.stop()
+    return elapsed / frames * 1e6, (time.perf_counter() - drain_start) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=20_000)
+    parser.add_argument("--stall-ms", type=float, default=1.0, help="write stall of the slow sink")
+    args = parser.parse_args()
+
+    bind_log_context(channel="bench", uid=1)
+    for stall_ms, frames in ((0.0, args.frames), (args.stall_ms, min(args.frames, 2_000))):
+        print(f"{frames} frames, sink stalls {stall_ms:g} ms per write")
+        for label, log, mode in (
+            ("before: f-strings, console", eager, "console"),
+            ("lazy %-args, console", lazy, "console"),
+            ("lazy %-args, async", lazy, "async"),
+            ("lazy %-args, json", lazy, "json"),
+            ("lazy, 1% errors, async", lazy_with_errors, "async"),
+        ):
+            before = dict(log_stats)
+            per_frame, drain_ms = measure(log, mode, frames, stall_ms)
+            print(
+                f"  {label:<30}{per_frame:>9.2f} us/frame on the loop"
+                f"  drain {drain_ms:>7.0f} ms"
+                f"  dropped {log_stats['dropped_queue_full'] - before['dropped_queue_full']}"
+                f"  errors over capacity {log_stats['errors_over_capacity'] - before['errors_over_capacity']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Microbenchmark: precompiled `parse_server_message` vs. the reflective if/elif decoder.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_parse_server_message
+"""
+import argparse
+import json
+import time
+
+from realtime_agent.realtime.struct import EventType, SERVER_MESSAGE_TYPES, from_dict, parse_server_message
+
+from .event_mix import recorded_event_mix
+
+# The decoder as it was before the dispatch table: a linear scan over the event
+# types followed by the recursive, reflection-based from_dict.
+_LEGACY_DISPATCH = [(EventType(event_type), data_class) for event_type, data_class in SERVER_MESSAGE_TYPES.items()]
+
+
+def legacy_parse_server_message(unparsed_string: str):
+    data = json.loads(unparsed_string)
+    for event_type, data_class in _LEGACY_DISPATCH:
+        if data["type"] == event_type:
+            return from_dict(data_class, data)
+    raise ValueError(f"Unknown message type: {data['type']}")
+
+
+def measure(decode, frames, repeat: int) -> float:
+    """Return the best observed throughput in events per second."""
+    best = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for frame in frames:
+            decode(frame)
+        elapsed = time.perf_counter() - start
+        best = max(best, len(frames) / elapsed)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--deltas", type=int, default=50, help="audio deltas per turn")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    frames = recorded_event_mix(args.turns, args.deltas)
+    for frame in frames:
+        assert parse_server_message(frame) == legacy_parse_server_message(frame), frame[:80]
+
+    legacy = measure(legacy_parse_server_message, frames, args.repeat)
+    compiled = measure(parse_server_message, frames, args.repeat)
+    print(f"events:   {len(frames)}")
+    print(f"legacy:   {legacy:,.0f} events/s")
+    print(f"compiled: {compiled:,.0f} events/s ({compiled / legacy:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""A representative server event stream, shaped like a recorded realtime API session.
+
+The mix is dominated by `response.audio.delta` frames, with the control events
+that accompany a typical assistant turn interleaved between them.
+"""
+import base64
+import json
+import os
+from typing import List
+
+# 24 kHz pcm16 mono: 4800 bytes == 100 ms, a common delta size on the wire.
+AUDIO_DELTA_BYTES = 4800
+
+
+def _audio_delta(turn: int, index: int) -> dict:
+    return {
+        "type": "response.audio.delta",
+        "event_id": f"event_{turn}_{index}",
+        "response_id": f"resp_{turn}",
+        "item_id": f"item_{turn}",
+        "output_index": 0,
+        "content_index": 0,
+        "delta": base64.b64encode(os.urandom(AUDIO_DELTA_BYTES)).decode("utf-8"),
+    }
+
+
+def _turn(turn: int, audio_deltas: int) -> List[dict]:
+    item = {
+        "id": f"item_{turn}",
+        "object": "realtime.item",
+        "type": "message",
+        "status": "in_progress",
+        "role": "assistant",
+        "content": [],
+    }
+    response = {
+        "object": "realtime.response",
+        "id": f"resp_{turn}",
+        "status": "in_progress",
+        "status_details": None,
+        "output": [],
+        "usage": None,
+    }
+    events = [
+        {"type": "input_audio_buffer.speech_started", "event_id": f"ss_{turn}", "audio_start_ms": 1000 * turn, "item_id": f"user_{turn}"},
+        {"type": "input_audio_buffer.speech_stopped", "event_id": f"sp_{turn}", "audio_end_ms": 1000 * turn + 800, "item_id": f"user_{turn}"},
+        {"type": "input_audio_buffer.committed", "event_id": f"cm_{turn}", "previous_item_id": None, "item_id": f"user_{turn}"},
+        {"type": "response.created", "event_id": f"rc_{turn}", "response": response},
+        {"type": "rate_limits.updated", "event_id": f"rl_{turn}", "rate_limits": [
+            {"name": "requests", "limit": 5000, "remaining": 4999, "reset_seconds": 0.012},
+            {"name": "tokens", "limit": 20000, "remaining": 19000, "reset_seconds": 3.0},
+        ]},
+        {"type": "response.output_item.added", "event_id": f"oa_{turn}", "response_id": f"resp_{turn}", "output_index": 0, "item": item},
+        {"type": "response.content_part.added", "event_id": f"pa_{turn}", "response_id": f"resp_{turn}", "item_id": f"item_{turn}",
+         "output_index": 0, "content_index": 0, "part": {"type": "audio", "transcript": ""}},
+    ]
+    for index in range(audio_deltas):
+        events.append(_audio_delta(turn, index))
+        if index % 5 == 0:
+            events.append({"type": "response.audio_transcript.delta", "event_id": f"td_{turn}_{index}", "response_id": f"resp_{turn}",
+                           "item_id": f"item_{turn}", "output_index": 0, "content_index": 0, "delta": " hello"})
+    events += [
+        {"type": "response.audio.done", "event_id": f"ad_{turn}", "response_id": f"resp_{turn}", "item_id": f"item_{turn}",
+         "output_index": 0, "content_index": 0},
+        {"type": "response.audio_transcript.done", "event_id": f"tdn_{turn}", "response_id": f"resp_{turn}", "item_id": f"item_{turn}",
+         "output_index": 0, "content_index": 0, "transcript": "hello " * (audio_deltas // 5)},
+        {"type": "response.done", "event_id": f"rd_{turn}", "response": dict(response, status="completed", usage={
+            "total_tokens": 300, "input_tokens": 100, "output_tokens": 200,
+            "input_token_details": {"cached_tokens": 0, "text_tokens": 80, "audio_tokens": 20},
+            "output_token_details": {"text_tokens": 40, "audio_tokens": 160},
+        })},
+    ]
+    return events
+
+
+def recorded_event_mix(turns: int = 5, audio_deltas_per_turn: int = 50) -> List[str]:
+    """Return the raw text frames of a session with `turns` assistant turns."""
+    frames = [json.dumps({"type": "session.created", "event_id": "session_0", "session": {
+        "id": "sess_0", "object": "realtime.session", "model": "gpt-4o-realtime-preview", "expires_at": 1700000000,
+        "modalities": ["text", "audio"], "instructions": "", "voice": "alloy", "turn_detection": {
+            "type": "server_vad", "threshold": 0.5, "prefix_padding_ms": 300, "silence_duration_ms": 200},
+        "input_audio_format": "pcm16", "output_audio_format": "pcm16", "input_audio_transcription": None,
+        "tool_choice": "auto", "temperature": 0.8, "max_response_output_tokens": "inf", "tools": []}})]
+    for turn in range(turns):
+        frames.extend(json.dumps(event) for event in _turn(turn, audio_deltas_per_turn))
+    return frames
@@ -0,0 +1,195 @@
+"""Offline stand-ins for agora_realtime_ai_api's RtcEngine and Channel, for end-to-end agent benchmarks.
+
+FakeRtcEngine.create_channel returns a FakeChannel with the same methods the
+agent calls: connect/disconnect, subscribe_audio, get_audio_frames,
+push_audio_frame, clear_sender_audio_buffer, chat.send_message and on/once/off.
+It also fires the same events: user_joined, user_left and
+connection_state_changed. Once the channel is connected, a scripted remote user
+joins and speaks its turns in 10 ms frames, in real time or faster. Audio the
+agent pushes and chat messages it sends are timestamped, so mouth-to-ear
+latency can be read off per turn.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, Callable
+
+from .pcm import BYTES_PER_MS, iter_frames, synthetic_pcm
+
+# connection_state_changed states, as reported by the RTC SDK
+CONNECTION_STATE_DISCONNECTED = 1
+CONNECTION_STATE_CONNECTED = 3
+
+
+@dataclass(frozen=True)
+class UserScript:
+    """What the remote user says: each turn is speech followed by `gap_ms` of background noise."""
+
+    turns: tuple[bytes, ...]
+    gap_ms: int = 3000  # Silence after each turn, while the agent answers
+    uid: int = 1001
+    join_delay_ms: int = 50  # From the agent joining to the remote user joining
+    frame_ms: int = 10
+    speed: float = 1.0  # Multiple of real time; latencies are only meaningful at 1.0
+
+    @classmethod
+    def synthetic(cls, turns: int = 3, speech_s: float = 2.0, seed: int = 0, **kwargs: Any) -> "UserScript":
+        return cls(turns=tuple(synthetic_pcm(speech_s, speech_ratio=1.0, seed=seed + n) for n in range(turns)), **kwargs)
+
+
+@dataclass
+class AudioFrame:
+    data: bytearray
+
+
+class FakeAudioStream:
+    def __init__(self) -> None:
+        self.queue: asyncio.Queue[AudioFrame | None] = asyncio.Queue()
+
+    def __aiter__(self) -> "FakeAudioStream":
+        return self
+
+    async def __anext__(self) -> AudioFrame:
+        item = await self.queue.get()
+        if item is None:
+            raise StopAsyncIteration
+        return item
+
+
+@dataclass
+class FakeChat:
+    clock: Callable[[], float] = time.monotonic
+    messages: list[tuple[float, str, str]] = field(default_factory=list)  # (sent at, msg_id, message)
+
+    async def send_message(self, item: Any) -> None:
+        self.messages.append((self.clock(), item.msg_id, item.message))
+
+
+class FakeChannel:
+    def __init__(self, engine: "FakeRtcEngine", options: Any, script: UserScript, clock: Callable[[], float] = time.monotonic) -> None:
+        self.engine = engine
+        self.options = options
+        self.script = script
+        self.clock = clock
+        self.uid = options.uid
+        self.connection_state = 0
+        self.remote_users: dict[int, Any] = {}
+        self.chat = FakeChat(clock)
+        self._listeners: dict[str, list[tuple[Callable[..., Any], bool]]] = {}
+        self._streams: dict[int, FakeAudioStream] = {}
+        self._subscribed = asyncio.Event()
+        self._user: asyncio.Task[None] | None = None
+
+        # (pushed at, frame bytes) for every frame the agent sent
+        self.pushed: list[tuple[float, int]] = []
+        self.clears: list[float] = []
+        # (first speech frame delivered at, last speech frame delivered at) per user turn
+        self.turns: list[tuple[float, float]] = []
+
+    def on(self, event_name: str, callback: Callable[..., Any]) -> None:
+        self._listeners.setdefault(event_name, []).append((callback, False))
+
+    def once(self, event_name: str, callback: Callable[..., Any]) -> None:
+        self._listeners.setdefault(event_name, []).append((callback, True))
+
+    def off(self, event_name: str, callback: Callable[..., Any]) -> None:
+        self._listeners[event_name] = [entry for entry in self._listeners.get(event_name, []) if entry[0] is not callback]
+
+    def emit(self, event_name: str, *args: Any) -> None:
+        # Like pyee's AsyncIOEventEmitter: coroutine handlers are scheduled, plain ones run inline
+        listeners = self._listeners.get(event_name, [])
+        self._listeners[event_name] = [entry for entry in listeners if not entry[1]]
+        for callback, _ in listeners:
+            result = callback(*args)
+            if asyncio.iscoroutine(result):
+                asyncio.ensure_future(result)
+
+    async def connect(self) -> None:
+        await asyncio.sleep(self.engine.connect_delay_ms / 1000)
+        self._set_state(CONNECTION_STATE_CONNECTED)
+        self._user = asyncio.create_task(self._play_user())
+
+    async def disconnect(self) -> None:
+        if self.connection_state == CONNECTION_STATE_DISCONNECTED:
+            return
+        if self._user is not None:
+            self._user.cancel()
+        for stream in self._streams.values():
+            stream.queue.put_nowait(None)
+        self._set_state(CONNECTION_STATE_DISCONNECTED)
+
+    async def subscribe_audio(self, uid: int) -> None:
+        self._streams.setdefault(uid, FakeAudioStream())
+        self._subscribed.set()
+
+    def get_audio_frames(self, uid: int) -> FakeAudioStream | None:
+        return self._streams.get(uid)
+
+    async def push_audio_frame(self, frame: bytes) -> None:
+        self.pushed.append((self.clock(), len(frame)))
+
+    async def clear_sender_audio_buffer(self) -> None:
+        self.clears.append(self.clock())
+
+    def mouth_to_ear_ms(self) -> list[float | None]:
+        """Per turn: from the user's last speech frame to the first agent frame pushed after it.
+
+        None where the agent did not answer before the user's next turn started.
+        """
+        latencies: list[float | None] = []
+        for index, (_, speech_end) in enumerate(self.turns):
+            next_start = self.turns[index + 1][0] if index + 1 < len(self.turns) else float("inf")
+            answer = next((at for at, _ in self.pushed if speech_end < at < next_start), None)
+            latencies.append((answer - speech_end) * 1000 if answer is not None else None)
+        return latencies
+
+    def _set_state(self, state: int) -> None:
+        self.connection_state = state
+        self.emit("connection_state_changed", self, SimpleNamespace(state=state), 0)
+
+    async def _play_user(self) -> None:
+        script = self.script
+        await asyncio.sleep(script.join_delay_ms / 1000)
+        self.remote_users[script.uid] = True
+        self.emit("user_joined", self, script.uid)
+        await self._subscribed.wait()
+        stream = self._streams[script.uid]
+
+        frame_s = script.frame_ms / 1000 / script.speed
+        gap = synthetic_pcm(script.gap_ms / 1000, speech_ratio=0.0)
+        started = self.clock()
+        sent = 0
+        for speech in script.turns:
+            for index, frame in enumerate(iter_frames(speech + gap, script.frame_ms)):
+                # Paced against the start time, so scheduling delays don't accumulate
+                await asyncio.sleep(max(0.0, started + sent * frame_s - self.clock()))
+                stream.queue.put_nowait(AudioFrame(bytearray(frame)))
+                sent += 1
+                if index == 0:
+                    turn_start = self.clock()
+                if index == len(speech) // (script.frame_ms * BYTES_PER_MS) - 1:
+                    self.turns.append((turn_start, self.clock()))
+
+        self.remote_users.pop(script.uid, None)
+        self._streams.pop(script.uid, None)
+        stream.queue.put_nowait(None)
+        self.emit("user_left", self, script.uid, 0)
+
+
+class FakeRtcEngine:
+    """Creates FakeChannels that all play `script` as their remote user."""
+
+    def __init__(self, script: UserScript, connect_delay_ms: int = 20, clock: Callable[[], float] = time.monotonic) -> None:
+        self.script = script
+        self.connect_delay_ms = connect_delay_ms
+        self.clock = clock
+        self.channels: list[FakeChannel] = []
+
+    def create_channel(self, options: Any) -> FakeChannel:
+        channel = FakeChannel(self, options, self.script, self.clock)
+        self.channels.append(channel)
+        return channel
+
+    def destroy(self) -> None:
+        self.channels.clear()
@@ -0,0 +1,339 @@
+"""A local stand-in for the realtime API websocket, for repeatable load and latency tests.
+
+It speaks the event protocol in realtime_agent/realtime/struct.py. It takes
+session.update, audio appends/commits, response.create/cancel and item.truncate.
+It runs a simple energy-based server VAD and streams response.audio.delta
+events at a configurable size and rate. Every server event can be delayed by a
+fixed latency plus jitter without reordering. speech_started, error and
+rate_limits.updated events can be injected on a schedule or through
+POST /inject.
+
+Run from the repository root, then point the agent at it:
+
+    python -m benchmarks.mock_realtime_server --port 8090 [--latency-ms 40 --jitter-ms 10]
+    REALTIME_API_BASE_URI=http://127.0.0.1:8090 python -m realtime_agent.main agent --channel_name=test
+
+curl -X POST localhost:8090/inject -d '{"event": "speech_started"}' injects an
+event into every open session; GET /stats returns counters.
+"""
+import argparse
+import asyncio
+import binascii
+import itertools
+import math
+import random
+import time
+import uuid
+from array import array
+from dataclasses import dataclass, replace
+from typing import Any
+
+from aiohttp import WSMsgType, web
+
+from realtime_agent.realtime.codec import default_codec
+from realtime_agent.vad import frame_features
+
+from .pcm import BYTES_PER_MS
+
+
+@dataclass(frozen=True)
+class MockServerConfig:
+    latency_ms: float = 0.0  # Added to every server event
+    jitter_ms: float = 0.0  # Uniform +/- jitter on top of latency; event order is preserved
+    response_delay_ms: float = 300.0  # From the end of a user turn to the first audio delta
+    response_audio_ms: int = 2000  # Audio generated per response
+    delta_audio_ms: int = 100  # Audio carried by each response.audio.delta
+    delta_rate: float = 2.0  # Audio is streamed at this multiple of real time; 0 sends it all at once
+    vad_threshold_db: float = -40.0  # Input louder than this counts as speech for the server VAD
+    silence_duration_ms: int = 500  # Replaced by turn_detection.silence_duration_ms from session.update
+    speech_started_probability: float = 0.0  # Chance of an injected speech_started during each response
+    error_every: int = 0  # Send an error event after every Nth client message; 0 never
+    rate_limits_every: int = 1  # Send rate_limits.updated after every Nth response; 0 never
+    session_expires_s: int = 1800
+    seed: int = 0
+
+
+def tone(ms: int, frequency: float = 220.0, level_db: float = -20.0) -> bytes:
+    amplitude = 32767 * 10 ** (level_db / 20)
+    count = ms * BYTES_PER_MS // 2
+    rate = BYTES_PER_MS * 1000 // 2
+    return array("h", (int(amplitude * math.sin(2 * math.pi * frequency * n / rate)) for n in range(count))).tobytes()
+
+
+class MockSession:
+    def __init__(self, server: "MockRealtimeServer", ws: web.WebSocketResponse) -> None:
+        self.server = server
+        self.config = server.config
+        self.ws = ws
+        self.rng = random.Random(self.config.seed)
+        self.id = f"sess_{uuid.uuid4().hex[:12]}"
+        self.event_ids = itertools.count(1)
+        self.ids = itertools.count(1)
+        self.session: dict[str, Any] = {
+            "id": self.id,
+            "object": "realtime.session",
+            "model": "mock-realtime",
+            "expires_at": int(time.time()) + self.config.session_expires_s,
+            "modalities": ["text", "audio"],
+            "voice": "alloy",
+            "turn_detection": {"type": "server_vad", "threshold": 0.5, "prefix_padding_ms": 300, "silence_duration_ms": self.config.silence_duration_ms},
+            "input_audio_format": "pcm16",
+            "output_audio_format": "pcm16",
+            "tools": [],
+            "tool_choice": "auto",
+            "temperature": 0.8,
+            "max_response_output_tokens": "inf",
+        }
+        self.outbox: asyncio.Queue[tuple[float, bytes]] = asyncio.Queue()
+        self.last_due = 0.0
+        self.audio_ms = 0.0  # Input audio received so far
+        self.speaking = False
+        self.silence_ms = 0.0
+        self.input_item: str | None = None
+        self.last_item: str | None = None
+        self.response: asyncio.Task[None] | None = None
+        self.response_id: str | None = None  # Set once response.created is out
+        self.messages_in = 0
+
+    def emit(self, event: dict[str, Any]) -> None:
+        """Queue a server event, delayed by latency plus jitter but never ahead of earlier events."""
+        event = {"event_id": f"event_{next(self.event_ids)}", **event}
+        delay = self.config.latency_ms + self.rng.uniform(-self.config.jitter_ms, self.config.jitter_ms)
+        due = max(self.last_due, time.monotonic() + max(0.0, delay) / 1000)
+        self.last_due = due
+        self.outbox.put_nowait((due, default_codec.dumps(event)))
+        self.server.events_out += 1
+
+    async def send_loop(self) -> None:
+        while True:
+            due, payload = await self.outbox.get()
+            await asyncio.sleep(max(0.0, due - time.monotonic()))
+            await self.ws.send_str(payload.decode("utf-8"))
+
+    async def handle(self, message: dict[str, Any]) -> None:
+        self.messages_in += 1
+        self.server.messages_in += 1
+        kind = message.get("type")
+        if kind == "input_audio_buffer.append":
+            self.on_audio(binascii.a2b_base64(message["audio"]))
+        elif kind == "session.update":
+            session = {k: v for k, v in (message.get("session") or {}).items() if v is not None}
+            self.session.update(session)
+            self.emit({"type": "session.updated", "session": self.session})
+        elif kind == "input_audio_buffer.commit":
+            self.commit()
+        elif kind == "input_audio_buffer.clear":
+            self.emit({"type": "input_audio_buffer.cleared"})
+        elif kind == "response.create":
+            self.start_response()
+        elif kind == "response.cancel":
+            self.cancel_response("client_cancelled")
+        elif kind == "conversation.item.truncate":
+            self.emit({"type": "conversation.item.truncated", "item_id": message["item_id"], "content_index": message["content_index"], "audio_end_ms": message["audio_end_ms"]})
+        elif kind == "conversation.item.create":
+            item_id = f"item_{next(self.ids)}"
+            self.emit({"type": "conversation.item.created", "previous_item_id": self.last_item, "item": {**message["item"], "id": item_id}})
+            self.last_item = item_id
+        else:
+            self.error("invalid_request_error", f"Unsupported event type: {kind}")
+        if self.config.error_every and self.messages_in % self.config.error_every == 0:
+            self.error("server_error", "Injected error")
+
+    def on_audio(self, pcm: bytes) -> None:
+        self.server.audio_bytes_in += len(pcm)
+        chunk_ms = len(pcm) / BYTES_PER_MS
+        self.audio_ms += chunk_ms
+        if not self.session.get("turn_detection"):
+            return
+        level_db, _ = frame_features(pcm)
+        if level_db >= self.config.vad_threshold_db:
+            self.silence_ms = 0.0
+            if not self.speaking:
+                self.speaking = True
+                self.speech_started(int(self.audio_ms - chunk_ms))
+        elif self.speaking:
+            self.silence_ms += chunk_ms
+            if self.silence_ms >= self.session["turn_detection"].get("silence_duration_ms", self.config.silence_duration_ms):
+                self.speaking = False
+                # Like the real API, audio_end_ms is where speech ended, not where the silence window did
+                self.emit({"type": "input_audio_buffer.speech_stopped", "audio_end_ms": int(self.audio_ms - self.silence_ms), "item_id": self.input_item})
+                self.commit()
+                self.start_response()
+
+    def speech_started(self, audio_start_ms: int) -> None:
+        self.input_item = f"item_{next(self.ids)}"
+        self.emit({"type": "input_audio_buffer.speech_started", "audio_start_ms": audio_start_ms, "item_id": self.input_item})
+        # Like the real server VAD, the user talking over a response cancels it
+        self.cancel_response("turn_detected")
+
+    def commit(self) -> None:
+        item_id = self.input_item or f"item_{next(self.ids)}"
+        self.emit({"type": "input_audio_buffer.committed", "item_id": item_id, "previous_item_id": self.last_item})
+        self.emit({"type": "conversation.item.created", "previous_item_id": self.last_item, "item": {"id": item_id, "type": "message", "role": "user", "content": [{"type": "input_audio"}]}})
+        self.last_item = item_id
+        self.input_item = None
+
+    def start_response(self) -> None:
+        self.cancel_response("turn_detected")
+        self.response = asyncio.create_task(self.stream_response(f"resp_{next(self.ids)}", f"item_{next(self.ids)}"))
+
+    def cancel_response(self, reason: str) -> None:
+        if self.response is not None and not self.response.done():
+            self.response.cancel()
+        if self.response_id is not None:
+            self.emit({"type": "response.done", "response": {"id": self.response_id, "object": "realtime.response", "status": "cancelled", "status_details": {"type": "cancelled", "reason": reason}, "output": []}})
+        self.response = None
+        self.response_id = None
+
+    async def stream_response(self, response_id: str, item_id: str) -> None:
+        config = self.config
+        parts = {"response_id": response_id, "item_id": item_id, "output_index": 0, "content_index": 0}
+        await asyncio.sleep(config.response_delay_ms / 1000)
+        self.response_id = response_id
+        self.emit({"type": "response.created", "response": {"id": response_id, "object": "realtime.response", "status": "in_progress", "output": []}})
+        self.emit({"type": "response.output_item.added", "response_id": response_id, "output_index": 0, "item": {"id": item_id, "type": "message", "role": "assistant", "content": []}})
+        self.emit({"type": "response.content_part.added", **parts, "part": {"type": "audio", "transcript": ""}})
+        self.last_item = item_id
+
+        deltas = max(1, config.response_audio_ms // config.delta_audio_ms)
+        interrupt_at = deltas // 2 if self.rng.random() < config.speech_started_probability else None
+        delta = binascii.b2a_base64(self.server.delta_pcm, newline=False).decode("ascii")
+        for index in range(deltas):
+            self.emit({"type": "response.audio.delta", **parts, "delta": delta})
+            self.server.deltas_out += 1
+            if index == interrupt_at:
+                self.response = None  # speech_started sends response.done without cancelling this task from inside itself
+                self.speech_started(int(self.audio_ms))
+                return
+            if config.delta_rate:
+                await asyncio.sleep(config.delta_audio_ms / 1000 / config.delta_rate)
+
+        transcript = "This is a mock response."
+        self.emit({"type": "response.audio.done", **parts})
+        self.emit({"type": "response.audio_transcript.delta", **parts, "delta": transcript})
+        self.emit({"type": "response.audio_transcript.done", **parts, "transcript": transcript})
+        self.emit({"type": "response.content_part.done", **parts, "part": {"type": "audio", "transcript": transcript}})
+        self.emit({"type": "response.output_item.done", "response_id": response_id, "output_index": 0, "item": {"id": item_id, "type": "message", "role": "assistant", "status": "completed", "content": []}})
+        self.emit({"type": "response.done", "response": {"id": response_id, "object": "realtime.response", "status": "completed", "output": []}})
+        self.server.responses += 1
+        if config.rate_limits_every and self.server.responses % config.rate_limits_every == 0:
+            self.rate_limits()
+        self.response = None
+        self.response_id = None
+
+    def rate_limits(self) -> None:
+        self.emit({"type": "rate_limits.updated", "rate_limits": [
+            {"name": "requests", "limit": 5000, "remaining": 4999, "reset_seconds": 0.01},
+            {"name": "tokens", "limit": 800000, "remaining": 790000, "reset_seconds": 0.7},
+        ]})
+
+    def error(self, error_type: str, message: str) -> None:
+        self.emit({"type": "error", "error": {"type": error_type, "code": None, "message": message, "param": None, "event_id": None}})
+
+
+class MockRealtimeServer:
+    def __init__(self, config: MockServerConfig = MockServerConfig()) -> None:
+        self.config = config
+        self.delta_pcm = tone(config.delta_audio_ms)
+        self.sessions: set[MockSession] = set()
+        self.messages_in = 0
+        self.events_out = 0
+        self.deltas_out = 0
+        self.audio_bytes_in = 0
+        self.responses = 0
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes([
+            web.get("/v1/realtime", self.handle_ws),
+            web.post("/inject", self.handle_inject),
+            web.get("/stats", self.handle_stats),
+        ])
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8090) -> web.AppRunner:
+        runner = web.AppRunner(self.make_app())
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+    async def handle_ws(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(max_msg_size=2**24)
+        await ws.prepare(request)
+        session = MockSession(self, ws)
+        self.sessions.add(session)
+        sender = asyncio.create_task(session.send_loop())
+        session.emit({"type": "session.created", "session": session.session})
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.TEXT:
+                    await session.handle(default_codec.loads(msg.data))
+        finally:
+            session.cancel_response("client_cancelled")
+            sender.cancel()
+            self.sessions.discard(session)
+        return ws
+
+    async def handle_inject(self, request: web.Request) -> web.Response:
+        """POST {"event": "speech_started" | "error" | "rate_limits" | "disconnect"} to every open session."""
+        event = (await request.json()).get("event")
+        for session in list(self.sessions):
+            if event == "speech_started":
+                session.speech_started(int(session.audio_ms))
+            elif event == "error":
+                session.error("server_error", "Injected error")
+            elif event == "rate_limits":
+                session.rate_limits()
+            elif event == "disconnect":
+                await session.ws.close()
+            else:
+                return web.json_response({"error": f"Unknown event: {event}"}, status=400)
+        return web.json_response({"injected": event, "sessions": len(self.sessions)})
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "sessions": len(self.sessions),
+            "messages_in": self.messages_in,
+            "audio_bytes_in": self.audio_bytes_in,
+            "events_out": self.events_out,
+            "deltas_out": self.deltas_out,
+            "responses": self.responses,
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    defaults = MockServerConfig()
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=defaults.jitter_ms)
+    parser.add_argument("--response-delay-ms", type=float, default=defaults.response_delay_ms)
+    parser.add_argument("--response-audio-ms", type=int, default=defaults.response_audio_ms)
+    parser.add_argument("--delta-audio-ms", type=int, default=defaults.delta_audio_ms)
+    parser.add_argument("--delta-rate", type=float, default=defaults.delta_rate)
+    parser.add_argument("--speech-started-probability", type=float, default=defaults.speech_started_probability)
+    parser.add_argument("--error-every", type=int, default=defaults.error_every)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args()
+
+    config = replace(
+        defaults,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        response_delay_ms=args.response_delay_ms,
+        response_audio_ms=args.response_audio_ms,
+        delta_audio_ms=args.delta_audio_ms,
+        delta_rate=args.delta_rate,
+        speech_started_probability=args.speech_started_probability,
+        error_every=args.error_every,
+        seed=args.seed,
+    )
+    web.run_app(MockRealtimeServer(config).make_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""PCM fixtures for the audio benchmarks: recorded files or synthetic speech-like audio.
+
+All audio is 24 kHz, mono, little-endian pcm16, matching PCM_SAMPLE_RATE/PCM_CHANNELS.
+"""
+import array
+import math
+import random
+from typing import Iterator, Optional
+
+from realtime_agent.realtime.struct import PCM_CHANNELS, PCM_SAMPLE_RATE
+
+BYTES_PER_MS = PCM_SAMPLE_RATE * PCM_CHANNELS * 2 // 1000
+
+
+def synthetic_pcm(seconds: float, speech_ratio: float = 0.5, seed: int = 0) -> bytes:
+    """Alternate bursts of voiced, speech-like tone with low-level background noise."""
+    rng = random.Random(seed)
+    samples = array.array("h")
+    total = int(seconds * PCM_SAMPLE_RATE)
+    segment = PCM_SAMPLE_RATE // 2  # 500 ms segments
+    while len(samples) < total:
+        voiced = rng.random() < speech_ratio
+        pitch = rng.uniform(100.0, 220.0)
+        for n in range(min(segment, total - len(samples))):
+            noise = rng.gauss(0.0, 60.0)
+            if voiced:
+                t = n / PCM_SAMPLE_RATE
+                envelope = math.sin(math.pi * n / segment)
+                value = 6000.0 * envelope * (math.sin(2 * math.pi * pitch * t) + 0.5 * math.sin(4 * math.pi * pitch * t)) + noise
+            else:
+                value = noise
+            samples.append(max(-32768, min(32767, int(value))))
+    return samples.tobytes()
+
+
+def load_pcm(path: Optional[str], seconds: float = 10.0) -> bytes:
+    """Read a raw pcm16 recording, or synthesize `seconds` of audio when no path is given."""
+    if path is None:
+        return synthetic_pcm(seconds)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def iter_frames(pcm: bytes, frame_ms: int = 10) -> Iterator[bytes]:
+    """Split pcm into fixed-size frames, as the RTC SDK delivers them."""
+    frame_bytes = frame_ms * BYTES_PER_MS
+    for offset in range(0, len(pcm) - frame_bytes + 1, frame_bytes):
+        yield pcm[offset:offset + frame_bytes]
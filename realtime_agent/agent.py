@@ -2,28 +2,38 @@ import asyncio
 import base64
 import logging
 import os
+import time
 from builtins import anext
-from typing import Any
+from typing import Any, Callable, Iterable
 
+import aiohttp
 from agora.rtc.rtc_connection import RTCConnection, RTCConnInfo
 from attr import dataclass
 
 from agora_realtime_ai_api.rtc import Channel, ChatMessage, RtcEngine, RtcOptions
 
-from .logger import setup_logger
-from .realtime.struct import InputAudioBufferCommitted, InputAudioBufferSpeechStarted, InputAudioBufferSpeechStopped, InputAudioTranscription, ItemCreated, ItemInputAudioTranscriptionCompleted, RateLimitsUpdated, ResponseAudioDelta, ResponseAudioDone, ResponseAudioTranscriptDelta, ResponseAudioTranscriptDone, ResponseContentPartAdded, ResponseContentPartDone, ResponseCreated, ResponseDone, ResponseOutputItemAdded, ResponseOutputItemDone, ServerVADUpdateParams, SessionUpdate, SessionUpdateParams, SessionUpdated, Voices, to_json
-from .realtime.connection import RealtimeApiConnection
+from .audio_aggregator import UpstreamAudioAggregator, UpstreamAudioConfig
+from .barge_in import BargeInConfig, BargeInDetector
+from .logger import bind_log_context, setup_logger
+from .metrics import Sample, registry
+from .playout import AudioPlayout, PlayoutConfig, PlayoutTracker
+from .realtime.struct import InputAudioBufferCommitted, InputAudioBufferSpeechStarted, InputAudioBufferSpeechStopped, InputAudioTranscription, ItemCreated, ItemInputAudioTranscriptionCompleted, ItemTruncate, LazyResponseAudioDelta, RateLimitsUpdated, ResponseAudioDelta, ResponseAudioDone, ResponseAudioTranscriptDelta, ResponseAudioTranscriptDone, ResponseCancel, ResponseContentPartAdded, ResponseContentPartDone, ResponseCreated, ResponseDone, ResponseOutputItemAdded, ResponseOutputItemDone, ServerVADUpdateParams, SessionCreated, SessionUpdate, SessionUpdateParams, SessionUpdated, Voices, to_json
+from .realtime.connection import RealtimeApiConnection, ReconnectConfig
+from .realtime.outbound import SendQueueConfig
+from .realtime.proxy import ProxyRealtimeApiConnection
+from .realtime.connection_pool import RealtimeConnectionPool
 from .tools import ClientToolCallResponse, ToolContext
+from .tracing import PhaseTimer, TurnTracer, startup_latency
 from .utils import PCMWriter
+from .vad import LocalVADConfig, SilenceSuppressor
 
 # Set up the logger with color and timestamp support
 logger = setup_logger(name=__name__, log_level=logging.INFO)
 
-def _monitor_queue_size(queue: asyncio.Queue, queue_name: str, threshold: int = 5) -> None:
-    queue_size = queue.qsize()
-    if queue_size > threshold:
-        logger.warning(f"Queue {queue_name} size exceeded {threshold}: current size {queue_size}")
-
+session_errors = registry.counter("agent_session_errors_total", "Agent sessions that ended with an error.")
+registry.describe("agent_playout_buffered_milliseconds", "Model audio buffered for playout, summed over sessions.")
+registry.describe("realtime_send_queue_depth", "Messages waiting in outbound send queues, summed over sessions.")
+registry.describe("realtime_send_queue_audio_milliseconds", "Audio waiting in outbound send queues, summed over sessions.")
 
 async def wait_for_remote_user(channel: Channel) -> int:
     remote_users = list(channel.remote_users.keys())
@@ -51,13 +61,40 @@ class InferenceConfig:
     system_message: str | None = None
     turn_detection: ServerVADUpdateParams | None = None  # MARK: CHECK!
     voice: Voices | None = None
+    upstream_audio: UpstreamAudioConfig = UpstreamAudioConfig()
+    playout: PlayoutConfig = PlayoutConfig()
+    local_vad: LocalVADConfig | None = None  # Suppress silence locally before it is sent upstream
+    barge_in: BargeInConfig | None = None  # Cut playback locally, before the server's speech_started arrives
+    reconnect: ReconnectConfig | None = ReconnectConfig()  # Resume the model session when the websocket drops; None ends the call
+    send_queue: SendQueueConfig | None = SendQueueConfig()  # Send through a writer task with a bounded priority queue; None sends inline
+
+
+def build_session_update(inference_config: InferenceConfig, tools: ToolContext | None) -> SessionUpdate:
+    return SessionUpdate(
+        session=SessionUpdateParams(
+            # MARK: check this
+            turn_detection=inference_config.turn_detection,
+            tools=tools.model_description() if tools else [],
+            tool_choice="auto",
+            input_audio_format="pcm16",
+            output_audio_format="pcm16",
+            instructions=inference_config.system_message,
+            voice=inference_config.voice,
+            model=os.environ.get("OPENAI_MODEL", "gpt-4o-realtime-preview"),
+            modalities=["text", "audio"],
+            temperature=0.8,
+            max_response_output_tokens="inf",
+            input_audio_transcription=InputAudioTranscription(model="whisper-1")
+        )
+    )
 
 
 class RealtimeKitAgent:
     engine: RtcEngine
     channel: Channel
     connection: RealtimeApiConnection
-    audio_queue: asyncio.Queue[bytes] = asyncio.Queue()
+    playout: AudioPlayout
+    playout_tracker: PlayoutTracker
 
     message_queue: asyncio.Queue[ResponseAudioTranscriptDelta] = (
         asyncio.Queue()
@@ -79,56 +116,99 @@ class RealtimeKitAgent:
         inference_config: InferenceConfig,
         tools: ToolContext | None,
         on_message: Any = None,  # Accept on_message callback
+        on_first_audio: Callable[[], Any] | None = None,  # Called once, when the first agent audio is pushed to RTC
+        session: aiohttp.ClientSession | None = None,  # Shared by all sessions of a worker process
+        connection: RealtimeApiConnection | None = None,  # An already-open (warm) connection to use instead of dialing; dial it with the reconnect config for a heartbeat
+        connection_pool: RealtimeConnectionPool | None = None,  # Take a pre-configured connection from this pool
     ) -> None:
-        
+        # Callers run each session in its own task, so these fields tag only this session's records
+        bind_log_context(channel=options.channel_name, uid=options.uid)
 
+        timer = PhaseTimer()
         channel = engine.create_channel(options)
-        await channel.connect()
-
-        try:
-            async with RealtimeApiConnection(
-                base_uri=os.getenv("REALTIME_API_BASE_URI", "wss://api.openai.com"),
-                api_key=os.getenv("OPENAI_API_KEY"),
-                verbose=False,
-            ) as connection:
-                await connection.send_request(
-                    SessionUpdate(
-                        session=SessionUpdateParams(
-                            # MARK: check this
-                            turn_detection=inference_config.turn_detection,
-                            tools=tools.model_description() if tools else [],
-                            tool_choice="auto",
-                            input_audio_format="pcm16",
-                            output_audio_format="pcm16",
-                            instructions=inference_config.system_message,
-                            voice=inference_config.voice,
-                            model=os.environ.get("OPENAI_MODEL", "gpt-4o-realtime-preview"),
-                            modalities=["text", "audio"],
-                            temperature=0.8,
-                            max_response_output_tokens="inf",
-                            input_audio_transcription=InputAudioTranscription(model="whisper-1")
-                        )
-                    )
+        opened: list[RealtimeApiConnection] = []  # closed on the way out, whichever phase failed
+
+        async def join_channel() -> None:
+            with timer.span("rtc_connect"):
+                await channel.connect()
+
+        async def open_model_session() -> RealtimeApiConnection:
+            if connection_pool is not None:
+                with timer.span("connection_acquire"):
+                    # Only the difference from the pool's session template is sent, without waiting for the reply
+                    pooled = await connection_pool.acquire(build_session_update(inference_config, tools).session)
+                opened.append(pooled)
+                return pooled
+
+            if connection is not None:
+                model_connection = connection
+            elif os.getenv("REALTIME_PROXY_SOCKET"):
+                # Go through the local proxy, which handles JSON/base64 for us
+                model_connection = ProxyRealtimeApiConnection(
+                    os.getenv("REALTIME_PROXY_SOCKET"),
+                    verbose=False,
+                    lazy_audio_deltas=True,
+                    reconnect=inference_config.reconnect,
                 )
-
-                start_session_message = await anext(connection.listen())
-                # assert isinstance(start_session_message, messages.StartSession)
-                logger.info("Start Session Message: "+ str(start_session_message))
-                #logger.info(
-                #   f"Session started: {start_session_message.session.id} model: {start_session_message.session.model}"
-                #)
-
-                agent = cls(
-                    connection=connection,
-                    tools=tools,
-                    channel=channel,
-                    on_message=on_message
+            else:
+                model_connection = RealtimeApiConnection(
+                    base_uri=os.getenv("REALTIME_API_BASE_URI", "wss://api.openai.com"),
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    verbose=False,
+                    lazy_audio_deltas=True,
+                    session=session,
+                    reconnect=inference_config.reconnect,
                 )
+            opened.append(model_connection)
+            if not model_connection.connected:
+                with timer.span("ws_connect"):
+                    await model_connection.connect()
+            with timer.span("session_update"):
+                await model_connection.send_request(build_session_update(inference_config, tools))
+                start_session_message = await anext(model_connection.listen())
+            # assert isinstance(start_session_message, messages.StartSession)
+            logger.info("Start Session Message: "+ str(start_session_message))
+            #logger.info(
+            #   f"Session started: {start_session_message.session.id} model: {start_session_message.session.model}"
+            #)
+            return model_connection
+
+        try:
+            # The RTC join and the model websocket don't depend on each other, so set both up at once
+            with timer.span("startup"):
+                phases = [asyncio.create_task(join_channel()), asyncio.create_task(open_model_session())]
+                try:
+                    await asyncio.gather(*phases)
+                except BaseException:
+                    for phase in phases:
+                        phase.cancel()
+                    await asyncio.gather(*phases, return_exceptions=True)
+                    raise
+            logger.info(f"TMS:Startup: channel: {options.channel_name}, {timer}")
+            startup_latency.observe_phases(timer)
+
+            connection = phases[1].result()
+            connection.reconnect_config = inference_config.reconnect
+            if inference_config.send_queue is not None:
+                connection.enable_send_queue(inference_config.send_queue)
+            agent = cls(
+                connection=connection,
+                tools=tools,
+                channel=channel,
+                inference_config=inference_config,
+                on_message=on_message,
+                on_first_audio=on_first_audio,
+            )
+            registry.add_session(options.channel_name, agent.stats)
+            try:
                 await agent.run()
+            finally:
+                registry.remove_session(options.channel_name)
 
         finally:
             await channel.disconnect()
-            await connection.close()
+            for model_connection in opened:
+                await model_connection.close()
 
     def __init__(
         self,
@@ -136,15 +216,23 @@ class RealtimeKitAgent:
         connection: RealtimeApiConnection,
         tools: ToolContext | None,
         channel: Channel,
+        inference_config: InferenceConfig | None = None,
         on_message: Any = None,  # Accept on_message callback
+        on_first_audio: Callable[[], Any] | None = None,
     ) -> None:
         self.connection = connection
+        self.inference_config = inference_config or InferenceConfig()
         self.tools = tools
         self._client_tool_futures = {}
         self.channel = channel
         self.subscribe_user = None
         self.write_pcm = os.environ.get("WRITE_AGENT_PCM", "false") == "true"
         self.on_message = on_message  # Store the callback
+        self.on_first_audio = on_first_audio
+        self.connection.on_reconnect = self._on_model_reconnect
+        self.upstream_audio = UpstreamAudioAggregator(
+            self.connection.send_audio_data, self.inference_config.upstream_audio
+        )
 
          # Bind queues to the current event loop
         current_loop = asyncio.get_event_loop()
@@ -152,7 +240,14 @@ class RealtimeKitAgent:
             current_loop = asyncio.new_event_loop()
             asyncio.set_event_loop(current_loop)
 
-        self.audio_queue = asyncio.Queue()
+        self.playout = AudioPlayout(self.inference_config.playout)
+        self.playout_tracker = PlayoutTracker()
+        self.turn_tracer = TurnTracer()
+        self.vad = SilenceSuppressor(self.inference_config.local_vad) if self.inference_config.local_vad else None
+        self.barge_in = BargeInDetector(self.inference_config.barge_in) if self.inference_config.barge_in else None
+        self.response_active = False
+        self.current_response_id: str | None = None
+        self.interrupted_response_id: str | None = None
         self.message_queue = asyncio.Queue()
         self.message_done_queue = asyncio.Queue()
         
@@ -161,13 +256,6 @@ class RealtimeKitAgent:
     async def run(self) -> None:
         try:
 
-            def log_exception(t: asyncio.Task[Any]) -> None:
-                if not t.cancelled() and t.exception():
-                    logger.error(
-                        "unhandled exception",
-                        exc_info=t.exception(),
-                    )
-
             def on_stream_message(agora_local_user, user_id, stream_id, data, length) -> None:
                 logger.info(f"Received stream message with length: {length}")
 
@@ -198,21 +286,49 @@ class RealtimeKitAgent:
                         disconnected_future.set_result(None)
 
             self.channel.on("connection_state_changed", callback)
-
-            asyncio.create_task(self.rtc_to_model()).add_done_callback(log_exception)
-            asyncio.create_task(self.model_to_rtc()).add_done_callback(log_exception)
-
-            asyncio.create_task(self._process_model_messages()).add_done_callback(
-                log_exception
-            )
-
-            await disconnected_future
-            logger.info("Agent finished running")
+            registry.add_collector(self._collect_metrics)
+
+            # The task group scopes the session's tasks: cancelling or failing this
+            # session never leaves tasks behind on a loop shared with other sessions
+            async with asyncio.TaskGroup() as session_tasks:
+                tasks = [
+                    session_tasks.create_task(self.rtc_to_model()),
+                    session_tasks.create_task(self.model_to_rtc()),
+                    session_tasks.create_task(self._process_model_messages()),
+                ]
+
+                await disconnected_future
+                logger.info("Agent finished running")
+                for task in tasks:
+                    task.cancel()
         except asyncio.CancelledError:
             logger.info("Agent cancelled")
         except Exception as e:
             logger.error(f"Error running agent: {e}")
+            session_errors.inc()
             raise
+        finally:
+            registry.remove_collector(self._collect_metrics)
+            self.upstream_audio.close()
+            # Live stats are exported per session, see setup_and_run_agent; this keeps the final ones
+            logger.info("Session stats: %s", self.stats())
+
+    def stats(self) -> dict[str, Any]:
+        """This session's upstream batching, local VAD, barge-in, playout, turn latency and connection stats."""
+        return {
+            "upstream_audio": self.upstream_audio.stats(),
+            "local_vad": self.vad.stats() if self.vad is not None else None,
+            "barge_in": self.barge_in.stats() if self.barge_in is not None else None,
+            "playout": self.playout.stats(),
+            "turn_latency": self.turn_tracer.stats(),
+            "connection": self.connection.stats(),
+        }
+
+    def _collect_metrics(self) -> Iterable[Sample]:
+        yield "agent_playout_buffered_milliseconds", {}, self.playout.buffered_ms
+        if self.connection.outbound is not None:
+            yield "realtime_send_queue_depth", {}, self.connection.outbound.depth
+            yield "realtime_send_queue_audio_milliseconds", {}, self.connection.outbound.stats()["queued_audio_ms"]
 
     async def rtc_to_model(self) -> None:
         while self.subscribe_user is None or self.channel.get_audio_frames(self.subscribe_user) is None:
@@ -225,9 +341,22 @@ class RealtimeKitAgent:
 
         try:
             async for audio_frame in audio_frames:
+                received_at = time.monotonic()
+                if self.barge_in is not None and self.barge_in.process(audio_frame.data, self.playout.is_playing):
+                    logger.info("TMS:LocalBargeIn: user speech detected during playback")
+                    await self.interrupt(cancel_response=True)
+
                 # Process received audio (send to model)
-                _monitor_queue_size(self.audio_queue, "audio_queue")
-                await self.connection.send_audio_data(audio_frame.data)
+                if self.vad is None:
+                    self.turn_tracer.audio_sent(len(audio_frame.data), received_at)
+                    await self.upstream_audio.push(audio_frame.data)
+                else:
+                    was_speaking = self.vad.speaking
+                    for frame in self.vad.process(audio_frame.data):
+                        self.turn_tracer.audio_sent(len(frame), received_at)
+                        await self.upstream_audio.push(frame)
+                    if self.vad.speaking != was_speaking:
+                        await self.upstream_audio.on_speech_boundary()
 
                 # Write PCM data if enabled
                 await pcm_writer.write(audio_frame.data)
@@ -237,37 +366,92 @@ class RealtimeKitAgent:
         except asyncio.CancelledError:
             # Write any remaining PCM data before exiting
             await pcm_writer.flush()
+            logger.info(f"Upstream audio stats: {self.upstream_audio.stats()}")
+            if self.vad is not None:
+                logger.info(f"Local VAD stats: {self.vad.stats()}")
+            if self.barge_in is not None:
+                logger.info(f"Barge-in stats: {self.barge_in.stats()}")
             raise  # Re-raise the exception to propagate cancellation
 
     async def model_to_rtc(self) -> None:
         # Initialize PCMWriter for sending audio
         pcm_writer = PCMWriter(prefix="model_to_rtc", write_pcm=self.write_pcm)
 
-        try:
-            while True:
-                # Get audio frame from the model output
-                frame = await self.audio_queue.get()
-
-                # Process sending audio (to RTC)
-                await self.channel.push_audio_frame(frame)
+        async def push_frame(frame: bytes) -> None:
+            # Process sending audio (to RTC)
+            await self.channel.push_audio_frame(frame)
+            if self.on_first_audio is not None:
+                self.on_first_audio()
+                self.on_first_audio = None
+            item_id, content_index, audio_bytes = self.playout.last_frame_source
+            self.playout_tracker.record(item_id, content_index, audio_bytes, len(frame))
+            self.turn_tracer.frame_pushed()
+            if self.barge_in is not None:
+                self.barge_in.observe_playback(frame)
+
+            # Write PCM data if enabled
+            await pcm_writer.write(frame)
 
-                # Write PCM data if enabled
-                await pcm_writer.write(frame)
+        try:
+            # Paced, fixed-size frames from the model output
+            await self.playout.run(push_frame)
 
         except asyncio.CancelledError:
             # Write any remaining PCM data before exiting
             await pcm_writer.flush()
+            logger.info(f"Playout stats: {self.playout.stats()}")
+            logger.info(f"TMS:TurnLatency: {self.turn_tracer.stats()}")
             raise  # Re-raise the cancelled exception to properly exit the task
 
+    async def interrupt(self, cancel_response: bool) -> None:
+        """Stop playback now and truncate the item at what the user actually heard.
+
+        `cancel_response` sends ResponseCancel for an active response. Only a local
+        barge-in needs it; on speech_started server VAD has cancelled it already.
+        """
+        if self.current_response_id is not None and self.interrupted_response_id == self.current_response_id:
+            return  # already interrupted, e.g. locally before the server's speech_started arrived
+        audible = self.response_active or self.playout.is_playing or self.playout_tracker.unheard_ms() > 0
+        heard = self.playout_tracker.heard(self.current_response_id) if audible else None
+        # Late deltas of the interrupted response must not refill the playout buffer
+        self.interrupted_response_id = self.current_response_id
+        self.playout.flush()
+        await self.channel.clear_sender_audio_buffer()
+        self.playout_tracker.reset()
+        if cancel_response and self.response_active:
+            await self.connection.send_request(ResponseCancel())
+        if heard is not None:
+            item_id, content_index, audio_end_ms = heard
+            await self.connection.send_request(
+                ItemTruncate(item_id=item_id, content_index=content_index, audio_end_ms=audio_end_ms)
+            )
+            logger.info(f"TMS:ItemTruncate: item_id: {item_id}, audio_end_ms: {audio_end_ms}")
+
+    def _on_model_reconnect(self) -> None:
+        # Whatever was in flight on the old socket is gone: play out what arrived and start a fresh turn
+        self.response_active = False
+        self.playout.end_of_stream()
+        self.turn_tracer.session_restarted()
+
     async def _process_model_messages(self) -> None:
         async for message in self.connection.listen():
             # logger.info(f"Received message {message=}")
             match message:
+                case LazyResponseAudioDelta():
+                    if message.response_id == self.interrupted_response_id:
+                        continue
+                    self.turn_tracer.mark("first_delta")
+                    self.playout_tracker.assign(message.item_id, message.response_id)
+                    self.playout.write(message.decode(), message.item_id, message.content_index)
+                    logger.debug("TMS:ResponseAudioDelta: response_id:%s,item_id: %s", message.response_id, message.item_id)
                 case ResponseAudioDelta():
                     # logger.info("Received audio message")
-                    self.audio_queue.put_nowait(base64.b64decode(message.delta))
-                    # loop.call_soon_threadsafe(self.audio_queue.put_nowait, base64.b64decode(message.delta))
-                    logger.debug(f"TMS:ResponseAudioDelta: response_id:{message.response_id},item_id: {message.item_id}")
+                    if message.response_id == self.interrupted_response_id:
+                        continue
+                    self.turn_tracer.mark("first_delta")
+                    self.playout_tracker.assign(message.item_id, message.response_id)
+                    self.playout.write(base64.b64decode(message.delta), message.item_id, message.content_index)
+                    logger.debug("TMS:ResponseAudioDelta: response_id:%s,item_id: %s", message.response_id, message.item_id)
                 case ResponseAudioTranscriptDelta():
                     # logger.info(f"Received text message {message=}")
                     asyncio.create_task(self.channel.chat.send_message(
@@ -287,12 +471,13 @@ class RealtimeKitAgent:
                     ))
                     
                 case InputAudioBufferSpeechStarted():
-                    await self.channel.clear_sender_audio_buffer()
-                    # clear the audio queue so audio stops playing
-                    while not self.audio_queue.empty():
-                        self.audio_queue.get_nowait()
+                    self.turn_tracer.speech_started()
+                    # stop playing audio and truncate the item at what the user heard; server VAD has
+                    # already cancelled the response
+                    await self.interrupt(cancel_response=False)
                     logger.info(f"TMS:InputAudioBufferSpeechStarted: item_id: {message.item_id}")
                 case InputAudioBufferSpeechStopped():
+                    self.turn_tracer.speech_stopped(message.audio_end_ms)
                     logger.info(f"TMS:InputAudioBufferSpeechStopped: item_id: {message.item_id}")
                     pass
                 case ItemInputAudioTranscriptionCompleted():
@@ -304,15 +489,17 @@ class RealtimeKitAgent:
                     ))
                 #  InputAudioBufferCommitted
                 case InputAudioBufferCommitted():
-                    pass
+                    self.turn_tracer.mark("committed")
                 case ItemCreated():
                     pass
                 # ResponseCreated
                 case ResponseCreated():
-                    pass
+                    self.turn_tracer.mark("response_created")
+                    self.response_active = True
+                    self.current_response_id = message.response.id
                 # ResponseDone
                 case ResponseDone():
-                    pass
+                    self.response_active = False
 
                 # ResponseOutputItemAdded
                 case ResponseOutputItemAdded():
@@ -323,16 +510,24 @@ class RealtimeKitAgent:
                     pass
                 # ResponseAudioDone
                 case ResponseAudioDone():
-                    pass
+                    self.playout.end_of_stream()
                 # ResponseContentPartDone
                 case ResponseContentPartDone():
                     pass
                 # ResponseOutputItemDone
                 case ResponseOutputItemDone():
                     pass
+                case SessionCreated():
+                    pass
                 case SessionUpdated():
                     pass
                 case RateLimitsUpdated():
                     pass
                 case _:
                     logger.warning(f"Unhandled message {message=}")
+
+        logger.info(f"Realtime API connection stats: {self.connection.stats()}")
+        if not self.connection.connected:
+            # The model side is gone for good; end the call rather than leave the user in dead air
+            logger.error("Realtime API connection closed, disconnecting from the channel")
+            await self.channel.disconnect()
@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Process, Queue
+from typing import Any
+
+from attr import dataclass
+
+from agora_realtime_ai_api.rtc import RtcEngine, RtcOptions
+
+from .agent import InferenceConfig, RealtimeKitAgent, build_session_update
+from .logger import setup_logger
+from .loop_monitor import monitoring_event_loop
+from .metrics import exporting_metrics
+from .realtime.client_session import close_shared_client_session
+from .realtime.connection_pool import RealtimeConnectionPool
+from .realtime.struct import PCM_CHANNELS, PCM_SAMPLE_RATE
+from .tracing import startup_latency
+from .utils import wait_for_process
+
+# Set up the logger with color and timestamp support
+logger = setup_logger(name=__name__, log_level=logging.INFO)
+
+
+@dataclass(frozen=True, kw_only=True)
+class AgentPoolConfig:
+    """Pre-forked agent processes kept ready for /start_agent in process-per-call mode."""
+
+    size: int = 0  # Idle processes kept warm; 0 forks a fresh process per call
+    warm_connection: bool = True  # Each idle process also holds an open realtime API websocket with the default session applied
+
+    @classmethod
+    def from_env(cls) -> "AgentPoolConfig":
+        return cls(
+            size=int(os.environ.get("AGENT_POOL_SIZE") or 0),
+            warm_connection=os.environ.get("AGENT_POOL_WARM_CONNECTION", "true") == "true",
+        )
+
+
+def run_pooled_agent_process(
+    engine_app_id: str,
+    engine_app_cert: str,
+    default_inference_config: InferenceConfig | None,
+    assignments: Queue,
+    events: Queue,
+) -> None:
+    """Warm up, then wait for a single channel assignment and run the agent for it."""
+
+    async def main() -> None:
+        pid = os.getpid()
+        engine = RtcEngine(appid=engine_app_id, appcert=engine_app_cert)
+        connection_pool = None
+        if default_inference_config is not None:
+            # A pool of one keeps the idle socket healthy and replaces it before its session expires
+            connection_pool = RealtimeConnectionPool(
+                build_session_update(default_inference_config, None).session,
+                base_uri=os.getenv("REALTIME_API_BASE_URI", "wss://api.openai.com"),
+                api_key=os.getenv("OPENAI_API_KEY"),
+                size=1,
+                reconnect=default_inference_config.reconnect,
+                single_use=True,  # This process serves one call: don't replace the socket it takes
+            )
+            await connection_pool.start()
+            if not connection_pool.idle:
+                logger.warning(f"Pooled agent {pid}: could not open warm connection, will connect on start")
+        events.put(("ready", pid))
+
+        channel_name, uid, inference_config, assigned_at = await asyncio.to_thread(assignments.get)
+        logger.info(f"Pooled agent {pid}: assigned channel {channel_name}")
+
+        def on_first_audio() -> None:
+            events.put(("first_audio", pid, channel_name, time.time() - assigned_at))
+
+        try:
+            # Takes the warm socket if it is still usable and sends only the session fields that differ
+            await RealtimeKitAgent.setup_and_run_agent(
+                engine=engine,
+                options=RtcOptions(
+                    channel_name=channel_name,
+                    uid=uid,
+                    sample_rate=PCM_SAMPLE_RATE,
+                    channels=PCM_CHANNELS,
+                    enable_pcm_dump=os.environ.get("WRITE_RTC_PCM", "false") == "true",
+                ),
+                inference_config=inference_config,
+                tools=None,
+                on_first_audio=on_first_audio,
+                connection_pool=connection_pool,
+            )
+        finally:
+            if connection_pool is not None:
+                await connection_pool.close()
+
+    async def run() -> None:
+        try:
+            async with exporting_metrics("pooled_agent"), monitoring_event_loop():
+                await main()
+        finally:
+            await close_shared_client_session()
+
+    asyncio.run(run())
+
+
+class PooledProcess:
+    def __init__(self, process: Process, assignments: Queue) -> None:
+        self.process = process
+        self.assignments = assignments
+
+
+class AgentProcessPool:
+    """Keeps `size` agent processes forked, imported and initialized ahead of /start_agent.
+
+    `acquire()` hands an idle process its channel and returns it, then a
+    replacement is forked in the background. Startup-to-first-audio latency,
+    measured from the hand-off to the first frame pushed to RTC, is recorded in
+    `tracing.startup_latency` as "first_audio".
+    """
+
+    def __init__(
+        self,
+        engine_app_id: str,
+        engine_app_cert: str,
+        config: AgentPoolConfig,
+        default_inference_config: InferenceConfig,
+    ) -> None:
+        self.engine_app_id = engine_app_id
+        self.engine_app_cert = engine_app_cert
+        self.config = config
+        self.default_inference_config = default_inference_config
+        self.idle: deque[PooledProcess] = deque()
+        self.events: Queue = Queue()
+        # events.get blocks for the pool's lifetime; a thread of its own keeps it from starving the default executor
+        self._events_reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="agent-pool-events")
+        self.acquired = 0
+        self.misses = 0
+        self._ready_pids: set[int] = set()  # may arrive before _fork has registered the process
+        self._refills: set[asyncio.Task[Any]] = set()
+        self._watcher: asyncio.Task[Any] | None = None
+        self._closing = False
+
+    def start(self) -> None:
+        for _ in range(self.config.size):
+            self._refill()
+        self._watcher = asyncio.create_task(self._watch_events())
+        logger.info(f"Agent process pool started with {self.config.size} processes")
+
+    def acquire(self, channel_name: str, uid: int, inference_config: InferenceConfig) -> Process | None:
+        """Hand the channel to an idle process, preferring fully warmed ones; None if the pool is empty."""
+        while self.idle:
+            pooled = next((p for p in self.idle if p.process.pid in self._ready_pids), self.idle[0])
+            self.idle.remove(pooled)
+            self._ready_pids.discard(pooled.process.pid)
+            self._refill()
+            if not pooled.process.is_alive():
+                continue
+            pooled.assignments.put((channel_name, uid, inference_config, time.time()))
+            self.acquired += 1
+            return pooled.process
+        self.misses += 1
+        return None
+
+    def stats(self) -> dict[str, Any]:
+        first_audio = startup_latency.percentiles("first_audio", (0.5, 0.95))
+        return {
+            "size": self.config.size,
+            "idle": len(self.idle),
+            "ready": sum(1 for p in self.idle if p.process.pid in self._ready_pids),
+            "acquired": self.acquired,
+            "misses": self.misses,
+            "first_audio_ms_p50": first_audio["p50"],
+            "first_audio_ms_p95": first_audio["p95"],
+        }
+
+    async def shutdown(self) -> None:
+        self._closing = True
+        for task in self._refills:
+            task.cancel()
+        for pooled in self.idle:
+            if pooled.process.is_alive():
+                pooled.process.kill()
+            await wait_for_process(pooled.process)
+        self.idle.clear()
+        if self._watcher is not None:
+            self._watcher.cancel()
+        self.events.put(None)  # unblock the thread waiting in _watch_events
+        self._events_reader.shutdown(wait=False)
+
+    def _refill(self) -> None:
+        if self._closing:
+            return
+        task = asyncio.create_task(self._fork())
+        self._refills.add(task)
+        task.add_done_callback(self._refills.discard)
+
+    async def _fork(self) -> None:
+        assignments: Queue = Queue()
+        process = Process(
+            target=run_pooled_agent_process,
+            args=(
+                self.engine_app_id,
+                self.engine_app_cert,
+                self.default_inference_config if self.config.warm_connection else None,
+                assignments,
+                self.events,
+            ),
+        )
+        # Forking can take tens of milliseconds; keep it off the event loop
+        await asyncio.to_thread(process.start)
+        self.idle.append(PooledProcess(process, assignments))
+
+    async def _watch_events(self) -> None:
+        while True:
+            event = await asyncio.get_running_loop().run_in_executor(self._events_reader, self.events.get)
+            if event is None:
+                return
+            kind, pid, *args = event
+            if kind == "ready":
+                self._ready_pids.add(pid)
+            elif kind == "first_audio":
+                channel_name, seconds = args
+                startup_latency.observe("first_audio", seconds * 1000)
+                logger.info(f"TMS:FirstAudio: channel {channel_name} startup to first audio {seconds * 1000:.0f} ms")
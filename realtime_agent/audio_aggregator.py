@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+from attr import dataclass
+
+from .logger import setup_logger
+from .realtime.struct import PCM_CHANNELS, PCM_SAMPLE_RATE
+from .tracing import upstream_batch_delay
+
+# Set up the logger with color and timestamp support
+logger = setup_logger(name=__name__, log_level=logging.INFO)
+
+PCM_BYTES_PER_MS = PCM_SAMPLE_RATE * PCM_CHANNELS * 2 // 1000
+
+
+@dataclass(frozen=True, kw_only=True)
+class UpstreamAudioConfig:
+    """Flush policy for batching RTC frames into larger input_audio_buffer.append messages."""
+
+    flush_ms: int = 40  # Send once this much audio is buffered; 0 sends every frame as it arrives
+    max_delay_ms: int = 60  # Never hold the oldest buffered audio longer than this
+
+    @property
+    def flush_bytes(self) -> int:
+        return self.flush_ms * PCM_BYTES_PER_MS
+
+
+class UpstreamAudioAggregator:
+    """Accumulates pcm into a preallocated buffer and sends it in larger chunks.
+
+    A chunk is sent when `flush_ms` of audio is buffered, when the oldest
+    buffered byte is `max_delay_ms` old, or immediately on `flush()` (e.g. when
+    the local VAD sees speech end). The delay each chunk added is recorded in
+    `tracing.upstream_batch_delay`.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[bytes], Awaitable[Any]],
+        config: UpstreamAudioConfig,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._send = send
+        self.config = config
+        self._clock = clock
+        self._buffer = bytearray(max(config.flush_bytes, 1))
+        self._view = memoryview(self._buffer)
+        self._length = 0
+        self._oldest: float | None = None
+        self._deadline: asyncio.TimerHandle | None = None
+        self._deadline_flush: asyncio.Task[None] | None = None
+        self._lock = asyncio.Lock()
+
+        self.frames_in = 0
+        self.flushes = 0
+        self.bytes_sent = 0
+        self.total_added_latency_ms = 0.0
+        self.max_added_latency_ms = 0.0
+
+    async def push(self, pcm: bytes) -> None:
+        self.frames_in += 1
+        if self.config.flush_bytes <= 0:
+            await self._send_chunk(pcm, 0.0)
+            return
+
+        data = memoryview(pcm)
+        while data:
+            if self._length == 0:
+                self._oldest = self._clock()
+                self._schedule_deadline()
+            size = min(len(data), len(self._buffer) - self._length)
+            self._view[self._length:self._length + size] = data[:size]
+            self._length += size
+            data = data[size:]
+            if self._length == len(self._buffer):
+                await self.flush()
+
+        if self._length and self._clock() - self._oldest >= self.config.max_delay_ms / 1000:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Send whatever is buffered right away."""
+        async with self._lock:
+            if not self._length:
+                return
+            chunk = bytes(self._view[:self._length])
+            delay_ms = (self._clock() - self._oldest) * 1000
+            self._length = 0
+            self._oldest = None
+            if self._deadline is not None:
+                self._deadline.cancel()
+                self._deadline = None
+            await self._send_chunk(chunk, delay_ms)
+
+    async def on_speech_boundary(self) -> None:
+        """The local VAD saw speech start or stop: send the buffered audio now rather than at the deadline."""
+        await self.flush()
+
+    def close(self) -> None:
+        """Stop the deadline flush; buffered audio is discarded. Call before the connection is closed."""
+        if self._deadline is not None:
+            self._deadline.cancel()
+            self._deadline = None
+        if self._deadline_flush is not None:
+            self._deadline_flush.cancel()
+            self._deadline_flush = None
+
+    def stats(self) -> dict[str, Any]:
+        """Flush counts and the latency the batching added, measured on the oldest byte of each chunk."""
+        return {
+            "flush_ms": self.config.flush_ms,
+            "max_delay_ms": self.config.max_delay_ms,
+            "frames_in": self.frames_in,
+            "messages_out": self.flushes,
+            "bytes_out": self.bytes_sent,
+            "frames_per_message": self.frames_in / self.flushes if self.flushes else 0.0,
+            "mean_added_latency_ms": self.total_added_latency_ms / self.flushes if self.flushes else 0.0,
+            "max_added_latency_ms": self.max_added_latency_ms,
+        }
+
+    async def _send_chunk(self, chunk: bytes, delay_ms: float) -> None:
+        self.flushes += 1
+        self.bytes_sent += len(chunk)
+        self.total_added_latency_ms += delay_ms
+        self.max_added_latency_ms = max(self.max_added_latency_ms, delay_ms)
+        upstream_batch_delay.observe("oldest_byte", delay_ms)
+        await self._send(chunk)
+
+    def _schedule_deadline(self) -> None:
+        if self._deadline is not None:
+            self._deadline.cancel()
+        loop = asyncio.get_running_loop()
+        self._deadline = loop.call_later(self.config.max_delay_ms / 1000, self._on_deadline)
+
+    def _on_deadline(self) -> None:
+        # No new frame arrived before the deadline (e.g. the RTC stream paused)
+        self._deadline = None
+        self._deadline_flush = asyncio.create_task(self.flush())
+        self._deadline_flush.add_done_callback(self._on_deadline_flush_done)
+
+    def _on_deadline_flush_done(self, task: asyncio.Task[None]) -> None:
+        if self._deadline_flush is task:
+            self._deadline_flush = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Deadline flush of upstream audio failed: {task.exception()!r}")
@@ -0,0 +1,76 @@
+import time
+from typing import Any, Callable
+
+from attr import dataclass
+
+from .vad import LocalVADConfig, PCM_BYTES_PER_MS, frame_features
+
+
+@dataclass(frozen=True, kw_only=True)
+class BargeInConfig:
+    """Local detection of the user talking over the agent."""
+
+    vad: LocalVADConfig = LocalVADConfig()  # Base speech thresholds, shared with the upstream VAD
+    min_speech_ms: int = 120  # Continuous speech required before cutting playback
+    echo_margin_db: float = 8.0  # Extra level required while the agent is speaking
+    echo_return_loss_db: float = 20.0  # Expected attenuation of agent audio leaking back into the microphone
+    cooldown_ms: int = 1000  # Ignore further detections for this long after a barge-in
+
+
+class BargeInDetector:
+    """Detects user speech on the incoming RTC audio while the agent is speaking.
+
+    While playback is active the speech threshold is raised by `echo_margin_db`
+    and kept above the expected echo of the agent's own audio (the level of the
+    most recent playback frame minus `echo_return_loss_db`), so residual echo
+    does not cut the agent off.
+    """
+
+    def __init__(self, config: BargeInConfig, clock: Callable[[], float] = time.monotonic) -> None:
+        self.config = config
+        self._clock = clock
+        self._speech_ms = 0.0
+        self._playback_level_db = -120.0
+        self._cooldown_until = 0.0
+
+        self.detections = 0
+        self.frames_checked = 0
+
+    def observe_playback(self, frame: bytes) -> None:
+        """Record the level of a frame pushed to RTC, used as the echo reference."""
+        # Decay slowly (1 dB per frame) so the reference still covers echo arriving a round-trip later
+        self._playback_level_db = max(frame_features(frame)[0], self._playback_level_db - 1.0)
+
+    def threshold_db(self, agent_speaking: bool) -> float:
+        threshold = self.config.vad.energy_threshold_db
+        if agent_speaking:
+            threshold = max(
+                threshold + self.config.echo_margin_db,
+                self._playback_level_db - self.config.echo_return_loss_db + self.config.echo_margin_db,
+            )
+        return threshold
+
+    def process(self, frame: bytes, agent_speaking: bool) -> bool:
+        """Feed one incoming frame; returns True when a barge-in should interrupt playback."""
+        if not agent_speaking:
+            self._speech_ms = 0.0
+            return False
+
+        self.frames_checked += 1
+        level_db, zero_crossing_rate = frame_features(frame)
+        threshold = self.threshold_db(agent_speaking)
+        speech = level_db >= threshold + self.config.vad.loud_margin_db or (
+            level_db >= threshold and zero_crossing_rate <= self.config.vad.max_zero_crossing_rate
+        )
+        self._speech_ms = self._speech_ms + len(frame) / PCM_BYTES_PER_MS if speech else 0.0
+
+        now = self._clock()
+        if self._speech_ms >= self.config.min_speech_ms and now >= self._cooldown_until:
+            self._speech_ms = 0.0
+            self._cooldown_until = now + self.config.cooldown_ms / 1000
+            self.detections += 1
+            return True
+        return False
+
+    def stats(self) -> dict[str, Any]:
+        return {"detections": self.detections, "frames_checked": self.frames_checked}
@@ -1,8 +1,190 @@
+import atexit
+import contextvars
+import json
 import logging
-from datetime import datetime
+import logging.handlers
+import os
+import queue
+import random
+import time
+import weakref
+from multiprocessing.util import Finalize, register_after_fork
+from typing import Any
 
 import colorlog
 
+# "console" writes on the calling thread (the default); "async" hands records to a
+# background thread that writes the usual text; "json" does the same with JSON lines
+LOG_MODE = os.environ.get("AGENT_LOG_MODE", "console")
+
+# Records waiting for the writer thread beyond this are dropped rather than block the caller; errors are never dropped
+LOG_QUEUE_SIZE = int(os.environ.get("AGENT_LOG_QUEUE_SIZE") or 10_000)
+
+_log_context: contextvars.ContextVar[dict[str, Any] | None] = contextvars.ContextVar("log_context", default=None)
+
+log_stats = {"dropped_queue_full": 0, "sampled_out": 0, "rate_limited": 0, "errors_over_capacity": 0}
+
+
+def bind_log_context(**fields: Any) -> None:
+    """Attach fields (e.g. channel, uid) to every record logged from this task and the tasks it creates."""
+    _log_context.set({**(_log_context.get() or {}), **fields})
+
+
+class CustomFormatter(colorlog.ColoredFormatter):
+    """Colored formatter whose timestamps include milliseconds."""
+
+    def formatTime(self, record, datefmt=None):
+        return time.strftime(datefmt or "%Y-%m-%d %H:%M:%S", self.converter(record.created)) + f",{int(record.msecs):03d}"
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the fields bound by `bind_log_context`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **(getattr(record, "context", None) or {}),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """Queues records for the writer thread without formatting them.
+
+    Unlike the stock QueueHandler, `msg % args` is left to the writer thread, so a
+    record costs the caller one contextvar read and a non-blocking put. Arguments
+    are therefore read a little later; don't pass objects that are mutated right
+    after logging.
+
+    When the queue is full, records below ERROR are dropped and counted. An
+    ERROR or CRITICAL record takes the place of the oldest queued record below
+    ERROR, which is counted as dropped instead; if only errors are queued it is
+    added beyond the bound. The caller never waits and never writes itself.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.context = _log_context.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno < logging.ERROR:
+                log_stats["dropped_queue_full"] += 1
+            else:
+                self._enqueue_error(record)
+
+    def _enqueue_error(self, record: logging.LogRecord) -> None:
+        # queue.Queue keeps its items in a deque guarded by `mutex`; replace in place so `get` still sees one item per put
+        log_queue = self.queue
+        with log_queue.mutex:
+            items = log_queue.queue
+            for index, queued in enumerate(items):
+                if isinstance(queued, logging.LogRecord) and queued.levelno < logging.ERROR:
+                    del items[index]
+                    items.append(record)
+                    log_stats["dropped_queue_full"] += 1
+                    break
+            else:
+                items.append(record)
+                log_queue.unfinished_tasks += 1
+                log_stats["errors_over_capacity"] += 1
+                log_queue.not_empty.notify()
+
+
+class DrainingQueueListener(logging.handlers.QueueListener):
+    """QueueListener whose `stop()` waits for room in a full queue instead of raising queue.Full."""
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps `sample_rate` of the records below WARNING and at most `rate_per_s` (bursting to `burst`) below ERROR."""
+
+    def __init__(self, sample_rate: float = 1.0, rate_per_s: float = 0.0, burst: float | None = None) -> None:
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.rate_per_s = rate_per_s
+        self.burst = burst or max(rate_per_s, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR:
+            return True
+        if record.levelno < logging.WARNING and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            log_stats["sampled_out"] += 1
+            return False
+        if self.rate_per_s:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate_per_s)
+            self._updated = now
+            if self._tokens < 1:
+                log_stats["rate_limited"] += 1
+                return False
+            self._tokens -= 1
+        return True
+
+
+def _per_logger_setting(variable: str, name: str) -> float | None:
+    """Value for `name` from e.g. AGENT_LOG_SAMPLING="realtime_agent.agent=0.1,realtime_agent=0.5"; the longest prefix wins."""
+    best, value = -1, None
+    for entry in filter(None, os.environ.get(variable, "").split(",")):
+        prefix, _, setting = entry.partition("=")
+        prefix = prefix.strip()
+        if (name == prefix or name.startswith(prefix + ".")) and len(prefix) > best:
+            best, value = len(prefix), float(setting)
+    return value
+
+
+_listener: logging.handlers.QueueListener | None = None
+_queue_handlers: "weakref.WeakSet[ContextQueueHandler]" = weakref.WeakSet()
+
+
+def _stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        listener, _listener = _listener, None
+        listener.stop()  # writes out whatever is still queued
+
+
+def _start_listener(handler: logging.Handler) -> None:
+    global _listener
+    log_queue: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+    for queue_handler in _queue_handlers:
+        queue_handler.queue = log_queue
+    _listener = DrainingQueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+
+
+def _restart_listener_after_fork() -> None:
+    # The writer thread does not survive fork; give the child its own queue and thread
+    if _listener is not None:
+        _start_listener(_listener.handlers[0])
+
+
+def _register_exit_flush(_: Any = None) -> None:
+    # multiprocessing children leave through os._exit, which skips atexit but runs these finalizers
+    Finalize(None, _stop_listener, exitpriority=0)
+
+
+class _ExitFlush:
+    pass
+
+
+_exit_flush = _ExitFlush()
+os.register_at_fork(after_in_child=_restart_listener_after_fork)
+# A child's finalizers are cleared when its process starts, then the after-fork hooks run
+register_after_fork(_exit_flush, _register_exit_flush)
+atexit.register(_stop_listener)
+
 
 def setup_logger(
     name: str,
@@ -10,17 +192,25 @@ def setup_logger(
     log_format: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
     use_color: bool = True
 ) -> logging.Logger:
-    """Sets up and returns a logger with color and timestamp support, including milliseconds."""
+    """Sets up and returns a logger with color and timestamp support, including milliseconds.
+
+    With AGENT_LOG_MODE=async or json, records go through a process-wide queue to
+    one writer thread, so logging never writes to the terminal from the event
+    loop. In those modes the format of the first logger set up applies to all.
+    AGENT_LOG_SAMPLING and AGENT_LOG_RATE_LIMIT set per-logger sampling and
+    records per second, see `SamplingFilter`.
+    """
 
     # Create or get a logger with the given name
     logger = logging.getLogger(name)
 
     # Prevent the logger from propagating to the root logger (disable extra output)
     logger.propagate = False
-    
+
     # Clear existing handlers to avoid duplicate messages
     if logger.hasHandlers():
         logger.handlers.clear()
+    logger.filters.clear()
 
     # Set the log level
     logger.setLevel(log_level)
@@ -28,17 +218,10 @@ def setup_logger(
     # Create console handler
     handler = logging.StreamHandler()
 
-    # Custom formatter for adding milliseconds
-    class CustomFormatter(colorlog.ColoredFormatter):
-        def formatTime(self, record, datefmt=None):
-            record_time = datetime.fromtimestamp(record.created)
-            if datefmt:
-                return record_time.strftime(datefmt) + f",{int(record.msecs):03d}"
-            else:
-                return record_time.strftime("%Y-%m-%d %H:%M:%S") + f",{int(record.msecs):03d}"
-
     # Use custom formatter that includes milliseconds
-    if use_color:
+    if LOG_MODE == "json":
+        formatter = JsonFormatter()
+    elif use_color:
         formatter = CustomFormatter(
             "%(log_color)s" + log_format,
             datefmt="%Y-%m-%d %H:%M:%S",  # Milliseconds will be appended manually
@@ -55,6 +238,20 @@ def setup_logger(
 
     handler.setFormatter(formatter)
 
+    if LOG_MODE in ("async", "json"):
+        queue_handler = ContextQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        _queue_handlers.add(queue_handler)
+        if _listener is None:
+            _start_listener(handler)
+        else:
+            queue_handler.queue = _listener.queue
+        handler = queue_handler
+
+    sample_rate = _per_logger_setting("AGENT_LOG_SAMPLING", name)
+    rate_per_s = _per_logger_setting("AGENT_LOG_RATE_LIMIT", name)
+    if sample_rate is not None or rate_per_s is not None:
+        logger.addFilter(SamplingFilter(sample_rate if sample_rate is not None else 1.0, rate_per_s or 0.0))
+
     # Add the handler to the logger
     logger.addHandler(handler)
 
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+from attr import dataclass
+
+from .logger import setup_logger
+from .metrics import registry
+from .tracing import loop_lag
+
+# Set up the logger with color and timestamp support
+logger = setup_logger(name=__name__, log_level=logging.INFO)
+
+slow_callbacks_total = registry.counter("agent_slow_callbacks_total", "Times the event loop was blocked by one callback for longer than slow_callback_ms.")
+loop_stalls_total = registry.counter("agent_event_loop_stalls_total", "Ticks whose scheduling lag exceeded stall_ms.")
+
+
+@dataclass(frozen=True, kw_only=True)
+class LoopMonitorConfig:
+    """Event-loop lag measurement and slow-callback watchdog for agent processes."""
+
+    enabled: bool = True
+    tick_ms: int = 100  # How often scheduling lag is measured
+    slow_callback_ms: int = 50  # A loop blocked this long gets its current stack captured
+    stall_ms: int = 250  # Lag at which all tasks are dumped to the log
+    dump_cooldown_s: float = 30.0  # Minimum time between task dumps
+    stack_depth: int = 12  # Frames kept per captured stack
+    max_slow_callbacks: int = 20  # Captured stacks kept for stats()
+
+    @classmethod
+    def from_env(cls) -> "LoopMonitorConfig":
+        return cls(
+            enabled=os.environ.get("AGENT_LOOP_MONITOR", "true") == "true",
+            tick_ms=int(os.environ.get("AGENT_LOOP_TICK_MS") or 100),
+            slow_callback_ms=int(os.environ.get("AGENT_SLOW_CALLBACK_MS") or 50),
+            stall_ms=int(os.environ.get("AGENT_LOOP_STALL_MS") or 250),
+        )
+
+
+class LoopMonitor:
+    """Measures scheduling lag of the running loop and captures what blocks it.
+
+    A ticker task sleeps `tick_ms` and records how late it woke up in
+    `tracing.loop_lag`. A watchdog thread checks the ticker's heartbeat. When the
+    loop has been stuck for `slow_callback_ms`, it takes the loop thread's stack
+    from `sys._current_frames()`, which names the blocking code while it is still
+    running. Unlike asyncio debug mode this adds no cost per callback, so it can
+    stay on in production. Once the loop catches up after a lag of at least
+    `stall_ms`, the ticker logs every task and where it is suspended.
+    """
+
+    def __init__(self, config: LoopMonitorConfig) -> None:
+        self.config = config
+        self.slow_callbacks: deque[dict[str, Any]] = deque(maxlen=config.max_slow_callbacks)
+        self.last_task_dump: list[str] = []
+        self._beat = time.monotonic()
+        self._reported_beat = 0.0
+        self._last_dump = 0.0
+        self._loop_thread_id = 0
+        self._stop = threading.Event()
+        self._ticker: asyncio.Task[None] | None = None
+        self._watchdog: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Start monitoring the running loop; call from a coroutine on it."""
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._ticker = asyncio.create_task(self._tick(), name="loop-monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._ticker is not None:
+            self._ticker.cancel()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "lag_ms": loop_lag.percentiles("tick"),
+            "slow_callbacks": int(slow_callbacks_total.value),
+            "stalls": int(loop_stalls_total.value),
+        }
+
+    async def _tick(self) -> None:
+        tick_s = self.config.tick_ms / 1000
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(tick_s)
+            now = time.monotonic()
+            self._beat = now
+            lag_ms = max(0.0, (now - started - tick_s) * 1000)
+            loop_lag.observe("tick", lag_ms)
+            if lag_ms >= self.config.stall_ms:
+                loop_stalls_total.inc()
+                if now - self._last_dump >= self.config.dump_cooldown_s:
+                    self._last_dump = now
+                    self._dump_tasks(lag_ms)
+
+    def _watch(self) -> None:
+        tick_s = self.config.tick_ms / 1000
+        while not self._stop.wait(self.config.slow_callback_ms / 2000):
+            beat = self._beat
+            blocked_ms = (time.monotonic() - beat - tick_s) * 1000
+            if blocked_ms < self.config.slow_callback_ms or beat == self._reported_beat:
+                continue
+            self._reported_beat = beat  # one stack per stall
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame, limit=self.config.stack_depth)) if frame is not None else ""
+            slow_callbacks_total.inc()
+            self.slow_callbacks.append({"at": time.time(), "blocked_ms": round(blocked_ms), "stack": stack})
+            logger.warning(f"Event loop blocked for {blocked_ms:.0f} ms so far, in:\n{stack}")
+
+    def _dump_tasks(self, lag_ms: float) -> None:
+        lines = []
+        for task in asyncio.all_tasks():
+            frames = task.get_stack(limit=1)
+            where = (
+                f"{frames[-1].f_code.co_filename}:{frames[-1].f_lineno} in {frames[-1].f_code.co_name}"
+                if frames
+                else "done" if task.done() else "not started"
+            )
+            lines.append(f"{task.get_name()}: {where}")
+        self.last_task_dump = lines
+        logger.warning(f"Event loop lagged {lag_ms:.0f} ms; {len(lines)} tasks:\n  " + "\n  ".join(lines))
+
+
+@asynccontextmanager
+async def monitoring_event_loop(config: LoopMonitorConfig | None = None) -> AsyncIterator[LoopMonitor | None]:
+    """Monitor the running loop for the duration of the block; stats are logged on the way out."""
+    config = config or LoopMonitorConfig.from_env()
+    if not config.enabled:
+        yield None
+        return
+    monitor = LoopMonitor(config)
+    monitor.start()
+    try:
+        yield monitor
+    finally:
+        monitor.stop()
+        logger.info(f"Event loop stats: {monitor.stats()}")
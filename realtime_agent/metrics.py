@@ -0,0 +1,322 @@
+import asyncio
+import json
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Iterable
+
+import psutil
+
+from .logger import log_stats, setup_logger
+from .realtime.struct import decode_stats
+from .tracing import LatencyRecorder, connection_downtime, loop_lag, startup_latency, turn_latency, upstream_batch_delay
+
+# Set up the logger with color and timestamp support
+logger = setup_logger(name=__name__, log_level=logging.INFO)
+
+# (metric name, labels, value)
+Sample = tuple[str, dict[str, str], float]
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class MetricsRegistry:
+    """Process-wide metrics: counters bumped on the hot path, gauges read by collectors, LatencyRecorder histograms.
+
+    Nothing is formatted until `snapshot()`, which turns everything into plain
+    JSON-able lists. Snapshots from several processes can be merged with
+    `merge_snapshots` and rendered in the Prometheus text format with `render`.
+    Live sessions registered with `add_session` are snapshotted too, by name,
+    but kept out of the Prometheus output.
+    """
+
+    def __init__(self) -> None:
+        self.descriptions: dict[str, tuple[str, str]] = {}  # name -> (type, help)
+        self.counters: dict[tuple[str, tuple[tuple[str, str], ...]], Counter] = {}
+        self.collectors: list[Callable[[], Iterable[Sample]]] = []
+        self.histograms: dict[str, tuple[LatencyRecorder, str]] = {}  # name -> (recorder, label for its series names)
+        self.sessions: dict[str, Callable[[], dict[str, Any]]] = {}  # session name -> its stats()
+
+    def describe(self, name: str, help: str, type: str = "gauge") -> None:
+        self.descriptions[name] = (type, help)
+
+    def counter(self, name: str, help: str, **labels: str) -> Counter:
+        self.describe(name, help, "counter")
+        return self.counters.setdefault((name, tuple(sorted(labels.items()))), Counter())
+
+    def histogram(self, name: str, help: str, recorder: LatencyRecorder, label: str) -> None:
+        self.describe(name, help, "histogram")
+        self.histograms[name] = (recorder, label)
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        """`collector` is called at every snapshot and returns gauge (or counter) samples described beforehand."""
+        self.collectors.append(collector)
+
+    def remove_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        if collector in self.collectors:
+            self.collectors.remove(collector)
+
+    def add_session(self, name: str, stats: Callable[[], dict[str, Any]]) -> None:
+        """Make a live session's `stats()` queryable by name, e.g. its channel."""
+        self.sessions[name] = stats
+
+    def remove_session(self, name: str) -> None:
+        self.sessions.pop(name, None)
+
+    def reset(self) -> None:
+        """Zero every counter and histogram and drop collectors and sessions; descriptions are kept."""
+        for counter in self.counters.values():
+            counter.value = 0.0
+        for recorder, _ in self.histograms.values():
+            recorder.clear()
+        self.collectors.clear()
+        self.sessions.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        samples = [[name, dict(labels), counter.value] for (name, labels), counter in self.counters.items()]
+        for collector in self.collectors:
+            try:
+                samples.extend([name, labels, value] for name, labels, value in collector())
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+        histograms = [
+            [name, {label: series}, list(recorder.buckets), recorder.bucket_counts[series], recorder.sums[series]]
+            for name, (recorder, label) in self.histograms.items()
+            for series in recorder.counts
+        ]
+        sessions = {}
+        for name, stats in self.sessions.items():
+            try:
+                sessions[name] = stats()
+            except Exception as e:
+                logger.warning(f"Session stats for {name} failed: {e}")
+        return {"descriptions": self.descriptions, "samples": samples, "histograms": histograms, "sessions": sessions}
+
+
+def merge_snapshots(snapshots: Iterable[dict[str, Any]]) -> dict[str, Any]:
+    """Add up samples and histogram buckets with the same name and labels; sessions are combined by name."""
+    descriptions: dict[str, Any] = {}
+    samples: dict[tuple, list] = {}
+    histograms: dict[tuple, list] = {}
+    sessions: dict[str, Any] = {}
+    for snapshot in snapshots:
+        descriptions.update(snapshot["descriptions"])
+        sessions.update(snapshot.get("sessions", {}))
+        for name, labels, value in snapshot["samples"]:
+            key = (name, tuple(sorted(labels.items())))
+            if key in samples:
+                samples[key][2] += value
+            else:
+                samples[key] = [name, labels, value]
+        for name, labels, bounds, counts, total in snapshot["histograms"]:
+            key = (name, tuple(sorted(labels.items())))
+            if key in histograms:
+                merged = histograms[key]
+                merged[3] = [a + b for a, b in zip(merged[3], counts)]
+                merged[4] += total
+            else:
+                histograms[key] = [name, labels, bounds, list(counts), total]
+    return {
+        "descriptions": descriptions,
+        "samples": list(samples.values()),
+        "histograms": list(histograms.values()),
+        "sessions": sessions,
+    }
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict[str, str], **extra: Any) -> str:
+    parts = [f'{key}="{_escape(value)}"' for key, value in {**labels, **extra}.items()]
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def render(snapshot: dict[str, Any]) -> str:
+    """Prometheus text exposition format (version 0.0.4)."""
+    by_name: dict[str, list[str]] = {}
+    for name, labels, value in snapshot["samples"]:
+        by_name.setdefault(name, []).append(f"{name}{_labels(labels)} {value}")
+    for name, labels, bounds, counts, total in snapshot["histograms"]:
+        lines = by_name.setdefault(name, [])
+        cumulative = 0
+        for bound, count in zip([*bounds, "+Inf"], counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(labels, le=bound)} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} {total}")
+        lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+
+    out = []
+    for name, lines in by_name.items():
+        type, help = snapshot["descriptions"].get(name, ("untyped", ""))
+        out.append(f"# HELP {name} {help}")
+        out.append(f"# TYPE {name} {type}")
+        out.extend(lines)
+    return "\n".join(out) + "\n"
+
+
+# Metrics of this process
+registry = MetricsRegistry()
+registry.histogram("agent_startup_latency_milliseconds", "Agent startup time per phase.", startup_latency, "phase")
+registry.histogram("agent_turn_latency_milliseconds", "Conversational turn latency per step, see TurnTracer.", turn_latency, "step")
+registry.histogram("realtime_reconnect_downtime_milliseconds", "Realtime API websocket downtime per reconnect.", connection_downtime, "kind")
+registry.histogram("agent_event_loop_lag_milliseconds", "Event-loop scheduling lag, sampled every tick.", loop_lag, "probe")
+registry.histogram("agent_upstream_batch_delay_milliseconds", "Delay upstream audio batching added per chunk sent.", upstream_batch_delay, "measured_on")
+
+registry.describe("agent_log_records_dropped_total", "Log records not written, by reason; see realtime_agent.logger.", "counter")
+registry.describe("agent_log_errors_over_capacity_total", "ERROR records queued beyond the log queue bound because only errors were waiting.", "counter")
+registry.describe("realtime_decode_conversion_failures_total", "Message fields or messages that failed to convert to their dataclass and were decoded as None.", "counter")
+
+
+def collect_log_stats() -> Iterable[Sample]:
+    for reason in ("dropped_queue_full", "sampled_out", "rate_limited"):
+        yield "agent_log_records_dropped_total", {"reason": reason}, log_stats[reason]
+    yield "agent_log_errors_over_capacity_total", {}, log_stats["errors_over_capacity"]
+
+
+def collect_decode_stats() -> Iterable[Sample]:
+    yield "realtime_decode_conversion_failures_total", {}, decode_stats["conversion_failures"]
+
+
+registry.add_collector(collect_log_stats)
+registry.add_collector(collect_decode_stats)
+
+
+def _reset_after_fork() -> None:
+    # A forked agent process exports its own snapshot, which the server adds to its own. Without this the
+    # child would re-export the server's counts, and run collectors such as the server's process
+    # bookkeeping, which only works in the parent.
+    registry.reset()
+    for key in log_stats:
+        log_stats[key] = 0
+    decode_stats["conversion_failures"] = 0
+    registry.add_collector(collect_log_stats)
+    registry.add_collector(collect_decode_stats)
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _write_atomic(path: str, payload: str) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(payload)
+    os.replace(tmp, path)
+
+
+@asynccontextmanager
+async def exporting_metrics(role: str, interval_s: float | None = None) -> AsyncIterator[None]:
+    """Periodically write this process's snapshot to $AGENT_METRICS_DIR for the server's /metrics to merge.
+
+    Does nothing when AGENT_METRICS_DIR is unset, e.g. for an agent run from the command line.
+    A final snapshot is written on the way out so short sessions are still counted.
+    """
+    directory = os.environ.get("AGENT_METRICS_DIR")
+    if not directory:
+        yield
+        return
+    interval_s = interval_s or float(os.environ.get("AGENT_METRICS_EXPORT_S") or 5)
+    path = os.path.join(directory, f"{os.getpid()}.json")
+
+    def payload() -> str:
+        return json.dumps({"pid": os.getpid(), "role": role, "snapshot": registry.snapshot()})
+
+    async def export() -> None:
+        while True:
+            await asyncio.sleep(interval_s)
+            # Taken on the loop, where the collected objects live; only the file write leaves it
+            await asyncio.to_thread(_write_atomic, path, payload())
+
+    task = asyncio.create_task(export())
+    try:
+        yield
+    finally:
+        task.cancel()
+        try:
+            _write_atomic(path, payload())
+        except OSError as e:
+            logger.warning(f"Failed to write final metrics snapshot: {e}")
+
+
+class MetricsAggregator:
+    """Server-side merge of its own registry with the snapshots agent processes export to `directory`.
+
+    Snapshots of processes that have exited are folded into a retired total and
+    deleted, so counters and histograms never go backwards; their gauges are
+    dropped. CPU and RSS of every live agent process are read here with psutil.
+    The file and process reads run in a worker thread, off the server's event loop.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.retired: dict[str, Any] = {"descriptions": {}, "samples": [], "histograms": []}
+        self._processes: dict[int, psutil.Process] = {}
+        # Concurrent scrapes would both fold the same exited process into the retired total
+        self._lock = asyncio.Lock()
+        registry.describe("agent_process_resident_memory_bytes", "Resident memory of each agent process.")
+        registry.describe("agent_process_cpu_seconds_total", "CPU time of each agent process.", "counter")
+        registry.describe("agent_process_threads", "Threads of each agent process.")
+
+    async def collect(self) -> dict[str, Any]:
+        # Taken on the loop, where the collected objects live
+        local = registry.snapshot()
+        async with self._lock:
+            live, process_samples = await asyncio.to_thread(self._read_exports)
+            local["samples"].extend(process_samples)
+            return merge_snapshots([local, self.retired, *live])
+
+    def _read_exports(self) -> tuple[list[dict[str, Any]], list[list]]:
+        live = []
+        roles = {os.getpid(): "server"}
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                with open(entry.path) as f:
+                    exported = json.load(f)
+            except (OSError, ValueError):
+                continue  # being replaced right now; picked up on the next scrape
+            if psutil.pid_exists(exported["pid"]):
+                live.append(exported["snapshot"])
+                roles[exported["pid"]] = exported["role"]
+            else:
+                retired = exported["snapshot"]
+                retired["samples"] = [s for s in retired["samples"] if retired["descriptions"].get(s[0], ("gauge",))[0] == "counter"]
+                retired["sessions"] = {}
+                self.retired = merge_snapshots([self.retired, retired])
+                os.unlink(entry.path)
+        return live, self._process_samples(roles)
+
+    def _process_samples(self, roles: dict[int, str]) -> list[list]:
+        samples = []
+        for pid in list(self._processes):
+            if pid not in roles:
+                del self._processes[pid]
+        for pid, role in roles.items():
+            try:
+                process = self._processes.get(pid) or self._processes.setdefault(pid, psutil.Process(pid))
+                with process.oneshot():
+                    labels = {"pid": str(pid), "role": role}
+                    cpu = process.cpu_times()
+                    samples.append(["agent_process_resident_memory_bytes", labels, process.memory_info().rss])
+                    samples.append(["agent_process_cpu_seconds_total", labels, cpu.user + cpu.system])
+                    samples.append(["agent_process_threads", labels, process.num_threads()])
+            except psutil.Error:
+                self._processes.pop(pid, None)
+        return samples
+
+    async def render(self) -> str:
+        return render(await self.collect())
+
+    async def session(self, name: str) -> dict[str, Any] | None:
+        """Latest stats of the live session `name` in any process, as last exported."""
+        return (await self.collect())["sessions"].get(name)
@@ -1,5 +1,6 @@
 import argparse
 import logging
+import os
 from typing import TypedDict
 
 from .logger import setup_logger
@@ -18,8 +19,38 @@ def parse_args():
     # Create a subparser for actions (server and agent)
     subparsers = parser.add_subparsers(dest="action", required=True)
 
-    # Subparser for the 'server' action (no additional arguments)
-    subparsers.add_parser("server", help="Start the server")
+    # Subparser for the 'server' action
+    server_parser = subparsers.add_parser("server", help="Start the server")
+    server_parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("AGENT_WORKERS") or 0),
+        help="Worker processes hosting many sessions each / default 0 runs one process per call",
+    )
+    server_parser.add_argument(
+        "--sessions_per_worker",
+        type=int,
+        default=int(os.environ.get("AGENT_SESSIONS_PER_WORKER") or 16),
+        help="Max concurrent sessions per worker / default is 16",
+    )
+    server_parser.add_argument(
+        "--warm_connections",
+        type=int,
+        default=int(os.environ.get("AGENT_WARM_CONNECTIONS") or 0),
+        help="Pre-configured realtime API websockets kept open per worker / default is 0",
+    )
+    server_parser.add_argument(
+        "--pool_size",
+        type=int,
+        default=int(os.environ.get("AGENT_POOL_SIZE") or 0),
+        help="Pre-forked agent processes kept warm when not in worker mode / default is 0",
+    )
+    server_parser.add_argument(
+        "--pool_warm_connection",
+        action=argparse.BooleanOptionalAction,
+        default=os.environ.get("AGENT_POOL_WARM_CONNECTION", "true") == "true",
+        help="Pooled processes hold an open realtime API websocket / default is true",
+    )
 
     # Subparser for the 'agent' action (with required arguments)
     agent_parser = subparsers.add_parser("agent", help="Run an agent")
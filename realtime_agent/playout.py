@@ -0,0 +1,237 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable
+
+from attr import dataclass
+
+from .logger import setup_logger
+from .realtime.struct import PCM_CHANNELS, PCM_SAMPLE_RATE
+from .ring_buffer import AudioRingBuffer, OverflowPolicy
+
+# Set up the logger with color and timestamp support
+logger = setup_logger(name=__name__, log_level=logging.INFO)
+
+PCM_BYTES_PER_MS = PCM_SAMPLE_RATE * PCM_CHANNELS * 2 // 1000
+
+
+@dataclass(frozen=True, kw_only=True)
+class PlayoutConfig:
+    """Framing and pacing of model audio pushed to the RTC channel."""
+
+    frame_ms: int = 10  # Size of each frame pushed to RTC (10 or 20 ms)
+    prebuffer_ms: int = 60  # Jitter buffer depth gathered before playback (re)starts
+    lead_ms: int = 40  # How far ahead of the playout clock frames may be pushed
+    capacity_ms: int = 30_000  # Hard cap on buffered audio per session
+    overflow: OverflowPolicy = OverflowPolicy.DropOldest  # What happens to model audio beyond capacity_ms; Block acts as DropNewest
+    use_numpy: bool = False  # Back the ring with a numpy array instead of a bytearray
+
+
+class AudioPlayout:
+    """Re-frames bursty model audio into fixed frames and paces them against a monotonic clock.
+
+    Model deltas are written with `write()`; `run()` pushes fixed-size frames at
+    real-time rate (plus `lead_ms` of headroom). Playback starts once
+    `prebuffer_ms` is buffered; running dry mid-response counts as an underrun and
+    re-buffers, while `end_of_stream()` lets the tail drain, padded with silence.
+    """
+
+    def __init__(self, config: PlayoutConfig, clock: Callable[[], float] = time.monotonic) -> None:
+        self.config = config
+        self._clock = clock
+        self.frame_bytes = config.frame_ms * PCM_BYTES_PER_MS
+        self._ring = AudioRingBuffer(
+            config.capacity_ms * PCM_BYTES_PER_MS, overflow=config.overflow, use_numpy=config.use_numpy
+        )
+        self._data_ready = asyncio.Event()
+        self._playing = False
+        self._draining = False
+        self._epoch = 0.0
+        self._frames_since_epoch = 0
+        # (start offset, item_id, content_index) wherever the source item changes in the stream
+        self._segments: deque[tuple[int, str | None, int]] = deque()
+        self._written_total = 0
+        self._read_total = 0
+        # (item_id, content_index, bytes of model audio) in the frame most recently handed to `push`
+        self.last_frame_source: tuple[str | None, int, int] = (None, 0, 0)
+
+        self.frames_pushed = 0
+        self.underruns = 0
+        self.overruns = 0
+        self.flushes = 0
+
+    @property
+    def buffered_ms(self) -> float:
+        return len(self._ring) / PCM_BYTES_PER_MS
+
+    @property
+    def is_playing(self) -> bool:
+        """Whether model audio is being (or is about to be) played to the user."""
+        return self._playing or len(self._ring) > 0
+
+    def write(self, pcm: bytes, item_id: str | None = None, content_index: int = 0) -> None:
+        """Buffer model audio without waiting.
+
+        The caller is the websocket reader, which must keep handling speech_started
+        and barge-in while the buffer is full, so the Block policy trims the
+        write to what fits, like DropNewest.
+        """
+        self._draining = False
+        if not self._segments or self._segments[-1][1:] != (item_id, content_index):
+            self._segments.append((self._written_total, item_id, content_index))
+        dropped = self._ring.write_nowait(pcm)
+        if self.config.overflow != OverflowPolicy.DropOldest:
+            self._written_total += len(pcm) - dropped
+        else:
+            self._written_total += len(pcm)
+            self._read_total += dropped  # the oldest audio was discarded unplayed
+        if dropped:
+            self.overruns += 1
+            logger.warning(f"Playout buffer overrun: dropped {dropped} bytes of model audio")
+        self._data_ready.set()
+
+    def end_of_stream(self) -> None:
+        """The current response has no more audio: play out the remainder without waiting for more."""
+        self._draining = True
+        self._data_ready.set()
+
+    def flush(self) -> None:
+        """Drop all buffered audio at once, e.g. when the user barges in."""
+        self._ring.clear()
+        self._segments.clear()
+        self._read_total = self._written_total
+        self.last_frame_source = (None, 0, 0)
+        self._playing = False
+        self._draining = False
+        self._data_ready.clear()
+        self.flushes += 1
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "frames_pushed": self.frames_pushed,
+            "underruns": self.underruns,
+            "overruns": self.overruns,
+            "dropped_bytes": self._ring.dropped_bytes,
+            "flushes": self.flushes,
+            "buffered_ms": self.buffered_ms,
+            "high_water_ms": self._ring.high_water_mark / PCM_BYTES_PER_MS,
+            "capacity_bytes": self._ring.capacity,
+        }
+
+    async def run(self, push: Callable[[bytes], Awaitable[Any]]) -> None:
+        """Push paced frames through `push` until cancelled."""
+        frame_s = self.config.frame_ms / 1000
+        lead_frames = self.config.lead_ms // self.config.frame_ms
+        prebuffer_bytes = min(self.config.prebuffer_ms * PCM_BYTES_PER_MS, self._ring.capacity)
+
+        while True:
+            if not self._playing:
+                # Gather the jitter buffer (or whatever is left of a finished response)
+                while len(self._ring) < max(prebuffer_bytes, self.frame_bytes) and not (self._draining and len(self._ring)):
+                    self._data_ready.clear()
+                    await self._data_ready.wait()
+                self._playing = True
+                self._epoch = self._clock()
+                self._frames_since_epoch = 0
+
+            # Frames due by now on the playout clock, plus the allowed lead
+            due = int((self._clock() - self._epoch) / frame_s) + 1 + lead_frames
+            if due - self._frames_since_epoch > 2 * lead_frames + 1:
+                # The loop stalled: re-anchor the clock rather than bursting the backlog into RTC
+                self._epoch = self._clock() - self._frames_since_epoch * frame_s
+                due = self._frames_since_epoch + 1 + lead_frames
+            while self._playing and self._frames_since_epoch < due:
+                if len(self._ring) >= self.frame_bytes:
+                    frame = self._ring.read_nowait(self.frame_bytes)
+                elif self._draining and len(self._ring):
+                    frame = self._ring.read_nowait(self.frame_bytes).ljust(self.frame_bytes, b"\0")
+                else:
+                    if not self._draining:
+                        self.underruns += 1
+                    self._playing = False
+                    break
+                self._frames_since_epoch += 1
+                self.frames_pushed += 1
+                self._advance(min(len(frame), self._written_total - self._read_total))
+                await push(frame)
+
+            if self._playing:
+                next_due = self._epoch + (self._frames_since_epoch - lead_frames) * frame_s
+                await asyncio.sleep(max(0.0, next_due - self._clock()))
+
+    def _advance(self, size: int) -> None:
+        """Account for `size` bytes read from the ring, tracking which item they belong to."""
+        self._read_total += size
+        while len(self._segments) > 1 and self._segments[1][0] < self._read_total:
+            self._segments.popleft()
+        if self._segments:
+            _, item_id, content_index = self._segments[0]
+            self.last_frame_source = (item_id, content_index, size)
+        else:
+            self.last_frame_source = (None, 0, size)
+
+
+class PlayoutTracker:
+    """Maps audio pushed to RTC back to conversation items and how much of each the user has heard.
+
+    RTC plays pushed audio in real time, so everything pushed but not yet due on
+    the playback clock is still queued in the sender and unheard. `heard()`
+    walks back from the newest item by that amount, giving the exact
+    `audio_end_ms` to truncate at.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic, max_items: int = 8) -> None:
+        self._clock = clock
+        self._max_items = max_items
+        self._items: OrderedDict[tuple[str, int], float] = OrderedDict()  # ms of each item pushed so far
+        self._responses: OrderedDict[str, str] = OrderedDict()  # item_id -> response_id it was streamed in
+        self._queue_end = 0.0  # wall-clock time at which the last pushed audio finishes playing
+
+    def record(self, item_id: str | None, content_index: int, audio_bytes: int, frame_bytes: int) -> None:
+        """Account for one frame pushed via push_audio_frame.
+
+        audio_bytes is the part of the frame that came from the item; the rest is silence padding.
+        """
+        now = self._clock()
+        self._queue_end = max(self._queue_end, now) + frame_bytes / PCM_BYTES_PER_MS / 1000
+        if item_id is None or not audio_bytes:
+            return
+        key = (item_id, content_index)
+        self._items[key] = self._items.get(key, 0.0) + audio_bytes / PCM_BYTES_PER_MS
+        self._items.move_to_end(key)
+        while len(self._items) > self._max_items:
+            self._items.popitem(last=False)
+
+    def assign(self, item_id: str, response_id: str) -> None:
+        """Note the response `item_id` belongs to, so `heard()` can ignore audio of older responses."""
+        if self._responses.get(item_id) != response_id:
+            self._responses[item_id] = response_id
+            while len(self._responses) > self._max_items:
+                self._responses.popitem(last=False)
+
+    def unheard_ms(self) -> float:
+        """Audio pushed to RTC that has not been played out yet."""
+        return max(0.0, self._queue_end - self._clock()) * 1000
+
+    def heard(self, response_id: str | None = None) -> tuple[str, int, int] | None:
+        """(item_id, content_index, audio_end_ms) of the position the user has heard up to.
+
+        With `response_id`, None unless that position is in an item of that
+        response, e.g. when a new response has no audio yet and the user is
+        hearing (or heard) the previous one.
+        """
+        unheard = self.unheard_ms()
+        for (item_id, content_index), pushed_ms in reversed(self._items.items()):
+            if pushed_ms > unheard:
+                if response_id is not None and self._responses.get(item_id) != response_id:
+                    return None
+                return item_id, content_index, int(pushed_ms - unheard)
+            unheard -= pushed_ms
+        return None
+
+    def reset(self) -> None:
+        """Forget everything pushed so far, e.g. after the sender buffer was cleared."""
+        self._items.clear()
+        self._responses.clear()
+        self._queue_end = 0.0
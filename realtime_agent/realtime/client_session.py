@@ -0,0 +1,57 @@
+import asyncio
+import os
+import ssl
+import weakref
+from typing import Optional
+
+import aiohttp
+from attr import dataclass
+
+
+@dataclass(frozen=True, kw_only=True)
+class ClientSessionConfig:
+    """Connector and websocket settings shared by every RealtimeApiConnection in the process."""
+
+    dns_cache_ttl_s: int = 300  # How long resolved realtime API addresses are reused
+    max_msg_size: int = 2**24  # Largest websocket message accepted (aiohttp defaults to 4 MiB)
+    compress: int = 0  # permessage-deflate window bits (9-15); 0 disables compression
+
+    @classmethod
+    def from_env(cls) -> "ClientSessionConfig":
+        return cls(compress=int(os.environ.get("REALTIME_WS_COMPRESS") or 0))
+
+
+default_client_config = ClientSessionConfig.from_env()
+
+_ssl_context: Optional[ssl.SSLContext] = None
+# A ClientSession is bound to the loop it was created on, so there is one per running loop
+_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = weakref.WeakKeyDictionary()
+
+
+def shared_ssl_context() -> ssl.SSLContext:
+    """One SSL context (and its loaded CA bundle) for the whole process."""
+    global _ssl_context
+    if _ssl_context is None:
+        _ssl_context = ssl.create_default_context()
+    return _ssl_context
+
+
+def shared_client_session(config: ClientSessionConfig = default_client_config) -> aiohttp.ClientSession:
+    """Return the process-wide ClientSession for the running loop, creating it on first use.
+
+    Connections borrow this session and never close it; call
+    `close_shared_client_session()` when the loop is done with it.
+    """
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(ssl=shared_ssl_context(), ttl_dns_cache=config.dns_cache_ttl_s)
+        session = aiohttp.ClientSession(connector=connector)
+        _sessions[loop] = session
+    return session
+
+
+async def close_shared_client_session() -> None:
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
@@ -0,0 +1,137 @@
+import dataclasses
+import json
+import os
+from abc import ABC, abstractmethod
+from enum import Enum
+from typing import Any, Callable, Dict, Optional
+
+# The wire format is compact, UTF-8 JSON. Every backend below is configured to
+# produce exactly these bytes, so switching codecs never changes what is sent.
+# This is not what the code before the codecs sent: json.dumps defaults to ", "
+# and ": " separators and \uXXXX escapes for non-ASCII text. The messages decode
+# to the same values, but the bytes differ from that older output.
+
+_dataclass_fields: Dict[type, tuple] = {}
+
+
+def _field_names(cls: type) -> tuple:
+    names = _dataclass_fields.get(cls)
+    if names is None:
+        names = tuple(f.name for f in dataclasses.fields(cls))
+        _dataclass_fields[cls] = names
+    return names
+
+
+def encode_default(obj: Any) -> Any:
+    """Fallback for values the JSON backend cannot encode natively.
+
+    Dataclasses are flattened one level at a time (the backend recurses into the
+    returned dict), which avoids the deep copy `dataclasses.asdict` makes.
+    """
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return {name: getattr(obj, name) for name in _field_names(type(obj))}
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class JsonCodec(ABC):
+    """A JSON backend: `dumps` returns UTF-8 bytes, `loads` accepts str or bytes."""
+
+    name: str = ""
+
+    @abstractmethod
+    def dumps(self, obj: Any) -> bytes: ...
+
+    @abstractmethod
+    def loads(self, data: str | bytes) -> Any: ...
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(name={self.name!r})"
+
+
+class StdlibJsonCodec(JsonCodec):
+    name = "json"
+
+    def __init__(self) -> None:
+        self._encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, default=encode_default)
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._encoder.encode(obj).encode("utf-8")
+
+    def loads(self, data: str | bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    name = "orjson"
+
+    def __init__(self) -> None:
+        import orjson
+
+        self._dumps = orjson.dumps
+        self._loads = orjson.loads
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._dumps(obj, default=encode_default)
+
+    def loads(self, data: str | bytes) -> Any:
+        return self._loads(data)
+
+
+class MsgspecCodec(JsonCodec):
+    name = "msgspec"
+
+    def __init__(self) -> None:
+        import msgspec
+
+        self._encode = msgspec.json.Encoder(enc_hook=encode_default).encode
+        self._decode = msgspec.json.Decoder().decode
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._encode(obj)
+
+    def loads(self, data: str | bytes) -> Any:
+        return self._decode(data)
+
+
+CODECS: Dict[str, Callable[[], JsonCodec]] = {
+    "orjson": OrjsonCodec,
+    "msgspec": MsgspecCodec,
+    "json": StdlibJsonCodec,
+}
+
+
+def get_codec(name: Optional[str] = None) -> JsonCodec:
+    """Return the named codec, or the fastest installed one when `name` is None.
+
+    The choice can be pinned with the REALTIME_JSON_CODEC environment variable.
+    """
+    name = name or os.environ.get("REALTIME_JSON_CODEC")
+    if name:
+        if name not in CODECS:
+            raise ValueError(f"Unknown JSON codec: {name}. Choose from {', '.join(CODECS)}")
+        return CODECS[name]()
+
+    for factory in CODECS.values():
+        try:
+            return factory()
+        except ImportError:
+            continue
+    return StdlibJsonCodec()
+
+
+def available_codecs() -> Dict[str, JsonCodec]:
+    """Instantiate every codec whose backend is installed."""
+    codecs = {}
+    for name, factory in CODECS.items():
+        try:
+            codecs[name] = factory()
+        except ImportError:
+            pass
+    return codecs
+
+
+default_codec = get_codec()
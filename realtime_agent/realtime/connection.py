@@ -1,13 +1,21 @@
 import asyncio
-import base64
 import json
 import logging
 import os
+import random
+import time
 import aiohttp
 
-from typing import Any, AsyncGenerator
-from .struct import InputAudioBufferAppend, ClientToServerMessage, ServerToClientMessage, parse_server_message, to_json
+from attr import dataclass
+from collections import deque
+from dataclasses import replace
+from typing import Any, AsyncGenerator, Callable
+from .client_session import ClientSessionConfig, default_client_config, shared_client_session
+from .outbound import OutboundQueue, SendQueueConfig
+from .struct import PCM_CHANNELS, PCM_SAMPLE_RATE, AssistantMessageItemParam, AudioAppendEncoder, ClientToServerMessage, EncodedRequest, EventType, ItemCreate, ItemCreated, ItemDeleted, ItemInputAudioTranscriptionCompleted, ItemParam, ItemTruncate, ItemTruncated, LazyResponseAudioDelta, ResponseAudioDelta, ResponseAudioTranscriptDone, ServerToClientMessage, SessionUpdate, SessionUpdateParams, UserMessageItemParam, generate_event_id, parse_audio_delta, parse_server_message, session_delta, to_json_bytes
 from ..logger import setup_logger
+from ..metrics import registry
+from ..tracing import connection_downtime
 
 # Set up the logger with color and timestamp support
 logger = setup_logger(name=__name__, log_level=logging.INFO)
@@ -15,6 +23,18 @@ logger = setup_logger(name=__name__, log_level=logging.INFO)
 
 DEFAULT_VIRTUAL_MODEL = "gpt-4o-realtime-preview"
 
+messages_in = registry.counter("realtime_ws_messages_total", "Realtime API websocket messages.", direction="in")
+messages_out = registry.counter("realtime_ws_messages_total", "Realtime API websocket messages.", direction="out")
+audio_bytes_in = registry.counter("realtime_audio_bytes_total", "Decoded pcm exchanged with the realtime API.", direction="in")
+audio_bytes_out = registry.counter("realtime_audio_bytes_total", "Decoded pcm exchanged with the realtime API.", direction="out")
+reconnects_total = registry.counter("realtime_reconnects_total", "Successful realtime API websocket reconnects.")
+messages_skipped = registry.counter("realtime_ws_messages_skipped_total", "Realtime API websocket messages that could not be handled and were skipped.")
+
+# aiohttp 3.11 added ClientWebSocketResponse.send_frame, which writes a text frame from bytes.
+# On older versions (requirements.txt pins 3.10.6) send_str is the only way, at the cost of a
+# decode here and a re-encode inside aiohttp.
+WS_SEND_FRAME = tuple(int(part) for part in aiohttp.__version__.split(".")[:2]) >= (3, 11)
+
 def smart_str(s: str, max_field_len: int = 128) -> str:
     """parse string as json, truncate data field to 128 characters, reserialize"""
     try:
@@ -33,6 +53,93 @@ def smart_str(s: str, max_field_len: int = 128) -> str:
         return s
 
 
+@dataclass(frozen=True, kw_only=True)
+class ReconnectConfig:
+    """How a RealtimeApiConnection recovers when its websocket drops."""
+
+    heartbeat_s: float = 10.0  # Ping interval; a pong missing for half of it counts as a stalled socket
+    backoff_initial_s: float = 0.2  # First reconnect delay, doubled per failed attempt with full jitter
+    backoff_max_s: float = 5.0
+    max_attempts: int = 8  # Consecutive failed attempts before listen() gives up
+    replay_items: int = 20  # Most recent transcribed conversation items re-created on the new session
+    buffer_ms: int = 5000  # Upstream audio kept while disconnected; older audio is dropped first
+
+
+class RecentConversation:
+    """The latest user and assistant messages, in conversation order, for re-creating them on a new session.
+
+    Order comes from conversation.item.created's previous_item_id rather than
+    from when transcripts arrive, since a user transcript often lands after the
+    reply has started. Assistant items truncated on barge-in keep only the part
+    of their transcript that was played, estimated from the audio received.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self._order: list[str] = []
+        self._transcripts: dict[str, ItemParam] = {}
+        self._audio_bytes: dict[str, int] = {}
+        self._audio_end_ms: dict[str, int] = {}
+
+    def created(self, item_id: str, previous_item_id: str | None) -> None:
+        if item_id in self._order:
+            return
+        if previous_item_id in self._order:
+            self._order.insert(self._order.index(previous_item_id) + 1, item_id)
+        elif previous_item_id is None and self._order:
+            self._order.insert(0, item_id)
+        else:
+            self._order.append(item_id)
+        while len(self._order) > self.limit:
+            self.deleted(self._order[0])
+
+    def deleted(self, item_id: str) -> None:
+        if item_id in self._order:
+            self._order.remove(item_id)
+        self._transcripts.pop(item_id, None)
+        self._audio_bytes.pop(item_id, None)
+        self._audio_end_ms.pop(item_id, None)
+
+    def audio(self, item_id: str, size: int) -> None:
+        if item_id in self._audio_bytes:
+            self._audio_bytes[item_id] += size
+        elif item_id in self._order:
+            self._audio_bytes[item_id] = size
+
+    def truncated(self, item_id: str, audio_end_ms: int) -> None:
+        if item_id in self._order:
+            self._audio_end_ms[item_id] = audio_end_ms
+
+    def transcribed(self, item_id: str, item: ItemParam) -> None:
+        if item_id not in self._order:
+            self.created(item_id, self._order[-1] if self._order else None)
+        self._transcripts[item_id] = item
+
+    def items(self) -> list[ItemParam]:
+        """Items to re-create, oldest first. They keep their ids, so the new session's item.created echoes are recognized."""
+        items = []
+        for item_id in self._order:
+            item = self._transcripts.get(item_id)
+            if item is not None and item_id in self._audio_end_ms:
+                item = self._cut(item, item_id)
+            if item is not None:
+                items.append(replace(item, id=item_id))
+        return items
+
+    def _cut(self, item: AssistantMessageItemParam, item_id: str) -> AssistantMessageItemParam | None:
+        played_ms = self._audio_end_ms[item_id]
+        total_ms = self._audio_bytes.get(item_id, 0) * 1000 / (PCM_SAMPLE_RATE * PCM_CHANNELS * 2)
+        if total_ms <= played_ms:
+            return item
+        transcript = item.content[0]["text"]
+        cut = transcript[:int(len(transcript) * played_ms / total_ms)]
+        if cut != transcript and " " in cut:
+            cut = cut.rsplit(" ", 1)[0]  # Don't end on half a word
+        if not cut.strip():
+            return None
+        return AssistantMessageItemParam(content=[{"type": "text", "text": cut}])
+
+
 class RealtimeApiConnection:
     def __init__(
         self,
@@ -41,6 +148,10 @@ class RealtimeApiConnection:
         path: str = "/v1/realtime",
         verbose: bool = False,
         model: str = DEFAULT_VIRTUAL_MODEL,
+        lazy_audio_deltas: bool = False,
+        session: aiohttp.ClientSession | None = None,
+        client_config: ClientSessionConfig = default_client_config,
+        reconnect: ReconnectConfig | None = None,
     ):
         
         self.url = f"{base_uri}{path}"
@@ -50,7 +161,32 @@ class RealtimeApiConnection:
         self.api_key = api_key or os.environ.get("OPENAI_API_KEY")
         self.websocket: aiohttp.ClientWebSocketResponse | None = None
         self.verbose = verbose
-        self.session = aiohttp.ClientSession()
+        # Yield response.audio.delta events as LazyResponseAudioDelta instead of fully parsed messages
+        self.lazy_audio_deltas = lazy_audio_deltas
+        self.audio_encoder = AudioAppendEncoder()
+        # Borrowed, never closed here: by default the process-wide session, so its connector,
+        # DNS cache and SSL context are reused across calls
+        self.client_config = client_config
+        self.session = session or shared_client_session(client_config)
+
+        # Reconnect and resume the session when the socket drops; None ends listen() instead
+        self.reconnect_config = reconnect
+        self.on_reconnect: Callable[[], Any] | None = None
+        self._closing = False
+        self._down = False
+        self._last_session_update: SessionUpdate | None = None
+        self._recent_items = RecentConversation(reconnect.replay_items if reconnect else 0)
+        self._pending_requests: deque[ClientToServerMessage | EncodedRequest] = deque(maxlen=64)
+        self._pending_audio: deque[bytes] = deque()
+        self._pending_audio_bytes = 0
+        self.reconnects = 0
+        self.downtime_ms = 0.0
+        self.dropped_audio_bytes = 0
+        self.skipped_messages = 0  # Frames that failed to parse; the session carries on without them
+
+        # Sends go through a writer task instead of blocking the caller once enabled
+        self.outbound: OutboundQueue | None = None
+        self._writer: asyncio.Task[None] | None = None
 
     async def __aenter__(self) -> "RealtimeApiConnection":
         await self.connect()
@@ -60,48 +196,261 @@ class RealtimeApiConnection:
         await self.close()
         return False
 
+    @property
+    def connected(self) -> bool:
+        return self.websocket is not None and not self.websocket.closed
+
     async def connect(self):
         auth = aiohttp.BasicAuth("", self.api_key) if self.api_key else None
 
         headers = {"OpenAI-Beta": "realtime=v1"}
 
+        self._closing = False
         self.websocket = await self.session.ws_connect(
             url=self.url,
             auth=auth,
             headers=headers,
+            heartbeat=self.reconnect_config.heartbeat_s if self.reconnect_config else None,
+            max_msg_size=self.client_config.max_msg_size,
+            compress=self.client_config.compress,
         )
 
+    def enable_send_queue(self, config: SendQueueConfig) -> None:
+        """Queue outgoing messages for a dedicated writer task so senders never wait on the socket."""
+        if self.outbound is None:
+            self.outbound = OutboundQueue(config, self._send_audio_now, self._send_request_now)
+            self._writer = asyncio.create_task(self.outbound.run())
+
     async def send_audio_data(self, audio_data: bytes):
         """audio_data is assumed to be pcm16 24kHz mono little-endian"""
-        base64_audio_data = base64.b64encode(audio_data).decode("utf-8")
-        message = InputAudioBufferAppend(audio=base64_audio_data)
-        await self.send_request(message)
+        if self.outbound is not None:
+            self.outbound.put_audio(audio_data)
+        else:
+            await self._send_audio_now(audio_data)
 
-    async def send_request(self, message: ClientToServerMessage):
+    async def send_request(self, message: ClientToServerMessage | EncodedRequest):
         assert self.websocket is not None
-        message_str = to_json(message)
+        if self.outbound is not None:
+            await self.outbound.put_request(message)
+        else:
+            await self._send_request_now(message)
+
+    async def update_session(self, params: SessionUpdateParams, applied: SessionUpdateParams | None = None):
+        """Configure the session as `params`, sending only the fields that differ from `applied` when given.
+
+        A session resumed after a reconnect starts from defaults, so it is
+        replayed the full `params` either way.
+        """
+        if applied is None:
+            await self.send_request(SessionUpdate(session=params))
+            return
+        self._last_session_update = SessionUpdate(session=params)
+        delta = session_delta(applied, params)
+        if delta:
+            payload = to_json_bytes({"event_id": generate_event_id(), "session": delta, "type": EventType.SESSION_UPDATE.value})
+            await self.send_request(EncodedRequest(EventType.SESSION_UPDATE.value, payload))
+
+    async def _send_audio_now(self, audio_data: bytes):
+        if self._down:
+            self._buffer_audio(audio_data)
+            return
+        try:
+            await self.write_audio(audio_data)
+        except (ConnectionResetError, aiohttp.ClientConnectionError):
+            if self.reconnect_config is None:
+                raise
+            # The drop has not reached listen() yet; keep the audio for after the reconnect
+            self._buffer_audio(audio_data)
+            return
+        audio_bytes_out.inc(len(audio_data))
+
+    async def write_audio(self, audio_data: bytes):
+        """Put one input_audio_buffer.append on the wire."""
+        payload = self.audio_encoder.encode(audio_data)
+        if self.verbose:
+            logger.info(f"-> {smart_str(payload.decode('utf-8'))}")
+        await self.send_text_frame(payload)
+
+    async def _send_request_now(self, message: ClientToServerMessage | EncodedRequest):
+        if isinstance(message, SessionUpdate):
+            self._last_session_update = message
+        elif isinstance(message, ItemTruncate) and message.item_id is not None:
+            self._recent_items.truncated(message.item_id, message.audio_end_ms or 0)
+        if self._down:
+            self._pending_requests.append(message)
+            return
+        payload = self._encode_request(message)
         if self.verbose:
-            logger.info(f"-> {smart_str(message_str)}")
-        await self.websocket.send_str(message_str)
+            logger.info(f"-> {smart_str(payload if isinstance(payload, str) else payload.decode('utf-8'))}")
+        try:
+            await self.send_text_frame(payload)
+        except (ConnectionResetError, aiohttp.ClientConnectionError):
+            if self.reconnect_config is None:
+                raise
+            self._pending_requests.append(message)
+
+    @staticmethod
+    def _encode_request(message: ClientToServerMessage | EncodedRequest) -> str | bytes:
+        return message.payload if isinstance(message, EncodedRequest) else to_json_bytes(message)
+
+    async def send_text_frame(self, payload: bytes | str):
+        """Send already-encoded UTF-8 JSON as a websocket text frame."""
+        assert self.websocket is not None
+        messages_out.inc()
+        if isinstance(payload, str):
+            await self.websocket.send_str(payload)
+        elif WS_SEND_FRAME:
+            await self.websocket.send_frame(payload, aiohttp.WSMsgType.TEXT)
+        else:
+            await self.websocket.send_str(payload.decode("utf-8"))
 
     
 
-    async def listen(self) -> AsyncGenerator[ServerToClientMessage, None]:
+    async def listen(self) -> AsyncGenerator[ServerToClientMessage | LazyResponseAudioDelta, None]:
         assert self.websocket is not None
         if self.verbose:
             logger.info("Listening for realtimeapi messages")
         try:
-            async for msg in self.websocket:
-                if msg.type == aiohttp.WSMsgType.TEXT:
-                    if self.verbose:
-                        logger.info(f"<- {smart_str(msg.data)}")
-                    yield self.handle_server_message(msg.data)
-                elif msg.type == aiohttp.WSMsgType.ERROR:
-                    logger.error("Error during receive: %s", self.websocket.exception())
+            while True:
+                async for msg in self.websocket:
+                    if msg.type == aiohttp.WSMsgType.TEXT:
+                        messages_in.inc()
+                        if self.verbose:
+                            logger.info(f"<- {smart_str(msg.data)}")
+                        if self.lazy_audio_deltas:
+                            audio_delta = parse_audio_delta(msg.data)
+                            if audio_delta is not None:
+                                audio_bytes_in.inc(audio_delta.decoded_size)
+                                self._recent_items.audio(audio_delta.item_id, audio_delta.decoded_size)
+                                yield audio_delta
+                                continue
+                        try:
+                            message = self.handle_server_message(msg.data)
+                        except Exception:
+                            self._skip_message()  # handle_server_message logged it
+                            continue
+                        if isinstance(message, ResponseAudioDelta):
+                            audio_bytes_in.inc(len(message.delta) * 3 // 4)
+                        self._remember_item(message)
+                        yield message
+                    elif msg.type == aiohttp.WSMsgType.BINARY:
+                        messages_in.inc()
+                        try:
+                            message = self.handle_binary_message(msg.data)
+                        except ValueError as e:
+                            logger.warning("Skipping binary message: %s", e)
+                            self._skip_message()
+                            continue
+                        if isinstance(message, LazyResponseAudioDelta):
+                            audio_bytes_in.inc(message.decoded_size)
+                            self._recent_items.audio(message.item_id, message.decoded_size)
+                        yield message
+                    elif msg.type == aiohttp.WSMsgType.ERROR:
+                        logger.error("Error during receive: %s", self.websocket.exception())
+                        break
+
+                if self._closing or self.reconnect_config is None or not await self._reconnect():
                     break
         except asyncio.CancelledError:
             logger.info("Receive messages task cancelled")
 
+    def stats(self) -> dict[str, Any]:
+        stats = {
+            "reconnects": self.reconnects,
+            "downtime_ms": self.downtime_ms,
+            "buffered_audio_bytes": self._pending_audio_bytes,
+            "dropped_audio_bytes": self.dropped_audio_bytes,
+            "skipped_messages": self.skipped_messages,
+        }
+        if self.outbound is not None:
+            stats["send_queue"] = self.outbound.stats()
+        return stats
+
+    async def _reconnect(self) -> bool:
+        """Re-open the socket with jittered backoff, then resume the session on it."""
+        config = self.reconnect_config
+        self._down = True
+        started = time.monotonic()
+        if self.websocket is not None:
+            await self.websocket.close()
+        logger.warning(f"Realtime API connection lost (close code {self.websocket.close_code}), reconnecting")
+
+        delay = config.backoff_initial_s
+        for attempt in range(1, config.max_attempts + 1):
+            await asyncio.sleep(random.uniform(0, delay))
+            try:
+                await self.connect()
+                break
+            except Exception as e:
+                logger.warning(f"Reconnect attempt {attempt} failed: {e}")
+                delay = min(delay * 2, config.backoff_max_s)
+        else:
+            logger.error(f"Giving up on the realtime API after {config.max_attempts} reconnect attempts")
+            self._down = False
+            return False
+
+        await self._resume()
+        self._down = False
+        downtime_ms = (time.monotonic() - started) * 1000
+        self.reconnects += 1
+        reconnects_total.inc()
+        self.downtime_ms += downtime_ms
+        connection_downtime.observe("reconnect", downtime_ms)
+        logger.info(f"Realtime API reconnected after {downtime_ms:.0f} ms")
+        if self.on_reconnect is not None:
+            self.on_reconnect()
+        return True
+
+    async def _resume(self) -> None:
+        """Replay session config and recent conversation, then what was sent while the socket was down."""
+        if self._last_session_update is not None:
+            await self.send_text_frame(to_json_bytes(self._last_session_update))
+        for item in self._recent_items.items():
+            await self.send_text_frame(to_json_bytes(ItemCreate(item=item)))
+        while self._pending_requests:
+            await self.send_text_frame(self._encode_request(self._pending_requests.popleft()))
+        while self._pending_audio:
+            audio = self._pending_audio.popleft()
+            self._pending_audio_bytes -= len(audio)
+            await self.write_audio(audio)
+
+    def _buffer_audio(self, audio_data: bytes) -> None:
+        self._pending_audio.append(audio_data)
+        self._pending_audio_bytes += len(audio_data)
+        limit = self.reconnect_config.buffer_ms * PCM_SAMPLE_RATE * PCM_CHANNELS * 2 // 1000
+        while self._pending_audio_bytes > limit:
+            dropped = self._pending_audio.popleft()
+            self._pending_audio_bytes -= len(dropped)
+            self.dropped_audio_bytes += len(dropped)
+
+    def _remember_item(self, message: ServerToClientMessage) -> None:
+        """Track the latest turns' order, transcripts and truncation so they can be re-created after a reconnect."""
+        if self.reconnect_config is None:
+            return
+        recent = self._recent_items
+        recent.limit = self.reconnect_config.replay_items  # The config may be set after the connection is built
+        if isinstance(message, ItemCreated):
+            item = message.item if isinstance(message.item, dict) else {}
+            if item.get("type") == "message" and item.get("role") in ("user", "assistant") and item.get("id"):
+                recent.created(item["id"], message.previous_item_id)
+        elif isinstance(message, ItemInputAudioTranscriptionCompleted):
+            recent.transcribed(message.item_id, UserMessageItemParam(content=[{"type": "input_text", "text": message.transcript}]))
+        elif isinstance(message, ResponseAudioTranscriptDone):
+            recent.transcribed(message.item_id, AssistantMessageItemParam(content=[{"type": "text", "text": message.transcript}]))
+        elif isinstance(message, ResponseAudioDelta):
+            recent.audio(message.item_id, len(message.delta) * 3 // 4)
+        elif isinstance(message, ItemTruncated):
+            recent.truncated(message.item_id, message.audio_end_ms)
+        elif isinstance(message, ItemDeleted):
+            recent.deleted(message.item_id)
+
+    def _skip_message(self) -> None:
+        self.skipped_messages += 1
+        messages_skipped.inc()
+
+    def handle_binary_message(self, data: bytes) -> ServerToClientMessage | LazyResponseAudioDelta:
+        raise ValueError(f"Unexpected binary message of {len(data)} bytes from the realtime API")
+
     def handle_server_message(self, message: str) -> ServerToClientMessage:
         try:
             return parse_server_message(message)
@@ -110,6 +459,11 @@ class RealtimeApiConnection:
             raise e
 
     async def close(self):
+        self._closing = True
+        if self._writer is not None:
+            self._writer.cancel()
+            self._writer = None
+            self.outbound = None
         # Close the websocket connection if it exists
         if self.websocket:
             await self.websocket.close()
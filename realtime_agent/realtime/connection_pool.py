@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import time
+from typing import Any
+
+import aiohttp
+
+from .connection import RealtimeApiConnection, ReconnectConfig
+from .codec import default_codec
+from .struct import EventType, SessionCreated, SessionUpdate, SessionUpdateParams, SessionUpdated
+from ..logger import setup_logger
+
+# Set up the logger with color and timestamp support
+logger = setup_logger(name=__name__, log_level=logging.INFO)
+
+# Used when session.created carries no expires_at; the realtime API's sessions last at least this long
+ASSUMED_SESSION_LIFETIME_S = 15 * 60
+
+
+class WarmConnection:
+    def __init__(self, connection: RealtimeApiConnection, expires_at: float) -> None:
+        self.connection = connection
+        self.expires_at = expires_at  # Session.expires_at, seconds since the epoch
+        self.reader: asyncio.Task[None] | None = None  # Drains the socket while it sits idle
+
+
+class RealtimeConnectionPool:
+    """Keeps `size` authenticated realtime API websockets open with `template` already applied.
+
+    Idle sockets are dialed with a `ping_interval_s` heartbeat (unless `reconnect`
+    sets one) and read while they sit idle, so pongs are processed and a socket
+    whose pong is late, or that the server closes, is replaced. Every
+    `ping_interval_s` sockets within `recycle_margin_s` of the server-side
+    session expiry are replaced too. `acquire()`
+    sends only the fields that differ from the template as a session.update and
+    does not wait for the reply: the server applies it before any audio that
+    follows on the same socket.
+    """
+
+    def __init__(
+        self,
+        template: SessionUpdateParams,
+        *,
+        base_uri: str,
+        api_key: str | None = None,
+        size: int = 2,
+        ping_interval_s: float = 20.0,
+        recycle_margin_s: float = 600.0,
+        session: aiohttp.ClientSession | None = None,
+        lazy_audio_deltas: bool = True,
+        reconnect: ReconnectConfig | None = None,
+        single_use: bool = False,  # Hand out one connection, then stop refilling, e.g. for a process that serves one call
+    ) -> None:
+        self.template = template
+        self.base_uri = base_uri
+        self.api_key = api_key
+        self.size = size
+        self.ping_interval_s = ping_interval_s
+        self.recycle_margin_s = recycle_margin_s
+        self.session = session
+        self.lazy_audio_deltas = lazy_audio_deltas
+        # The acquiring caller sets its own reconnect config; this one only supplies the idle heartbeat
+        self.reconnect = reconnect or ReconnectConfig(heartbeat_s=ping_interval_s)
+        self.single_use = single_use
+        self.idle: list[WarmConnection] = []
+        self._opening: set[asyncio.Task[None]] = set()
+        self._maintainer: asyncio.Task[None] | None = None
+
+        self.hits = 0
+        self.acquired = 0
+        self.misses = 0
+        self.recycled = 0
+        self.lost_idle = 0
+        self.open_failures = 0
+
+    async def start(self) -> None:
+        """Open the first `size` connections, then keep the pool topped up in the background."""
+        self._refill()
+        await asyncio.gather(*self._opening, return_exceptions=True)
+        self._maintainer = asyncio.create_task(self._maintain())
+
+    async def acquire(self, params: SessionUpdateParams) -> RealtimeApiConnection:
+        """Return an open connection configured with `params`, dialing a new one if none is warm."""
+        self.acquired += 1
+        while self.idle:
+            warm = self.idle.pop()
+            await self._stop_reader(warm)
+            if not self._usable(warm):
+                await self._discard(warm)
+                continue
+            self.hits += 1
+            self._refill()
+            await warm.connection.update_session(params, applied=self.template)
+            return warm.connection
+
+        self.misses += 1
+        self._refill()
+        connection = self._new_connection()
+        await connection.connect()
+        await connection.update_session(params)
+        return connection
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": self.size,
+            "idle": len(self.idle),
+            "single_use": self.single_use,
+            "hits": self.hits,
+            "misses": self.misses,
+            "recycled": self.recycled,
+            "lost_idle": self.lost_idle,
+            "open_failures": self.open_failures,
+        }
+
+    async def close(self) -> None:
+        if self._maintainer is not None:
+            self._maintainer.cancel()
+            self._maintainer = None
+        for task in list(self._opening):
+            task.cancel()
+        idle, self.idle = self.idle, []
+        for warm in idle:
+            await self._stop_reader(warm)
+            await warm.connection.close()
+
+    def _new_connection(self) -> RealtimeApiConnection:
+        return RealtimeApiConnection(
+            base_uri=self.base_uri,
+            api_key=self.api_key,
+            lazy_audio_deltas=self.lazy_audio_deltas,
+            session=self.session,
+            reconnect=self.reconnect,
+        )
+
+    def _usable(self, warm: WarmConnection) -> bool:
+        return warm.connection.connected and warm.expires_at - time.time() > self.recycle_margin_s
+
+    async def _stop_reader(self, warm: WarmConnection) -> None:
+        if warm.reader is not None:
+            warm.reader.cancel()
+            await asyncio.gather(warm.reader, return_exceptions=True)
+            warm.reader = None
+
+    async def _read_idle(self, warm: WarmConnection) -> None:
+        """Receive on an idle socket: this is where aiohttp handles pongs and notices a close."""
+        async for msg in warm.connection.websocket:
+            if msg.type == aiohttp.WSMsgType.TEXT and default_codec.loads(msg.data).get("type") == EventType.ERROR.value:
+                logger.warning(f"Realtime API error on an idle pooled connection: {msg.data}")
+        # Closed by the server, or by aiohttp after a missed pong
+        warm.reader = None
+        if warm in self.idle:
+            self.idle.remove(warm)
+            self.lost_idle += 1
+            await warm.connection.close()
+            self._refill()
+
+    async def _discard(self, warm: WarmConnection) -> None:
+        self.recycled += 1
+        await warm.connection.close()
+
+    def _refill(self) -> None:
+        if self.single_use and self.acquired:
+            return
+        for _ in range(self.size - len(self.idle) - len(self._opening)):
+            task = asyncio.create_task(self._open())
+            self._opening.add(task)
+            task.add_done_callback(self._opening.discard)
+
+    async def _open(self) -> None:
+        connection = self._new_connection()
+        try:
+            await connection.connect()
+            expires_at = time.time() + ASSUMED_SESSION_LIFETIME_S
+            await connection.send_request(SessionUpdate(session=self.template))
+            async for message in connection.listen():
+                if isinstance(message, SessionCreated):
+                    if message.session is not None and message.session.expires_at:
+                        expires_at = message.session.expires_at
+                elif isinstance(message, SessionUpdated):
+                    break
+            else:
+                raise ConnectionError("connection closed before the session was configured")
+            warm = WarmConnection(connection, expires_at)
+            warm.reader = asyncio.create_task(self._read_idle(warm))
+            self.idle.append(warm)
+        except BaseException as e:
+            if not isinstance(e, asyncio.CancelledError):
+                self.open_failures += 1
+                logger.warning(f"Failed to open warm realtime API connection: {e}")
+            await connection.close()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+
+    async def _maintain(self) -> None:
+        while True:
+            self._refill()
+            await asyncio.sleep(self.ping_interval_s)
+            for warm in list(self.idle):
+                if warm in self.idle and not self._usable(warm):
+                    self.idle.remove(warm)
+                    await self._stop_reader(warm)
+                    await self._discard(warm)
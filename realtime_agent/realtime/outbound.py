@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+from attr import dataclass
+
+from .struct import PCM_CHANNELS, PCM_SAMPLE_RATE, ClientToServerMessage, EncodedRequest, EventType
+from ..logger import setup_logger
+from ..tracing import LatencyRecorder
+
+# Set up the logger with color and timestamp support
+logger = setup_logger(name=__name__, log_level=logging.INFO)
+
+PCM_BYTES_PER_MS = PCM_SAMPLE_RATE * PCM_CHANNELS * 2 // 1000
+
+# Sent ahead of any queued audio: they stop or reshape what the model is doing right now.
+# Matched on the message's `type`, so pre-encoded events (struct.EncodedRequest) qualify too.
+PRIORITY_MESSAGE_TYPES = (EventType.RESPONSE_CANCEL, EventType.SESSION_UPDATE, EventType.ITEM_TRUNCATE)
+
+
+@dataclass(frozen=True, kw_only=True)
+class SendQueueConfig:
+    """Bounds of the per-connection outbound queue drained by a single writer task."""
+
+    max_audio_ms: int = 1000  # Audio queued beyond this is dropped, oldest first
+    coalesce_max_ms: int = 200  # Adjacent queued audio chunks are merged into one append up to this size
+    max_requests: int = 256  # Queued non-audio messages; send_request waits for room beyond this
+
+
+class OutboundQueue:
+    """Bounded priority queue in front of the websocket, drained by `run()`.
+
+    Priority messages jump the queue. Everything else, audio included, keeps its
+    order, so a commit or response.create still follows the audio before it.
+    Under backpressure adjacent audio chunks are coalesced into a single append
+    and the oldest audio is dropped once `max_audio_ms` is queued.
+    """
+
+    def __init__(
+        self,
+        config: SendQueueConfig,
+        send_audio: Callable[[bytes], Awaitable[Any]],
+        send_request: Callable[[ClientToServerMessage | EncodedRequest], Awaitable[Any]],
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.config = config
+        self._send_audio = send_audio
+        self._send_request = send_request
+        self._clock = clock
+        self._priority: deque[tuple[float, ClientToServerMessage | EncodedRequest]] = deque()
+        # (enqueued at, audio bytes or a message)
+        self._ordered: deque[tuple[float, bytes | ClientToServerMessage | EncodedRequest]] = deque()
+        self._ready = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+        self._requests = 0
+        self._audio_bytes = 0
+        self._in_flight_bytes = 0
+
+        self.send_latency = LatencyRecorder()
+        self.messages_sent = 0
+        self.coalesced_chunks = 0
+        self.dropped_audio_bytes = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._priority) + len(self._ordered)
+
+    def put_audio(self, audio: bytes) -> None:
+        self._ordered.append((self._clock(), audio))
+        self._audio_bytes += len(audio)
+        limit = self.config.max_audio_ms * PCM_BYTES_PER_MS
+        while self._audio_bytes > limit:
+            self._drop_oldest_audio()
+        self._ready.set()
+
+    async def put_request(self, message: ClientToServerMessage | EncodedRequest) -> None:
+        if message.type in PRIORITY_MESSAGE_TYPES:
+            self._priority.append((self._clock(), message))
+        else:
+            while self._requests >= self.config.max_requests:
+                self._space.clear()
+                await self._space.wait()
+            self._ordered.append((self._clock(), message))
+            self._requests += 1
+        self._ready.set()
+
+    async def run(self) -> None:
+        """Write queued messages until cancelled."""
+        while True:
+            while not self.depth:
+                self._ready.clear()
+                await self._ready.wait()
+
+            if self._priority:
+                enqueued_at, message = self._priority.popleft()
+                await self._write(self._send_request, message, 0, enqueued_at)
+                continue
+
+            enqueued_at, item = self._ordered.popleft()
+            if isinstance(item, bytes):
+                chunks = [item]
+                size = len(item)
+                limit = self.config.coalesce_max_ms * PCM_BYTES_PER_MS
+                while self._ordered and isinstance(self._ordered[0][1], bytes) and size + len(self._ordered[0][1]) <= limit:
+                    chunks.append(self._ordered.popleft()[1])
+                    size += len(chunks[-1])
+                self.coalesced_chunks += len(chunks) - 1
+                self._audio_bytes -= size
+                await self._write(self._send_audio, b"".join(chunks) if len(chunks) > 1 else item, size, enqueued_at)
+            else:
+                self._requests -= 1
+                self._space.set()
+                await self._write(self._send_request, item, 0, enqueued_at)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "depth": self.depth,
+            "queued_audio_ms": self._audio_bytes / PCM_BYTES_PER_MS,
+            "bytes_in_flight": self._audio_bytes + self._in_flight_bytes,
+            "messages_sent": self.messages_sent,
+            "coalesced_chunks": self.coalesced_chunks,
+            "dropped_audio_bytes": self.dropped_audio_bytes,
+            "send_latency_ms": self.send_latency.percentiles("send"),
+        }
+
+    async def _write(self, send: Callable[[Any], Awaitable[Any]], item: Any, size: int, enqueued_at: float) -> None:
+        self._in_flight_bytes = size
+        try:
+            await send(item)
+        except Exception as e:
+            logger.error(f"Failed to send queued message: {e}")
+        finally:
+            self._in_flight_bytes = 0
+        self.messages_sent += 1
+        self.send_latency.observe("send", (self._clock() - enqueued_at) * 1000)
+
+    def _drop_oldest_audio(self) -> None:
+        for index, (_, item) in enumerate(self._ordered):
+            if isinstance(item, bytes):
+                del self._ordered[index]
+                self._audio_bytes -= len(item)
+                self.dropped_audio_bytes += len(item)
+                return
@@ -0,0 +1,207 @@
+import argparse
+import asyncio
+import binascii
+import logging
+import os
+from struct import Struct
+from typing import Any
+
+import aiohttp
+from aiohttp import web
+
+from .client_session import default_client_config
+from .connection import RealtimeApiConnection, messages_out
+from .outbound import SendQueueConfig
+from .codec import default_codec
+from .struct import EncodedRequest, LazyResponseAudioDelta, ServerToClientMessage, parse_audio_delta
+from ..logger import setup_logger
+
+# Set up the logger with color and timestamp support
+logger = setup_logger(name=__name__, log_level=logging.INFO)
+
+# Binary frame kinds; the first byte of every binary websocket message
+AUDIO_APPEND = 1  # agent -> proxy: raw pcm for input_audio_buffer.append
+AUDIO_DELTA = 2  # proxy -> agent: response.audio.delta ids plus raw pcm
+
+# kind, output_index, content_index, then the byte lengths of event_id, response_id and item_id
+_DELTA_HEADER = Struct("!BHHBBB")
+
+
+def pack_audio_append(pcm: bytes) -> bytes:
+    return b"\x01" + pcm
+
+
+def pack_audio_delta(delta: LazyResponseAudioDelta, pcm: bytes) -> bytes:
+    event_id = delta.event_id.encode()
+    response_id = delta.response_id.encode()
+    item_id = delta.item_id.encode()
+    header = _DELTA_HEADER.pack(
+        AUDIO_DELTA, delta.output_index, delta.content_index, len(event_id), len(response_id), len(item_id)
+    )
+    return b"".join((header, event_id, response_id, item_id, pcm))
+
+
+class PcmResponseAudioDelta(LazyResponseAudioDelta):
+    """A `response.audio.delta` that arrived as raw pcm from the proxy instead of base64."""
+
+    __slots__ = ("_pcm",)
+
+    def __init__(self, event_id: str, response_id: str, item_id: str, output_index: int, content_index: int, pcm: bytes) -> None:
+        self.event_id = event_id
+        self.response_id = response_id
+        self.item_id = item_id
+        self.output_index = output_index
+        self.content_index = content_index
+        self._pcm = pcm
+
+    @property
+    def delta(self) -> str:
+        return binascii.b2a_base64(self._pcm, newline=False).decode("ascii")
+
+    @property
+    def decoded_size(self) -> int:
+        return len(self._pcm)
+
+    def decode(self) -> bytes:
+        return self._pcm
+
+    def __repr__(self) -> str:
+        return (
+            f"PcmResponseAudioDelta(event_id={self.event_id!r}, response_id={self.response_id!r}, "
+            f"item_id={self.item_id!r}, output_index={self.output_index}, content_index={self.content_index}, "
+            f"delta=<{len(self._pcm)} pcm bytes>)"
+        )
+
+
+def unpack_audio_delta(data: bytes) -> PcmResponseAudioDelta:
+    _, output_index, content_index, event_len, response_len, item_len = _DELTA_HEADER.unpack_from(data)
+    offset = _DELTA_HEADER.size
+    event_id = data[offset:offset + event_len].decode()
+    offset += event_len
+    response_id = data[offset:offset + response_len].decode()
+    offset += response_len
+    item_id = data[offset:offset + item_len].decode()
+    offset += item_len
+    return PcmResponseAudioDelta(event_id, response_id, item_id, output_index, content_index, data[offset:])
+
+
+class ProxyRealtimeApiConnection(RealtimeApiConnection):
+    """RealtimeApiConnection to a local RealtimeProxy over a unix socket, sending and receiving raw pcm."""
+
+    def __init__(self, socket_path: str, **kwargs: Any) -> None:
+        self.socket_path = socket_path
+        self._unix_session = aiohttp.ClientSession(connector=aiohttp.UnixConnector(path=socket_path))
+        # The host is ignored by the unix connector; the proxy holds the API key
+        super().__init__(base_uri="http://realtime-proxy", api_key="", session=self._unix_session, **kwargs)
+
+    async def write_audio(self, audio_data: bytes):
+        messages_out.inc()
+        await self.websocket.send_bytes(pack_audio_append(audio_data))
+
+    def handle_binary_message(self, data: bytes) -> ServerToClientMessage | LazyResponseAudioDelta:
+        if not data or data[0] != AUDIO_DELTA:
+            raise ValueError(f"Unknown binary frame kind from the realtime proxy: {data[:1].hex() or 'empty frame'}")
+        return unpack_audio_delta(data)
+
+    async def close(self):
+        await super().close()
+        await self._unix_session.close()
+
+
+class RealtimeProxy:
+    """Serves realtime API sessions to local agents over a unix socket, one upstream websocket per session.
+
+    Audio crosses the local hop as raw pcm in binary frames, so base64 and JSON
+    are only handled here, where upstream audio is batched by the send queue.
+    All other events pass through as JSON.
+    """
+
+    def __init__(
+        self,
+        upstream_base_uri: str,
+        api_key: str | None = None,
+        send_queue: SendQueueConfig = SendQueueConfig(),
+    ) -> None:
+        self.upstream_base_uri = upstream_base_uri
+        self.api_key = api_key
+        self.send_queue = send_queue
+        self.sessions = 0
+        self.audio_frames_in = 0
+        self.audio_frames_out = 0
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes([web.get("/v1/realtime", self.handle_session)])
+        return app
+
+    async def handle_session(self, request: web.Request) -> web.WebSocketResponse:
+        agent = web.WebSocketResponse(max_msg_size=default_client_config.max_msg_size)
+        await agent.prepare(request)
+
+        upstream = RealtimeApiConnection(
+            base_uri=self.upstream_base_uri,
+            api_key=self.api_key,
+            **({"model": request.query["model"]} if "model" in request.query else {}),
+        )
+        try:
+            await upstream.connect()
+        except Exception as e:
+            logger.error(f"Failed to connect upstream: {e}")
+            await agent.close(code=aiohttp.WSCloseCode.TRY_AGAIN_LATER, message=b"upstream unavailable")
+            return agent
+        # The writer task coalesces queued audio, so base64 encoding happens in batches
+        upstream.enable_send_queue(self.send_queue)
+        self.sessions += 1
+
+        downstream = asyncio.create_task(self._relay_downstream(upstream, agent))
+        try:
+            async for msg in agent:
+                if msg.type == aiohttp.WSMsgType.BINARY:
+                    if msg.data and msg.data[0] == AUDIO_APPEND:
+                        self.audio_frames_in += 1
+                        await upstream.send_audio_data(msg.data[1:])
+                    else:
+                        logger.warning(f"Unknown binary frame kind from agent: {msg.data[:1].hex() or 'empty frame'}")
+                elif msg.type == aiohttp.WSMsgType.TEXT:
+                    # Forwarded verbatim; `type` is only read so control messages can take priority over queued audio
+                    await upstream.send_request(EncodedRequest(_event_type(msg.data), msg.data))
+        finally:
+            downstream.cancel()
+            await upstream.close()
+            self.sessions -= 1
+        return agent
+
+    async def _relay_downstream(self, upstream: RealtimeApiConnection, agent: web.WebSocketResponse) -> None:
+        async for msg in upstream.websocket:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                continue
+            delta = parse_audio_delta(msg.data)
+            if delta is not None:
+                self.audio_frames_out += 1
+                await agent.send_bytes(pack_audio_delta(delta, delta.decode()))
+            else:
+                await agent.send_str(msg.data)
+        # Upstream went away: close the agent's socket so its reconnect logic takes over
+        await agent.close()
+
+
+def _event_type(payload: str) -> str | None:
+    try:
+        event = default_codec.loads(payload)
+    except ValueError:
+        return None  # Forwarded anyway: the API answers malformed events with an error event
+    return event.get("type") if isinstance(event, dict) else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local realtime API proxy with binary audio framing.")
+    parser.add_argument("--socket", default=os.environ.get("REALTIME_PROXY_SOCKET", "/tmp/realtime.sock"))
+    parser.add_argument("--upstream", default=os.getenv("REALTIME_API_BASE_URI", "wss://api.openai.com"))
+    args = parser.parse_args()
+
+    proxy = RealtimeProxy(args.upstream, os.getenv("OPENAI_API_KEY"))
+    web.run_app(proxy.make_app(), path=args.socket)
+
+
+if __name__ == "__main__":
+    main()
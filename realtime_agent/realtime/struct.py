@@ -1,10 +1,21 @@
-import json
+import binascii
+import itertools
+import logging
 
-from dataclasses import dataclass, asdict, field, is_dataclass
-from typing import Any, Dict, Literal, Optional, List, Set, Union
+from dataclasses import dataclass, field, fields, is_dataclass
+from typing import Any, Callable, Dict, Literal, Optional, List, Set, Union
 from enum import Enum
 import uuid
 
+from .codec import default_codec
+from ..logger import setup_logger
+
+# Set up the logger with color and timestamp support
+logger = setup_logger(name=__name__, log_level=logging.INFO)
+
+# Fields or messages the compiled decoders could not convert and replaced with None
+decode_stats = {"conversion_failures": 0}
+
 PCM_SAMPLE_RATE = 24000
 PCM_CHANNELS = 1
 
@@ -640,97 +651,323 @@ def from_dict(data_class, data):
         print(f"Error converting to dataclass: {e}")
         return None
 
+# Server and client message classes keyed by their `type` field. The decoders
+# below are compiled from these tables once, at import time.
+SERVER_MESSAGE_TYPES: Dict[str, type] = {
+    EventType.ERROR.value: ErrorMessage,
+    EventType.SESSION_CREATED.value: SessionCreated,
+    EventType.SESSION_UPDATED.value: SessionUpdated,
+    EventType.INPUT_AUDIO_BUFFER_COMMITTED.value: InputAudioBufferCommitted,
+    EventType.INPUT_AUDIO_BUFFER_CLEARED.value: InputAudioBufferCleared,
+    EventType.INPUT_AUDIO_BUFFER_SPEECH_STARTED.value: InputAudioBufferSpeechStarted,
+    EventType.INPUT_AUDIO_BUFFER_SPEECH_STOPPED.value: InputAudioBufferSpeechStopped,
+    EventType.ITEM_CREATED.value: ItemCreated,
+    EventType.ITEM_TRUNCATED.value: ItemTruncated,
+    EventType.ITEM_DELETED.value: ItemDeleted,
+    EventType.RESPONSE_CREATED.value: ResponseCreated,
+    EventType.RESPONSE_DONE.value: ResponseDone,
+    EventType.RESPONSE_TEXT_DELTA.value: ResponseTextDelta,
+    EventType.RESPONSE_TEXT_DONE.value: ResponseTextDone,
+    EventType.RESPONSE_AUDIO_TRANSCRIPT_DELTA.value: ResponseAudioTranscriptDelta,
+    EventType.RESPONSE_AUDIO_TRANSCRIPT_DONE.value: ResponseAudioTranscriptDone,
+    EventType.RESPONSE_AUDIO_DELTA.value: ResponseAudioDelta,
+    EventType.RESPONSE_AUDIO_DONE.value: ResponseAudioDone,
+    EventType.RESPONSE_FUNCTION_CALL_ARGUMENTS_DELTA.value: ResponseFunctionCallArgumentsDelta,
+    EventType.RESPONSE_FUNCTION_CALL_ARGUMENTS_DONE.value: ResponseFunctionCallArgumentsDone,
+    EventType.RATE_LIMITS_UPDATED.value: RateLimitsUpdated,
+    EventType.RESPONSE_OUTPUT_ITEM_ADDED.value: ResponseOutputItemAdded,
+    EventType.RESPONSE_CONTENT_PART_ADDED.value: ResponseContentPartAdded,
+    EventType.RESPONSE_CONTENT_PART_DONE.value: ResponseContentPartDone,
+    EventType.RESPONSE_OUTPUT_ITEM_DONE.value: ResponseOutputItemDone,
+    EventType.ITEM_INPUT_AUDIO_TRANSCRIPTION_COMPLETED.value: ItemInputAudioTranscriptionCompleted,
+    EventType.ITEM_INPUT_AUDIO_TRANSCRIPTION_FAILED.value: ItemInputAudioTranscriptionFailed,
+}
+
+CLIENT_MESSAGE_TYPES: Dict[str, type] = {
+    EventType.INPUT_AUDIO_BUFFER_APPEND.value: InputAudioBufferAppend,
+    EventType.INPUT_AUDIO_BUFFER_COMMIT.value: InputAudioBufferCommit,
+    EventType.INPUT_AUDIO_BUFFER_CLEAR.value: InputAudioBufferClear,
+    EventType.ITEM_CREATE.value: ItemCreate,
+    EventType.ITEM_TRUNCATE.value: ItemTruncate,
+    EventType.ITEM_DELETE.value: ItemDelete,
+    EventType.RESPONSE_CREATE.value: ResponseCreate,
+    EventType.RESPONSE_CANCEL.value: ResponseCancel,
+    EventType.UPDATE_CONVERSATION_CONFIG.value: UpdateConversationConfig,
+    EventType.SESSION_UPDATE.value: SessionUpdate,
+}
+
+
+def _compile_converter(field_type, cache: Dict[Any, Callable[[Any], Any]]) -> Optional[Callable[[Any], Any]]:
+    """Build a converter equivalent to `from_dict(field_type, value)`.
+
+    Returns None when the value can be passed through untouched, so callers can
+    skip the call entirely for primitive fields.
+    """
+    if is_dataclass(field_type):
+        return _compile_dataclass(field_type, cache)
+
+    args = getattr(field_type, "__args__", None)
+    item_converter = _compile_converter(args[0], cache) if args else None
+
+    def convert_value(value):
+        # Same shape handling as from_dict: lists are converted item by item,
+        # anything else is returned as-is.
+        if not isinstance(value, list):
+            return value
+        if args is None:
+            # from_dict fails on this field alone and nulls it, keeping the rest of the message
+            decode_stats["conversion_failures"] += 1
+            logger.warning("Error converting to dataclass: %r is not subscriptable", field_type)
+            return None
+        if item_converter is None:
+            return list(value)
+        return [item_converter(item) for item in value]
+
+    return convert_value
+
+
+def _compile_dataclass(data_class, cache: Dict[Any, Callable[[Any], Any]]) -> Callable[[Any], Any]:
+    if data_class in cache:
+        return cache[data_class]
+
+    converters: Dict[str, Optional[Callable[[Any], Any]]] = {}
+
+    def convert_dataclass(data):
+        try:
+            kwargs = {}
+            for name, value in data.items():
+                converter = converters[name]
+                kwargs[name] = value if converter is None else converter(value)
+            return data_class(**kwargs)
+        except Exception as e:
+            decode_stats["conversion_failures"] += 1
+            logger.warning("Error converting to %s: %s", data_class.__name__, e)
+            return None
+
+    def convert_flat_dataclass(data):
+        # Every field is a primitive: the payload maps directly onto the constructor.
+        try:
+            return data_class(**data)
+        except Exception as e:
+            decode_stats["conversion_failures"] += 1
+            logger.warning("Error converting to %s: %s", data_class.__name__, e)
+            return None
+
+    # Register before resolving fields so self-referencing types terminate.
+    cache[data_class] = convert_dataclass
+    for f in data_class.__dataclass_fields__.values():
+        converters[f.name] = _compile_converter(f.type, cache)
+
+    if all(converter is None for converter in converters.values()):
+        cache[data_class] = convert_flat_dataclass
+    return cache[data_class]
+
+
+def compile_decoders(message_types: Dict[str, type]) -> Dict[str, Callable[[Dict[str, Any]], Any]]:
+    """Precompile a `type` -> constructor table for the given message classes."""
+    cache: Dict[Any, Callable[[Any], Any]] = {}
+    return {event_type: _compile_dataclass(data_class, cache) for event_type, data_class in message_types.items()}
+
+
+_SERVER_MESSAGE_DECODERS = compile_decoders(SERVER_MESSAGE_TYPES)
+_CLIENT_MESSAGE_DECODERS = compile_decoders(CLIENT_MESSAGE_TYPES)
+
+
 def parse_client_message(unparsed_string: str) -> ClientToServerMessage:
-    data = json.loads(unparsed_string)
-    
-    # Dynamically select the correct message class based on the `type` field, using from_dict
-    if data["type"] == EventType.INPUT_AUDIO_BUFFER_APPEND:
-        return from_dict(InputAudioBufferAppend, data)
-    elif data["type"] == EventType.INPUT_AUDIO_BUFFER_COMMIT:
-        return from_dict(InputAudioBufferCommit, data)
-    elif data["type"] == EventType.INPUT_AUDIO_BUFFER_CLEAR:
-        return from_dict(InputAudioBufferClear, data)
-    elif data["type"] == EventType.ITEM_CREATE:
-        return from_dict(ItemCreate, data)
-    elif data["type"] == EventType.ITEM_TRUNCATE:
-        return from_dict(ItemTruncate, data)
-    elif data["type"] == EventType.ITEM_DELETE:
-        return from_dict(ItemDelete, data)
-    elif data["type"] == EventType.RESPONSE_CREATE:
-        return from_dict(ResponseCreate, data)
-    elif data["type"] == EventType.RESPONSE_CANCEL:
-        return from_dict(ResponseCancel, data)
-    elif data["type"] == EventType.UPDATE_CONVERSATION_CONFIG:
-        return from_dict(UpdateConversationConfig, data)
-    elif data["type"] == EventType.SESSION_UPDATE:
-        return from_dict(SessionUpdate, data)
-    
-    raise ValueError(f"Unknown message type: {data['type']}")
+    data = default_codec.loads(unparsed_string)
 
+    decoder = _CLIENT_MESSAGE_DECODERS.get(data["type"])
+    if decoder is None:
+        raise ValueError(f"Unknown message type: {data['type']}")
+    return decoder(data)
 
-# Assuming all necessary classes and enums (EventType, ServerToClientMessages, etc.) are imported
-# Here’s how you can dynamically parse a server-to-client message based on the `type` field:
 
 def parse_server_message(unparsed_string: str) -> ServerToClientMessage:
-    data = json.loads(unparsed_string)
-
-    # Dynamically select the correct message class based on the `type` field, using from_dict
-    if data["type"] == EventType.ERROR:
-        return from_dict(ErrorMessage, data)
-    elif data["type"] == EventType.SESSION_CREATED:
-        return from_dict(SessionCreated, data)
-    elif data["type"] == EventType.SESSION_UPDATED:
-        return from_dict(SessionUpdated, data)
-    elif data["type"] == EventType.INPUT_AUDIO_BUFFER_COMMITTED:
-        return from_dict(InputAudioBufferCommitted, data)
-    elif data["type"] == EventType.INPUT_AUDIO_BUFFER_CLEARED:
-        return from_dict(InputAudioBufferCleared, data)
-    elif data["type"] == EventType.INPUT_AUDIO_BUFFER_SPEECH_STARTED:
-        return from_dict(InputAudioBufferSpeechStarted, data)
-    elif data["type"] == EventType.INPUT_AUDIO_BUFFER_SPEECH_STOPPED:
-        return from_dict(InputAudioBufferSpeechStopped, data)
-    elif data["type"] == EventType.ITEM_CREATED:
-        return from_dict(ItemCreated, data)
-    elif data["type"] == EventType.ITEM_TRUNCATED:
-        return from_dict(ItemTruncated, data)
-    elif data["type"] == EventType.ITEM_DELETED:
-        return from_dict(ItemDeleted, data)
-    elif data["type"] == EventType.RESPONSE_CREATED:
-        return from_dict(ResponseCreated, data)
-    elif data["type"] == EventType.RESPONSE_DONE:
-        return from_dict(ResponseDone, data)
-    elif data["type"] == EventType.RESPONSE_TEXT_DELTA:
-        return from_dict(ResponseTextDelta, data)
-    elif data["type"] == EventType.RESPONSE_TEXT_DONE:
-        return from_dict(ResponseTextDone, data)
-    elif data["type"] == EventType.RESPONSE_AUDIO_TRANSCRIPT_DELTA:
-        return from_dict(ResponseAudioTranscriptDelta, data)
-    elif data["type"] == EventType.RESPONSE_AUDIO_TRANSCRIPT_DONE:
-        return from_dict(ResponseAudioTranscriptDone, data)
-    elif data["type"] == EventType.RESPONSE_AUDIO_DELTA:
-        return from_dict(ResponseAudioDelta, data)
-    elif data["type"] == EventType.RESPONSE_AUDIO_DONE:
-        return from_dict(ResponseAudioDone, data)
-    elif data["type"] == EventType.RESPONSE_FUNCTION_CALL_ARGUMENTS_DELTA:
-        return from_dict(ResponseFunctionCallArgumentsDelta, data)
-    elif data["type"] == EventType.RESPONSE_FUNCTION_CALL_ARGUMENTS_DONE:
-        return from_dict(ResponseFunctionCallArgumentsDone, data)
-    elif data["type"] == EventType.RATE_LIMITS_UPDATED:
-        return from_dict(RateLimitsUpdated, data)
-    elif data["type"] == EventType.RESPONSE_OUTPUT_ITEM_ADDED:
-        return from_dict(ResponseOutputItemAdded, data)
-    elif data["type"] == EventType.RESPONSE_CONTENT_PART_ADDED:
-        return from_dict(ResponseContentPartAdded, data)
-    elif data["type"] == EventType.RESPONSE_CONTENT_PART_DONE:
-        return from_dict(ResponseContentPartDone, data)
-    elif data["type"] == EventType.RESPONSE_OUTPUT_ITEM_DONE:
-        return from_dict(ResponseOutputItemDone, data)
-    elif data["type"] == EventType.ITEM_INPUT_AUDIO_TRANSCRIPTION_COMPLETED:
-        return from_dict(ItemInputAudioTranscriptionCompleted, data)
-    elif data["type"] == EventType.ITEM_INPUT_AUDIO_TRANSCRIPTION_FAILED:
-        return from_dict(ItemInputAudioTranscriptionFailed, data)
-
-    raise ValueError(f"Unknown message type: {data['type']}")
-    
+    data = default_codec.loads(unparsed_string)
+
+    decoder = _SERVER_MESSAGE_DECODERS.get(data["type"])
+    if decoder is None:
+        raise ValueError(f"Unknown message type: {data['type']}")
+    return decoder(data)
+
+
+class LazyResponseAudioDelta:
+    """A `response.audio.delta` event decoded without parsing the whole frame.
+
+    Only the small id/index fields are extracted; the base64 payload stays in the
+    raw frame until `decode` or `decode_into` is called.
+    """
+
+    __slots__ = ("event_id", "response_id", "item_id", "output_index", "content_index", "_frame", "_start", "_end")
+
+    type = EventType.RESPONSE_AUDIO_DELTA
+
+    def __init__(self, event_id: str, response_id: str, item_id: str, output_index: int, content_index: int,
+                 frame: str, start: int, end: int) -> None:
+        self.event_id = event_id
+        self.response_id = response_id
+        self.item_id = item_id
+        self.output_index = output_index
+        self.content_index = content_index
+        self._frame = frame
+        self._start = start
+        self._end = end
+
+    @property
+    def delta(self) -> str:
+        """The base64 payload, as `ResponseAudioDelta.delta` would hold it."""
+        return self._frame[self._start:self._end]
+
+    @property
+    def decoded_size(self) -> int:
+        """Size in bytes of the decoded pcm payload."""
+        length = self._end - self._start
+        padding = 0
+        if length:
+            padding = (self._frame[self._end - 1] == "=") + (self._frame[self._end - 2] == "=")
+        return length // 4 * 3 - padding
+
+    def decode(self) -> bytes:
+        return binascii.a2b_base64(self.delta)
+
+    def decode_into(self, buffer: Union[bytearray, memoryview], offset: int = 0) -> int:
+        """Write the decoded pcm payload into `buffer` at `offset`, returning the number of bytes written."""
+        pcm = self.decode()
+        buffer[offset:offset + len(pcm)] = pcm
+        return len(pcm)
+
+    def to_message(self) -> ResponseAudioDelta:
+        return ResponseAudioDelta(
+            event_id=self.event_id,
+            response_id=self.response_id,
+            item_id=self.item_id,
+            output_index=self.output_index,
+            content_index=self.content_index,
+            delta=self.delta,
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"LazyResponseAudioDelta(event_id={self.event_id!r}, response_id={self.response_id!r}, "
+            f"item_id={self.item_id!r}, output_index={self.output_index}, content_index={self.content_index}, "
+            f"delta=<{self._end - self._start} base64 chars>)"
+        )
+
+
+_AUDIO_DELTA_TYPE = f'"{EventType.RESPONSE_AUDIO_DELTA.value}"'
+
+
+def parse_audio_delta(unparsed_string: str) -> Optional[LazyResponseAudioDelta]:
+    """Sniff a raw frame for a `response.audio.delta` event.
+
+    Returns None for any other event, or for any frame the scanner is not sure
+    about, in which case the caller should fall back to `parse_server_message`.
+    """
+    # Other events with a "delta" (transcript, text, function arguments) would otherwise be parsed twice
+    if _AUDIO_DELTA_TYPE not in unparsed_string:
+        return None
+    key = unparsed_string.find('"delta"')
+    if key < 0:
+        return None
+    start = unparsed_string.find('"', key + 7)
+    if start < 0 or unparsed_string[key + 7:start].strip() != ":":
+        return None
+    start += 1
+    # base64 never contains quotes or escapes, so the payload ends at the next quote.
+    end = unparsed_string.find('"', start)
+    if end < 0 or unparsed_string[end - 1] == "\\":
+        return None
+
+    # Parse everything but the payload: drop the "delta" pair and mend the comma it leaves behind.
+    head = unparsed_string[:key].rstrip()
+    tail = unparsed_string[end + 1:].lstrip()
+    if head.endswith(","):
+        if tail.startswith(",") or tail.startswith("}"):
+            head = head[:-1]
+    elif tail.startswith(","):
+        tail = tail[1:]
+    try:
+        fields = default_codec.loads(head + tail)
+    except Exception:
+        return None
+
+    if not isinstance(fields, dict) or fields.get("type") != EventType.RESPONSE_AUDIO_DELTA.value:
+        return None
+    try:
+        event_id, response_id, item_id = fields["event_id"], fields["response_id"], fields["item_id"]
+        output_index, content_index = fields["output_index"], fields["content_index"]
+    except KeyError:
+        return None
+
+    return LazyResponseAudioDelta(
+        event_id=event_id,
+        response_id=response_id,
+        item_id=item_id,
+        output_index=output_index,
+        content_index=content_index,
+        frame=unparsed_string,
+        start=start,
+        end=end,
+    )
+
+
 def to_json(obj: Union[ClientToServerMessage, ServerToClientMessage]) -> str:
-    return json.dumps(asdict(obj))
\ No newline at end of file
+    """Compact JSON from the default codec, which is not byte-identical to the old `json.dumps(asdict(obj))`; see codec.py."""
+    return default_codec.dumps(obj).decode("utf-8")
+
+
+def to_json_bytes(obj: Union[ClientToServerMessage, ServerToClientMessage]) -> bytes:
+    """Encode a message straight to the UTF-8 bytes sent on the wire."""
+    return default_codec.dumps(obj)
+
+
+class EncodedRequest:
+    """A client event that is already encoded, sent as is.
+
+    Only `type` is read, so the send queue still puts control events ahead of
+    audio. Used for session.update deltas and for events the proxy forwards
+    unchanged, including fields this package does not model.
+    """
+
+    __slots__ = ("type", "payload")
+
+    def __init__(self, type: Optional[str], payload: Union[str, bytes]) -> None:
+        self.type = type
+        self.payload = payload
+
+
+def session_delta(applied: SessionUpdateParams, params: SessionUpdateParams) -> Dict[str, Any]:
+    """Fields of `params` that differ from a session already configured with `applied`."""
+    return {
+        f.name: getattr(params, f.name)
+        for f in fields(SessionUpdateParams)
+        if getattr(params, f.name) != getattr(applied, f.name)
+    }
+
+class AudioAppendEncoder:
+    """Encodes `input_audio_buffer.append` messages without building a dataclass.
+
+    The JSON envelope is pre-rendered around the base64 payload, and event ids
+    are a per-encoder prefix plus a monotonic counter instead of a uuid4 per
+    frame. The output is byte-identical to `to_json_bytes(InputAudioBufferAppend(...))`.
+    """
+
+    def __init__(self, prefix: Optional[str] = None) -> None:
+        self.prefix = prefix if prefix is not None else f"audio_{uuid.uuid4().hex[:12]}_"
+        self._counter = itertools.count(1)
+        self._head = b'{"event_id":"' + self.prefix.encode("utf-8")
+        self._middle = b'","audio":"'
+        self._tail = b'","type":"' + EventType.INPUT_AUDIO_BUFFER_APPEND.value.encode("utf-8") + b'"}'
+
+    def next_event_id(self) -> str:
+        return f"{self.prefix}{next(self._counter)}"
+
+    def encode(self, audio_data: bytes) -> bytes:
+        """Return the wire bytes for appending `audio_data` (raw pcm) to the input buffer."""
+        return b"".join((
+            self._head,
+            str(next(self._counter)).encode("ascii"),
+            self._middle,
+            binascii.b2a_base64(audio_data, newline=False),
+            self._tail,
+        ))
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable
+
+import psutil
+from attr import dataclass
+
+from .logger import setup_logger
+
+# Set up the logger with color and timestamp support
+logger = setup_logger(name=__name__, log_level=logging.INFO)
+
+
+@dataclass(frozen=True, kw_only=True)
+class ResourceSamplerConfig:
+    interval_s: float = 2.0  # Time between samples; /status is at most this stale
+
+    @classmethod
+    def from_env(cls) -> "ResourceSamplerConfig":
+        return cls(interval_s=float(os.environ.get("STATUS_SAMPLE_INTERVAL_S") or 2.0))
+
+
+class ResourceSampler:
+    """Samples host, process and per-agent resource use on a background thread.
+
+    Each sample builds a new dict and swaps it into `snapshot` in one assignment,
+    so readers such as the /status route take no lock and never see a
+    half-written sample. `agents()` is polled every interval. It returns, per
+    channel, the native id of the thread running that agent and the agent's
+    event loop, if known yet. These give per-channel CPU time and scheduling lag;
+    the lag is measured with a callback scheduled on the loop from this thread.
+    """
+
+    def __init__(
+        self,
+        config: ResourceSamplerConfig,
+        agents: Callable[[], dict[str, tuple[int | None, asyncio.AbstractEventLoop | None]]],
+    ) -> None:
+        self.config = config
+        self.agents = agents
+        self.process = psutil.Process()
+        self.snapshot: dict[str, Any] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._thread_cpu: dict[int, float] = {}  # native thread id -> cpu seconds at the previous sample
+        self._probes: dict[str, float] = {}  # channel -> when the pending lag probe was scheduled
+        self._lag_ms: dict[str, float] = {}  # channel -> last measured loop lag
+
+    def start(self) -> None:
+        # Prime the cpu_percent counters, so the first real sample covers one interval
+        psutil.cpu_percent(None)
+        self.process.cpu_percent(None)
+        self.sample()
+        self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.config.interval_s):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.warning(f"Resource sampling failed: {e}")
+
+    def sample(self) -> None:
+        now = time.monotonic()
+        memory = psutil.virtual_memory()
+        with self.process.oneshot():
+            cpu_times = {thread.id: thread.user_time + thread.system_time for thread in self.process.threads()}
+            process = {
+                "cpu_percent": self.process.cpu_percent(None),
+                "rss_bytes": self.process.memory_info().rss,
+                "num_fds": self.process.num_fds(),
+                "num_threads": self.process.num_threads(),
+            }
+
+        channels = {}
+        agents = self.agents()
+        for channel_name, (thread_id, loop) in agents.items():
+            previous = self._thread_cpu.get(thread_id)
+            cpu = cpu_times.get(thread_id)
+            channels[channel_name] = {
+                "cpu_percent": round(100 * (cpu - previous) / self.config.interval_s, 1) if cpu is not None and previous is not None else None,
+                "loop_lag_ms": self._probe(channel_name, loop, now) if loop is not None else None,
+            }
+        self._thread_cpu = cpu_times
+        for channel_name in list(self._lag_ms):
+            if channel_name not in agents:
+                self._lag_ms.pop(channel_name, None)
+                self._probes.pop(channel_name, None)
+
+        self.snapshot = {
+            "sampled_at": time.time(),
+            "host": {
+                "cpu_percent": psutil.cpu_percent(None),
+                "load_average": os.getloadavg(),
+                "memory_percent": memory.percent,
+                "memory_available_bytes": memory.available,
+            },
+            "process": process,
+            "channels": channels,
+        }
+
+    def _probe(self, channel_name: str, loop: asyncio.AbstractEventLoop, now: float) -> float | None:
+        """Return the latest lag of `loop` and schedule the next probe; a probe still pending counts as lag so far."""
+        pending_since = self._probes.get(channel_name)
+        if pending_since is not None:
+            return round((now - pending_since) * 1000, 1)
+
+        def answered(sent: float = now) -> None:
+            self._lag_ms[channel_name] = (time.monotonic() - sent) * 1000
+            self._probes.pop(channel_name, None)
+
+        self._probes[channel_name] = now
+        try:
+            loop.call_soon_threadsafe(answered)
+        except RuntimeError:
+            self._probes.pop(channel_name, None)  # the loop has closed
+        lag = self._lag_ms.get(channel_name)
+        return round(lag, 1) if lag is not None else None
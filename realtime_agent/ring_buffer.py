@@ -0,0 +1,165 @@
+import asyncio
+from enum import Enum
+from typing import Any
+
+
+class OverflowPolicy(str, Enum):
+    DropOldest = "drop_oldest"  # Overwrite the oldest buffered bytes
+    Block = "block"  # Wait until a reader makes room; never use on a path that must not stall, e.g. a socket reader
+    DropNewest = "drop_newest"  # Discard the part of the write that does not fit
+
+
+class AudioRingBuffer:
+    """Fixed-capacity byte ring with async read/write waits.
+
+    Storage is allocated once (a bytearray, or a numpy uint8 array with
+    `use_numpy=True`) and accessed through a memoryview, so memory per buffer is
+    capped at `capacity` bytes no matter how far the producer runs ahead.
+    """
+
+    def __init__(self, capacity: int, overflow: OverflowPolicy = OverflowPolicy.DropOldest, use_numpy: bool = False) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if use_numpy:
+            import numpy as np
+
+            self._storage = np.zeros(capacity, dtype=np.uint8)
+        else:
+            self._storage = bytearray(capacity)
+        self._view = memoryview(self._storage).cast("B")
+        self.capacity = capacity
+        self.overflow = OverflowPolicy(overflow)
+        self._read = 0
+        self._length = 0
+        self._generation = 0  # Bumped by clear(), so writers waiting for room give up
+        self._readable = asyncio.Event()
+        self._writable = asyncio.Event()
+        self._writable.set()
+
+        self.bytes_written = 0
+        self.bytes_read = 0
+        self.dropped_bytes = 0
+        self.high_water_mark = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def free(self) -> int:
+        return self.capacity - self._length
+
+    def write_nowait(self, data: bytes) -> int:
+        """Write without waiting, applying the overflow policy; returns the number of bytes dropped.
+
+        With the Block policy only what fits is written and the rest is reported as dropped.
+        """
+        data = memoryview(data).cast("B")
+        dropped = 0
+        if len(data) > self.free:
+            if self.overflow == OverflowPolicy.DropOldest:
+                if len(data) > self.capacity:
+                    dropped += len(data) - self.capacity
+                    data = data[-self.capacity:]
+                overflow = self._length + len(data) - self.capacity
+                if overflow > 0:
+                    self._read = (self._read + overflow) % self.capacity
+                    self._length -= overflow
+                    dropped += overflow
+            else:
+                dropped = len(data) - self.free
+                data = data[:self.free]
+
+        self._copy_in(data)
+        self.dropped_bytes += dropped
+        return dropped
+
+    async def write(self, data: bytes) -> int:
+        """Write `data`, waiting for room under the Block policy; returns the number of bytes dropped.
+
+        A `clear()` while waiting discards the rest of `data` too: it belongs to
+        the audio that was just flushed. Those bytes are returned but not counted
+        in `dropped_bytes`.
+        """
+        if self.overflow != OverflowPolicy.Block:
+            return self.write_nowait(data)
+
+        data = memoryview(data).cast("B")
+        generation = self._generation
+        while data:
+            while not self.free:
+                self._writable.clear()
+                await self._writable.wait()
+                if self._generation != generation:
+                    return len(data)
+            size = min(len(data), self.free)
+            self._copy_in(data[:size])
+            data = data[size:]
+        return 0
+
+    def read_nowait(self, size: int) -> bytes:
+        """Read up to `size` bytes without waiting."""
+        size = min(size, self._length)
+        first = min(size, self.capacity - self._read)
+        chunk = bytes(self._view[self._read:self._read + first])
+        if first < size:
+            chunk += bytes(self._view[:size - first])
+        self._consume(size)
+        return chunk
+
+    def read_into(self, buffer: bytearray | memoryview) -> int:
+        """Read up to len(buffer) bytes into `buffer` without waiting; returns the number of bytes read."""
+        target = memoryview(buffer).cast("B")
+        size = min(len(target), self._length)
+        first = min(size, self.capacity - self._read)
+        target[:first] = self._view[self._read:self._read + first]
+        target[first:size] = self._view[:size - first]
+        self._consume(size)
+        return size
+
+    async def read(self, size: int) -> bytes:
+        """Wait until `size` bytes are buffered, then read them."""
+        await self.wait_for(size)
+        return self.read_nowait(size)
+
+    async def wait_for(self, size: int) -> None:
+        """Wait until at least `size` bytes are buffered."""
+        size = min(size, self.capacity)
+        while self._length < size:
+            self._readable.clear()
+            await self._readable.wait()
+
+    def clear(self) -> None:
+        """Drop everything buffered in O(1); writers blocked on room return without writing the rest."""
+        self._read = 0
+        self._length = 0
+        self._generation += 1
+        self._readable.clear()
+        self._writable.set()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "buffered": self._length,
+            "high_water_mark": self.high_water_mark,
+            "bytes_written": self.bytes_written,
+            "bytes_read": self.bytes_read,
+            "dropped_bytes": self.dropped_bytes,
+        }
+
+    def _copy_in(self, data: memoryview) -> None:
+        start = (self._read + self._length) % self.capacity
+        first = min(len(data), self.capacity - start)
+        self._view[start:start + first] = data[:first]
+        self._view[:len(data) - first] = data[first:]
+        self._length += len(data)
+        self.bytes_written += len(data)
+        self.high_water_mark = max(self.high_water_mark, self._length)
+        if data:
+            self._readable.set()
+
+    def _consume(self, size: int) -> None:
+        self._read = (self._read + size) % self.capacity
+        self._length -= size
+        self.bytes_read += size
+        if size:
+            self._writable.set()
@@ -17,6 +17,7 @@ from .agent import InferenceConfig, RealtimeKitAgent
 from .realtime.struct import ServerVADUpdateParams, Voices
 from .serializers import StartAgentRequestBody, StopAgentRequestBody, ValidationError
 from .main import run_agent_in_process
+from .resources import ResourceSampler, ResourceSamplerConfig
 
 # Load environment variables
 load_dotenv(override=True)
@@ -39,6 +40,19 @@ socketio = SocketIO(app, debug=True, cors_allowed_origins="*", async_mode='event
 active_channels = {}
 
 
+def agent_threads():
+    """Native thread id and event loop (once running) of every active agent, for the resource sampler."""
+    return {
+        channel_name: (entry["thread"].native_id, entry.get("loop"))
+        for channel_name, entry in list(active_channels.items())
+    }
+
+
+# Samples in the background so /status never does the work itself
+resource_sampler = ResourceSampler(ResourceSamplerConfig.from_env(), agent_threads)
+resource_sampler.start()
+
+
 @app.route('/')
 def index():
     return 'Hello, World!'
@@ -122,10 +136,15 @@ def start_agent(info):
                 print(f"Error emitting message: {e}")
 
 
+    channel_entry = {"queue": message_queue}
+
     # Run the agent in a background thread
     def run_agent():
         try:
-            run_agent_in_process(app_id, app_cert, channel_name, uid, inference_config, agent_callback)
+            run_agent_in_process(
+                app_id, app_cert, channel_name, uid, inference_config, agent_callback,
+                on_loop=lambda loop: channel_entry.update(loop=loop),
+            )
         finally:
             # Cleanup after the process finishes
             active_channels.pop(channel_name, None)
@@ -137,10 +156,8 @@ def start_agent(info):
 
     emit('agent_started', {'data': 'Agent is starting'})
 
-    active_channels[channel_name] = {
-        "thread": thread,
-        "queue": message_queue
-    }
+    channel_entry["thread"] = thread
+    active_channels[channel_name] = channel_entry
 
     socketio.start_background_task(emit_messages_from_queue)
 
@@ -174,27 +191,15 @@ def handle_ping(info):
 @app.route('/status', methods=['GET'])
 def get_cpu_usage():
     """
-    Run the 'top' command and return only the CPU usage percentage.
+    Return the latest background resource sample: host and process usage plus a per-channel breakdown.
     """
-    try:
-        # Run the 'top' command on Linux
-        result = subprocess.run(['/usr/bin/top', '-b', '-n', '1'], stdout=subprocess.PIPE, text=True)
-        output = result.stdout
-
-        # Find the line with CPU usage information
-        lines = output.splitlines()
-        cpu_line = next((line for line in lines if "Cpu(s):" in line), None)
-
-        if cpu_line:
-            # Extract the percentage of CPU usage for user space
-            # Example line: "Cpu(s):  8.4%us,  4.5%sy, 87.1%id, ..."
-            cpu_usage = cpu_line.split(",")[0].split(":")[1].strip()
-            return jsonify({"status": "success", "cpu_usage": cpu_usage}), 200
-        else:
-            return jsonify({"status": "error", "message": "CPU usage info not found"}), 500
-    except Exception as e:
-        print(f"Error running 'top' command: {e}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+    snapshot = resource_sampler.snapshot
+    return jsonify({
+        "status": "success",
+        "cpu_usage": snapshot["host"]["cpu_percent"],
+        "active_channels": len(snapshot["channels"]),
+        **snapshot,
+    }), 200
 
 @app.route('/restart', methods=['GET'])
 def restart_service():
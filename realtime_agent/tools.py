@@ -108,9 +108,9 @@ class ToolContext(abc.ABC):
         assert isinstance(args, dict)
 
         if isinstance(tool, LocalFunctionToolDeclaration):
-            logger.info(f"Executing tool {tool_name} with args {args}")
+            logger.info("Executing tool %s with args %s", tool_name, args)
             result = await tool.function(**args)
-            logger.info(f"Tool {tool_name} executed with result {result}")
+            logger.info("Tool %s executed with result %s", tool_name, result)
             return LocalToolCallExecuted(json_encoded_output=json.dumps(result))
 
         if isinstance(tool, PassThroughFunctionToolDeclaration):
@@ -0,0 +1,195 @@
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from .realtime.struct import PCM_CHANNELS, PCM_SAMPLE_RATE
+
+
+class PhaseTimer:
+    """Wall-clock durations of named phases, in milliseconds."""
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter) -> None:
+        self._clock = clock
+        self.phases: dict[str, float] = {}
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        start = self._clock()
+        try:
+            yield
+        finally:
+            self.phases[name] = (self._clock() - start) * 1000
+
+    def __str__(self) -> str:
+        return ", ".join(f"{name}={ms:.0f}ms" for name, ms in self.phases.items())
+
+
+# Upper bounds of the histogram buckets kept alongside the samples, in milliseconds
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyRecorder:
+    """Keeps the most recent `max_samples` latencies per name for percentile reporting.
+
+    Every observation is also counted into fixed `buckets` with a running sum, so
+    totals can be exported as histograms and added up across processes.
+    """
+
+    def __init__(self, max_samples: int = 1000, buckets: tuple[float, ...] = LATENCY_BUCKETS_MS) -> None:
+        self.max_samples = max_samples
+        self.buckets = buckets
+        self.samples: dict[str, deque[float]] = {}
+        self.counts: dict[str, int] = {}
+        self.sums: dict[str, float] = {}
+        # Per name, observations per bucket; the extra last slot is the +Inf bucket
+        self.bucket_counts: dict[str, list[int]] = {}
+
+    def observe(self, name: str, ms: float) -> None:
+        if name not in self.samples:
+            self.samples[name] = deque(maxlen=self.max_samples)
+            self.counts[name] = 0
+            self.sums[name] = 0.0
+            self.bucket_counts[name] = [0] * (len(self.buckets) + 1)
+        self.samples[name].append(ms)
+        self.counts[name] += 1
+        self.sums[name] += ms
+        self.bucket_counts[name][bisect_left(self.buckets, ms)] += 1
+
+    def observe_phases(self, timer: PhaseTimer) -> None:
+        for name, ms in timer.phases.items():
+            self.observe(name, ms)
+
+    def percentiles(self, name: str, quantiles: tuple[float, ...] = (0.5, 0.95, 0.99)) -> dict[str, float | None]:
+        samples = sorted(self.samples.get(name, ()))
+        return {
+            f"p{round(q * 100)}": samples[min(len(samples) - 1, int(q * len(samples)))] if samples else None
+            for q in quantiles
+        }
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        return {name: {"count": self.counts[name], **self.percentiles(name)} for name in self.samples}
+
+    def clear(self) -> None:
+        self.samples.clear()
+        self.counts.clear()
+        self.sums.clear()
+        self.bucket_counts.clear()
+
+
+class TurnTracer:
+    """Timestamps each step of a conversational turn, from the user's last word to the agent's first audio.
+
+    Marks, in pipeline order: the user's last speech frame arriving from RTC,
+    speech_stopped, committed, response_created, the first audio delta and the
+    first frame pushed back to RTC. When a turn completes, each mark's delay from
+    the previous mark is recorded under the mark's name, and, when the user's
+    last speech frame was found, the whole span from it as "mouth_to_ear".
+    Turns without it (e.g. a response the agent started itself, or speech older
+    than the audio history) are counted in `untimed_turns` instead. Samples go
+    to this session's `latency` and to the process-wide `turn_latency`.
+
+    The last speech frame is found by mapping speech_stopped's audio_end_ms back
+    onto the wall-clock time at which that audio arrived, so nothing is measured
+    per frame beyond a counter and a bounded deque append.
+    """
+
+    MARKS = ("last_speech_frame", "speech_stopped", "committed", "response_created", "first_delta", "first_push")
+
+    def __init__(
+        self,
+        clock: Callable[[], float] = time.monotonic,
+        history_ms: int = 30_000,
+        bytes_per_ms: int = PCM_SAMPLE_RATE * PCM_CHANNELS * 2 // 1000,
+        frame_ms: int = 10,
+    ) -> None:
+        self._clock = clock
+        self._bytes_per_ms = bytes_per_ms
+        # (upstream audio ms sent once this chunk is in, time its RTC frame arrived)
+        self._audio: deque[tuple[float, float]] = deque(maxlen=history_ms // frame_ms)
+        self._audio_ms = 0.0
+        self._audio_origin_ms = 0.0  # Upstream audio sent before the current model session started
+        self._marks: dict[str, float] = {}
+        self.latency = LatencyRecorder()
+        self.turns = 0
+        self.untimed_turns = 0
+        self.abandoned_turns = 0
+
+    def audio_sent(self, size: int, received_at: float) -> None:
+        """An upstream audio chunk of `size` bytes, from an RTC frame that arrived at `received_at`."""
+        self._audio_ms += size / self._bytes_per_ms
+        self._audio.append((self._audio_ms, received_at))
+
+    def session_restarted(self) -> None:
+        """The model session was re-created, so its audio_end_ms count starts again from zero."""
+        self._audio_origin_ms = self._audio_ms
+        self._marks.clear()
+
+    def speech_started(self) -> None:
+        if self._marks:
+            # The user spoke again before hearing an answer; that turn never completes
+            self.abandoned_turns += 1
+            self._marks.clear()
+
+    def speech_stopped(self, audio_end_ms: int) -> None:
+        now = self._clock()
+        target_ms = self._audio_origin_ms + audio_end_ms
+        for sent_ms, received_at in reversed(self._audio):
+            if sent_ms <= target_ms:
+                self._marks["last_speech_frame"] = received_at
+                break
+        self._marks["speech_stopped"] = now
+
+    def mark(self, name: str) -> None:
+        """Record `name` for the current turn; committed and response_created also open a turn without server VAD."""
+        if name not in self._marks and (self._marks or name in ("committed", "response_created")):
+            self._marks[name] = self._clock()
+
+    def frame_pushed(self) -> None:
+        """Called for every frame pushed to RTC; the first one after a response started completes the turn."""
+        if "first_delta" not in self._marks:
+            return
+        self._marks["first_push"] = self._clock()
+        previous = None
+        for name in self.MARKS:
+            at = self._marks.get(name)
+            if at is None:
+                continue
+            if previous is not None:
+                self._observe(name, (at - previous) * 1000)
+            previous = at
+        if "last_speech_frame" in self._marks:
+            self._observe("mouth_to_ear", (self._marks["first_push"] - self._marks["last_speech_frame"]) * 1000)
+        else:
+            self.untimed_turns += 1
+        self.turns += 1
+        self._marks.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "turns": self.turns,
+            "untimed_turns": self.untimed_turns,
+            "abandoned_turns": self.abandoned_turns,
+            **self.latency.snapshot(),
+        }
+
+    def _observe(self, name: str, ms: float) -> None:
+        self.latency.observe(name, ms)
+        turn_latency.observe(name, ms)
+
+
+# Per-phase agent startup latency for every session started in this process
+startup_latency = LatencyRecorder()
+
+# Per-step conversational turn latency for every session in this process
+turn_latency = LatencyRecorder()
+
+# Realtime API websocket downtime per reconnect in this process
+connection_downtime = LatencyRecorder()
+
+# Event-loop scheduling lag of this process, see loop_monitor.LoopMonitor
+loop_lag = LatencyRecorder()
+
+# Delay upstream batching added to each chunk sent, see audio_aggregator.UpstreamAudioAggregator
+upstream_batch_delay = LatencyRecorder()
@@ -1,6 +1,8 @@
 import asyncio
 import functools
+import os
 from datetime import datetime
+from multiprocessing.process import BaseProcess
 
 
 def write_pcm_to_file(buffer: bytearray, file_name: str) -> None:
@@ -47,3 +49,25 @@ class PCMWriter:
                 functools.partial(write_pcm_to_file, self.buffer[:], self.file_name),
             )
         self.buffer.clear()
+
+
+async def wait_for_process(process: BaseProcess, timeout: float | None = None) -> bool:
+    """Wait for a started process to exit without tying up an executor thread; returns whether it exited.
+
+    The loop watches the process sentinel, a descriptor that becomes readable
+    when the process ends. Each call watches its own duplicate, so several
+    waiters on the same process do not replace each other's reader.
+    """
+    loop = asyncio.get_running_loop()
+    exited = loop.create_future()
+    fd = os.dup(process.sentinel)
+    loop.add_reader(fd, lambda: exited.done() or exited.set_result(None))
+    try:
+        await asyncio.wait_for(exited, timeout)
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        loop.remove_reader(fd)
+        os.close(fd)
+    process.join()  # already exited: only reaps it and sets exitcode
+    return True
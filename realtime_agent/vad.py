@@ -0,0 +1,120 @@
+from collections import deque
+from typing import Any
+
+import numpy as np
+from attr import dataclass
+
+from .realtime.struct import PCM_CHANNELS, PCM_SAMPLE_RATE
+
+PCM_BYTES_PER_MS = PCM_SAMPLE_RATE * PCM_CHANNELS * 2 // 1000
+
+
+@dataclass(frozen=True, kw_only=True)
+class LocalVADConfig:
+    """Client-side voice activity detection used to suppress silence before it is sent upstream."""
+
+    energy_threshold_db: float = -45.0  # Frames quieter than this (dBFS RMS) are never speech
+    noise_margin_db: float = 10.0  # Speech must also be this far above the tracked noise floor
+    max_zero_crossing_rate: float = 0.35  # Quiet frames crossing zero more often than this are hiss, not voice
+    loud_margin_db: float = 15.0  # Frames this far above the threshold count as speech regardless of zero crossings
+    hangover_ms: int = 600  # Keep sending after speech so the server VAD sees silence_duration_ms of silence
+    prefix_padding_ms: int = 300  # Audio replayed from before speech onset, mirrors ServerVADUpdateParams.prefix_padding_ms
+    keepalive_ms: int = 0  # While suppressing, still send one frame every keepalive_ms; 0 drops silence entirely
+
+
+def frame_features(frame: bytes) -> tuple[float, float]:
+    """Return the RMS level in dBFS and the zero-crossing rate of a pcm16 frame."""
+    samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+    if samples.size == 0:
+        return -120.0, 0.0
+    rms = float(np.sqrt(np.mean(samples * samples)))
+    level_db = 20.0 * np.log10(max(rms, 1.0) / 32768.0)
+    crossings = np.count_nonzero(np.signbit(samples[1:]) != np.signbit(samples[:-1]))
+    return float(level_db), crossings / max(samples.size - 1, 1)
+
+
+class SilenceSuppressor:
+    """Energy/zero-crossing voice gate for the upstream audio path.
+
+    `process()` returns the frames that should be sent for each input frame:
+    nothing while suppressing silence, the buffered prefix padding plus the
+    frame at speech onset, and every frame during speech and its hangover.
+    """
+
+    def __init__(self, config: LocalVADConfig) -> None:
+        self.config = config
+        self.speaking = False
+        self._noise_floor_db = config.energy_threshold_db
+        self._hangover_left_ms = 0.0
+        self._since_keepalive_ms = 0.0
+        self._prefix: deque[bytes] = deque()
+        self._prefix_ms = 0.0
+
+        self.frames_in = 0
+        self.frames_sent = 0
+        self.frames_suppressed = 0
+        self.speech_segments = 0
+
+    def is_speech(self, frame: bytes) -> bool:
+        level_db, zero_crossing_rate = frame_features(frame)
+        threshold = max(self.config.energy_threshold_db, self._noise_floor_db + self.config.noise_margin_db)
+        if level_db >= threshold + self.config.loud_margin_db:
+            speech = True
+        else:
+            speech = level_db >= threshold and zero_crossing_rate <= self.config.max_zero_crossing_rate
+        if not speech:
+            # Track the background level slowly, only from frames that are not speech
+            self._noise_floor_db += 0.05 * (level_db - self._noise_floor_db)
+        return speech
+
+    def process(self, frame: bytes) -> list[bytes]:
+        self.frames_in += 1
+        frame_ms = len(frame) / PCM_BYTES_PER_MS
+
+        if self.is_speech(frame):
+            self._hangover_left_ms = self.config.hangover_ms
+            if not self.speaking:
+                self.speaking = True
+                self.speech_segments += 1
+                frames = list(self._prefix) + [frame]
+                self._prefix.clear()
+                self._prefix_ms = 0.0
+                self.frames_sent += len(frames)
+                self.frames_suppressed -= len(frames) - 1  # the prefix frames were counted as suppressed
+                return frames
+        elif self.speaking:
+            self._hangover_left_ms -= frame_ms
+            if self._hangover_left_ms <= 0:
+                self.speaking = False
+                self._since_keepalive_ms = 0.0
+
+        if self.speaking:
+            self.frames_sent += 1
+            return [frame]
+
+        if self.config.keepalive_ms:
+            self._since_keepalive_ms += frame_ms
+            if self._since_keepalive_ms >= self.config.keepalive_ms:
+                self._since_keepalive_ms = 0.0
+                # Older buffered frames would now arrive out of order, so they are no longer usable as padding
+                self._prefix.clear()
+                self._prefix_ms = 0.0
+                self.frames_sent += 1
+                return [frame]
+
+        self._prefix.append(frame)
+        self._prefix_ms += frame_ms
+        while self._prefix_ms > self.config.prefix_padding_ms:
+            self._prefix_ms -= len(self._prefix.popleft()) / PCM_BYTES_PER_MS
+        self.frames_suppressed += 1
+        return []
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "frames_in": self.frames_in,
+            "frames_sent": self.frames_sent,
+            "frames_suppressed": self.frames_suppressed,
+            "suppressed_ratio": self.frames_suppressed / self.frames_in if self.frames_in else 0.0,
+            "speech_segments": self.speech_segments,
+            "noise_floor_db": round(self._noise_floor_db, 1),
+        }
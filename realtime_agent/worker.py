@@ -0,0 +1,280 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Process, Queue
+from typing import Any
+
+import aiohttp
+from attr import dataclass
+
+from agora_realtime_ai_api.rtc import RtcEngine, RtcOptions
+
+from .agent import InferenceConfig, RealtimeKitAgent, build_session_update
+from .logger import setup_logger
+from .loop_monitor import monitoring_event_loop
+from .metrics import exporting_metrics
+from .realtime.client_session import close_shared_client_session, shared_client_session
+from .realtime.connection_pool import RealtimeConnectionPool
+from .realtime.struct import PCM_CHANNELS, PCM_SAMPLE_RATE
+from .utils import wait_for_process
+
+# Set up the logger with color and timestamp support
+logger = setup_logger(name=__name__, log_level=logging.INFO)
+
+
+@dataclass(frozen=True, kw_only=True)
+class WorkerConfig:
+    """Multi-session worker mode: a few long-lived processes each host many agent sessions."""
+
+    workers: int = 0  # Number of worker processes; 0 keeps one process per call
+    max_sessions: int = 16  # Concurrent sessions a single worker accepts
+    warm_connections: int = 0  # Realtime API websockets each worker keeps open and configured ahead of calls
+
+    @classmethod
+    def from_env(cls) -> "WorkerConfig":
+        return cls(
+            workers=int(os.environ.get("AGENT_WORKERS") or 0),
+            max_sessions=int(os.environ.get("AGENT_SESSIONS_PER_WORKER") or 16),
+            warm_connections=int(os.environ.get("AGENT_WARM_CONNECTIONS") or 0),
+        )
+
+
+class SessionWorker:
+    """Runs agent sessions side by side on one event loop.
+
+    All sessions share one RtcEngine and one aiohttp ClientSession. Each session
+    is its own task (and task group inside the agent), so stopping or crashing
+    one channel leaves the others untouched.
+    """
+
+    def __init__(
+        self,
+        worker_id: int,
+        engine: RtcEngine,
+        commands: Queue,
+        events: Queue,
+        warm_connections: int = 0,
+        default_inference_config: InferenceConfig | None = None,
+    ) -> None:
+        self.worker_id = worker_id
+        self.engine = engine
+        self.commands = commands
+        self.events = events
+        self.warm_connections = warm_connections
+        self.default_inference_config = default_inference_config or InferenceConfig()
+        self.sessions: dict[str, asyncio.Task[None]] = {}
+        self.session: aiohttp.ClientSession | None = None
+        self.connection_pool: RealtimeConnectionPool | None = None
+
+    async def serve(self) -> None:
+        self.session = shared_client_session()
+        if self.warm_connections > 0:
+            self.connection_pool = RealtimeConnectionPool(
+                build_session_update(self.default_inference_config, None).session,
+                base_uri=os.getenv("REALTIME_API_BASE_URI", "wss://api.openai.com"),
+                api_key=os.getenv("OPENAI_API_KEY"),
+                size=self.warm_connections,
+                session=self.session,
+                reconnect=self.default_inference_config.reconnect,
+            )
+            await self.connection_pool.start()
+        try:
+            while True:
+                command, *args = await asyncio.to_thread(self.commands.get)
+                if command == "start":
+                    self.start_session(*args)
+                elif command == "stop":
+                    self.stop_session(*args)
+                elif command == "shutdown":
+                    break
+                else:
+                    logger.warning(f"Worker {self.worker_id}: unknown command {command}")
+        finally:
+            for task in self.sessions.values():
+                task.cancel()
+            await asyncio.gather(*self.sessions.values(), return_exceptions=True)
+            if self.connection_pool is not None:
+                logger.info(f"Worker {self.worker_id}: connection pool stats: {self.connection_pool.stats()}")
+                await self.connection_pool.close()
+            await close_shared_client_session()
+
+    def start_session(self, channel_name: str, uid: int, inference_config: InferenceConfig) -> None:
+        if channel_name in self.sessions:
+            logger.warning(f"Worker {self.worker_id}: session for channel {channel_name} already running")
+            return
+        self.sessions[channel_name] = asyncio.create_task(
+            self._run_session(channel_name, uid, inference_config), name=f"session:{channel_name}"
+        )
+        logger.info(f"Worker {self.worker_id}: started session for channel {channel_name}, {len(self.sessions)} active")
+
+    def stop_session(self, channel_name: str) -> None:
+        task = self.sessions.get(channel_name)
+        if task is not None:
+            logger.info(f"Worker {self.worker_id}: stopping session for channel {channel_name}")
+            task.cancel()
+
+    async def _run_session(self, channel_name: str, uid: int, inference_config: InferenceConfig) -> None:
+        try:
+            await RealtimeKitAgent.setup_and_run_agent(
+                engine=self.engine,
+                options=RtcOptions(
+                    channel_name=channel_name,
+                    uid=uid,
+                    sample_rate=PCM_SAMPLE_RATE,
+                    channels=PCM_CHANNELS,
+                    enable_pcm_dump=os.environ.get("WRITE_RTC_PCM", "false") == "true",
+                ),
+                inference_config=inference_config,
+                tools=None,
+                session=self.session,
+                connection_pool=self.connection_pool,
+            )
+        except asyncio.CancelledError:
+            logger.info(f"Worker {self.worker_id}: session for channel {channel_name} cancelled")
+        except Exception as e:
+            logger.error(f"Worker {self.worker_id}: session for channel {channel_name} failed: {e}")
+        finally:
+            self.sessions.pop(channel_name, None)
+            self.events.put(("finished", self.worker_id, channel_name))
+
+
+def run_worker_process(
+    worker_id: int,
+    engine_app_id: str,
+    engine_app_cert: str,
+    commands: Queue,
+    events: Queue,
+    warm_connections: int = 0,
+    default_inference_config: InferenceConfig | None = None,
+) -> None:
+    async def main() -> None:
+        engine = RtcEngine(appid=engine_app_id, appcert=engine_app_cert)
+        worker = SessionWorker(worker_id, engine, commands, events, warm_connections, default_inference_config)
+        async with exporting_metrics("worker"), monitoring_event_loop():
+            await worker.serve()
+
+    asyncio.run(main())
+
+
+class WorkerHandle:
+    def __init__(self, worker_id: int, process: Process, commands: Queue) -> None:
+        self.worker_id = worker_id
+        self.process = process
+        self.commands = commands
+        self.channels: set[str] = set()
+
+
+class WorkerPool:
+    """Server-side view of the worker processes; new channels go to the least-loaded worker."""
+
+    def __init__(
+        self,
+        engine_app_id: str,
+        engine_app_cert: str,
+        config: WorkerConfig,
+        default_inference_config: InferenceConfig | None = None,
+    ) -> None:
+        self.engine_app_id = engine_app_id
+        self.engine_app_cert = engine_app_cert
+        self.config = config
+        self.default_inference_config = default_inference_config
+        self.workers: list[WorkerHandle] = []
+        self.events: Queue = Queue()
+        # events.get blocks for the pool's lifetime; a thread of its own keeps it from starving the default executor
+        self._events_reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="worker-events")
+        self._closing = False
+        self._tasks: list[asyncio.Task[Any]] = []
+
+    def start(self) -> None:
+        for worker_id in range(self.config.workers):
+            self.workers.append(self._spawn(worker_id))
+        self._tasks.append(asyncio.create_task(self._watch_events()))
+        logger.info(f"Started {self.config.workers} agent workers, {self.config.max_sessions} sessions each")
+
+    def has_session(self, channel_name: str) -> bool:
+        return any(channel_name in worker.channels for worker in self.workers)
+
+    def least_loaded(self) -> WorkerHandle | None:
+        candidates = [
+            worker
+            for worker in self.workers
+            if worker.process.is_alive() and len(worker.channels) < self.config.max_sessions
+        ]
+        return min(candidates, key=lambda worker: len(worker.channels), default=None)
+
+    def start_session(self, channel_name: str, uid: int, inference_config: InferenceConfig) -> int:
+        """Hand the channel to the least-loaded worker and return its id."""
+        worker = self.least_loaded()
+        if worker is None:
+            raise RuntimeError("All agent workers are at capacity")
+        worker.channels.add(channel_name)
+        worker.commands.put(("start", channel_name, uid, inference_config))
+        return worker.worker_id
+
+    def stop_session(self, channel_name: str) -> bool:
+        for worker in self.workers:
+            if channel_name in worker.channels:
+                worker.commands.put(("stop", channel_name))
+                return True
+        return False
+
+    def load(self) -> dict[int, int]:
+        return {worker.worker_id: len(worker.channels) for worker in self.workers}
+
+    async def shutdown(self) -> None:
+        self._closing = True
+        for worker in self.workers:
+            if worker.process.is_alive():
+                worker.commands.put(("shutdown",))
+        for worker in self.workers:
+            if not await wait_for_process(worker.process, 10):
+                worker.process.kill()
+                await wait_for_process(worker.process)
+        for task in self._tasks:
+            task.cancel()
+        self.events.put(None)  # unblock the thread waiting in _watch_events
+        self._events_reader.shutdown(wait=False)
+        self.workers.clear()
+
+    def _spawn(self, worker_id: int) -> WorkerHandle:
+        commands: Queue = Queue()
+        process = Process(
+            target=run_worker_process,
+            args=(
+                worker_id,
+                self.engine_app_id,
+                self.engine_app_cert,
+                commands,
+                self.events,
+                self.config.warm_connections,
+                self.default_inference_config,
+            ),
+            daemon=True,
+        )
+        process.start()
+        worker = WorkerHandle(worker_id, process, commands)
+        self._tasks.append(asyncio.create_task(self._monitor(worker)))
+        return worker
+
+    async def _monitor(self, worker: WorkerHandle) -> None:
+        await wait_for_process(worker.process)
+        if self._closing:
+            return
+        logger.error(
+            f"Agent worker {worker.worker_id} (PID: {worker.process.pid}) exited with code {worker.process.exitcode}, "
+            f"dropping channels: {sorted(worker.channels)}"
+        )
+        self.workers[self.workers.index(worker)] = self._spawn(worker.worker_id)
+
+    async def _watch_events(self) -> None:
+        while True:
+            event = await asyncio.get_running_loop().run_in_executor(self._events_reader, self.events.get)
+            if event is None:
+                return
+            kind, worker_id, channel_name = event
+            if kind == "finished":
+                for worker in self.workers:
+                    if worker.worker_id == worker_id:
+                        worker.channels.discard(channel_name)
+                logger.info(f"Session for channel {channel_name} on worker {worker_id} finished, load: {self.load()}")